@@ -14,6 +14,8 @@ from pdfgen_juanipis.render import FONTS_CONF, render_pdf, _build_pages_from_sec
 
 CSS_PATH = ROOT / "template" / "boletin.css"
 OUTPUT_DIR = ROOT / "stress_outputs"
+# Page geometry shared by every case's paginator, render and validation.
+GEOMETRY_CACHE: Dict = {}
 
 
 def make_table_header():
@@ -372,13 +374,11 @@ CASES = {
 def validate_pages(paginator: Paginator, pages: List[Dict], tolerance_pt: float = 2.0) -> List[str]:
     issues = []
     for idx, page in enumerate(pages, start=1):
-        _, _, header_bottom, _, _ = paginator._compute_header_positions(
-            page, show_titles=page.get("show_header_titles", True)
-        )
+        header = paginator.page_geometry(page).header(page.get("show_header_titles", True))
         include_intro = bool(page.get("intro"))
         layout_state = paginator._compute_layout_state(
             page,
-            header_bottom,
+            header.bottom_pt,
             include_intro,
             compact_top=not page.get("show_header_titles", True),
         )
@@ -419,13 +419,15 @@ def run_case(case_name: str, data: Dict):
     output_pdf = output_dir / "output.pdf"
 
     layout = LayoutConfig()
-    paginator = Paginator(layout, str(CSS_PATH), str(ROOT), fonts_conf_path=str(FONTS_CONF))
+    paginator = Paginator(
+        layout, str(CSS_PATH), str(ROOT), fonts_conf_path=str(FONTS_CONF), geometry_cache=GEOMETRY_CACHE
+    )
 
     # Build pages for validation
     build_data = _build_pages_from_sections(copy.deepcopy(data))
     paginated = paginator.paginate(copy.deepcopy(build_data["pages"]))
 
-    render_pdf(data, output_path=output_pdf, paginate=True)
+    render_pdf(data, output_path=output_pdf, paginate=True, geometry_cache=GEOMETRY_CACHE)
     issues = validate_pages(paginator, paginated)
     render_pngs(output_pdf, output_dir)
 
@@ -1,8 +1,12 @@
 import pathlib
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 
+from pdfgen_juanipis.measure_pool import MeasurementPool
+from pdfgen_juanipis.page_pool import PaginationPool
+from pdfgen_juanipis.plan import PaginationPlan
 from pdfgen_juanipis.render import render_pdf
+from pdfgen_juanipis.telemetry import MeasureTelemetry
 
 
 @dataclass
@@ -11,6 +15,16 @@ class PDFGenConfig:
     template_dir: pathlib.Path
     css_path: pathlib.Path
     fonts_conf: Optional[pathlib.Path]
+    cache_dir: Optional[pathlib.Path] = None
+    measure_mode: str = "weasyprint"
+    calibration_path: Optional[pathlib.Path] = None
+    verify_hints: float = 0.0
+    # Worker processes measuring blocks in parallel (weasyprint mode only);
+    # 0 measures in this process.
+    measure_workers: int = 0
+    # Worker processes paginating the logical pages of the ``pages`` form in
+    # parallel; 0 paginates them one after another in this process.
+    page_workers: int = 0
 
     @classmethod
     def from_root(cls, root_dir: pathlib.Path) -> "PDFGenConfig":
@@ -34,6 +48,34 @@ class PDFGenConfig:
 class PDFGen:
     def __init__(self, config: PDFGenConfig):
         self.config = config
+        # Measurement statistics of the most recent render.
+        self.last_measure_stats: Optional[MeasureTelemetry] = None
+        # Page geometry per theme, LayoutConfig and stylesheet, reused by
+        # every render of this instance.
+        self.page_geometry: Dict[Any, Any] = {}
+        # Started on the first render that needs them and kept warm until close().
+        self._measure_pool: Optional[MeasurementPool] = None
+        self._page_pool: Optional[PaginationPool] = None
+
+    def close(self) -> None:
+        """Stop the measurement and pagination worker processes, if any
+        were started."""
+        if self._measure_pool is not None:
+            self._measure_pool.close()
+            self._measure_pool = None
+        if self._page_pool is not None:
+            self._page_pool.close()
+            self._page_pool = None
+
+    def _pool(self) -> Optional[MeasurementPool]:
+        if self._measure_pool is None and self.config.measure_workers and self.config.measure_mode == "weasyprint":
+            self._measure_pool = MeasurementPool(self.config.measure_workers, str(self.config.css_path))
+        return self._measure_pool
+
+    def _pagination_pool(self) -> Optional[PaginationPool]:
+        if self._page_pool is None and self.config.page_workers:
+            self._page_pool = PaginationPool(self.config.page_workers)
+        return self._page_pool
 
     def render(
         self,
@@ -42,7 +84,9 @@ class PDFGen:
         paginate: bool = True,
         validate: bool = True,
         css_extra: Optional[str] = None,
+        plan: Optional[Union[str, pathlib.Path, PaginationPlan]] = None,
     ) -> None:
+        self.last_measure_stats = MeasureTelemetry()
         render_pdf(
             data,
             output_path=output_path,
@@ -53,6 +97,15 @@ class PDFGen:
             css_path=self.config.css_path,
             fonts_conf=self.config.fonts_conf,
             root_dir=self.config.root_dir,
+            cache_dir=self.config.cache_dir,
+            measure_mode=self.config.measure_mode,
+            calibration_path=self.config.calibration_path,
+            verify_hints=self.config.verify_hints,
+            telemetry=self.last_measure_stats,
+            geometry_cache=self.page_geometry,
+            measure_pool=self._pool() if paginate else None,
+            page_pool=self._pagination_pool() if paginate else None,
+            plan=plan,
         )
 
     def render_bytes(
@@ -61,7 +114,9 @@ class PDFGen:
         paginate: bool = True,
         validate: bool = True,
         css_extra: Optional[str] = None,
+        plan: Optional[Union[str, pathlib.Path, PaginationPlan]] = None,
     ) -> bytes:
+        self.last_measure_stats = MeasureTelemetry()
         return render_pdf(
             data,
             output_path=None,
@@ -72,6 +127,15 @@ class PDFGen:
             css_path=self.config.css_path,
             fonts_conf=self.config.fonts_conf,
             root_dir=self.config.root_dir,
+            cache_dir=self.config.cache_dir,
+            measure_mode=self.config.measure_mode,
+            calibration_path=self.config.calibration_path,
+            verify_hints=self.config.verify_hints,
+            telemetry=self.last_measure_stats,
+            geometry_cache=self.page_geometry,
+            measure_pool=self._pool() if paginate else None,
+            page_pool=self._pagination_pool() if paginate else None,
+            plan=plan,
             output_bytes=True,
         )
 
@@ -0,0 +1,277 @@
+import copy
+import dataclasses
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Block types the template renders directly; every other type is emitted as
+# an "html" block before pagination.
+RENDER_TYPES = ("html", "table")
+# Keys carried from a content item to the block it emits; the height hints
+# are carried whenever present, even when zero.
+CARRIED_KEYS = ("refs", "footer_notes", "keep_with_next", "height_pt", "row_heights_pt")
+HINT_KEYS = ("height_pt", "row_heights_pt")
+
+# KPI tile geometry; must match .kpi-grid/.kpi-row in boletin.css.
+KPI_COLUMNS = 4
+KPI_ROW_HEIGHT_PT = 52.0
+KPI_ROW_GAP_PT = 6.0
+# Chart panel geometry; must match .chart-panel in boletin.css.
+CHART_PANEL_HEIGHT_PT = 180.0
+CHART_PANEL_TITLE_PT = 14.0
+CHART_PANEL_MARGIN_PT = 8.0
+
+
+@dataclasses.dataclass(frozen=True)
+class BlockType:
+    """A content block type: how it becomes HTML and how it is measured.
+
+    ``emit`` turns a content item into the HTML the template renders
+    (``None`` drops the item); ``table`` has no emitter because the template
+    renders it with its own macro.  ``height`` gives the height in points up
+    front, so the block is never laid out to be measured.  ``measure`` works
+    the height out with the paginator's measurer instead (say, a fixed image
+    plus a measured caption) and may return ``None`` to have the emitted
+    HTML measured; types with neither are measured as HTML by the measurer
+    (WeasyPrint, analytic or cached).
+    ``split`` cuts an item taller than ``max_height_pt`` into items that fit;
+    blocks without one are kept whole or split as generic HTML.
+
+    ``asset_keys`` name the item keys holding asset paths, ``validate``
+    appends warnings about an item and ``schema`` holds the JSON-schema
+    properties of the item.
+    """
+
+    name: str
+    emit: Optional[Callable[[Dict[str, Any]], Optional[str]]]
+    height: Optional[Callable[[Dict[str, Any]], float]] = None
+    split: Optional[Callable[[Dict[str, Any], float], List[Dict[str, Any]]]] = None
+    asset_keys: Tuple[str, ...] = ()
+    validate: Optional[Callable[[Dict[str, Any], List[str]], None]] = None
+    schema: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    measure: Optional[Callable[[Dict[str, Any], Any], Optional[float]]] = None
+
+
+BLOCK_TYPES: Dict[str, BlockType] = {}
+
+
+def register_block_type(block_type: BlockType) -> BlockType:
+    """Add (or replace) a block type; the validator and schema follow."""
+    BLOCK_TYPES[block_type.name] = block_type
+    return block_type
+
+
+def get_block_type(name: Optional[str]) -> Optional[BlockType]:
+    return BLOCK_TYPES.get(name) if name else None
+
+
+def emit_block(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The ``html``/``table`` block for a content item, or ``None`` when the
+    item renders nothing.
+
+    Items of a type with a fixed ``height`` get it as their ``height_pt``
+    hint; items of a type with a ``split`` keep a reference to themselves
+    under ``item`` so the paginator can split them.
+    """
+    name = item.get("type", "text")
+    block_type = get_block_type(name)
+    if name == "table":
+        block: Dict[str, Any] = {"type": "table", "table": item.get("table", {})}
+    elif block_type is None or block_type.emit is None:
+        block = {"type": "html", "html": item.get("html", "")}
+    else:
+        html = block_type.emit(item)
+        if html is None:
+            return None
+        block = {"type": "html", "html": html}
+        if name not in RENDER_TYPES:
+            block["block_type"] = name
+        if block_type.height is not None and "height_pt" not in item:
+            block["height_pt"] = block_type.height(item)
+        if block_type.split is not None:
+            block["item"] = item
+
+    for key in CARRIED_KEYS:
+        if key in item if key in HINT_KEYS else item.get(key):
+            block[key] = item[key]
+    return block
+
+
+def extend_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of *schema* whose block definition lists every registered type
+    and its properties."""
+    schema = copy.deepcopy(schema)
+    block = schema.setdefault("definitions", {}).setdefault("block", {})
+    properties = block.setdefault("properties", {})
+    properties.setdefault("type", {"type": "string"})["enum"] = sorted(BLOCK_TYPES)
+    for block_type in BLOCK_TYPES.values():
+        for key, value in block_type.schema.items():
+            properties.setdefault(key, value)
+    return schema
+
+
+def paragraphs_from_text(text):
+    if isinstance(text, list):
+        return [t.strip() for t in text if t and t.strip()]
+    if not text:
+        return []
+    chunks = []
+    for block in str(text).split("\n\n"):
+        block = " ".join([line.strip() for line in block.splitlines()]).strip()
+        if block:
+            chunks.append(block)
+    return chunks
+
+
+def map_grid_html(items):
+    blocks = []
+    for item in items:
+        path = item.get("path")
+        label = item.get("label", "")
+        blocks.append(
+            "<div class=\"map-item\">"
+            f"<img class=\"map-img\" src=\"{path}\" alt=\"{label}\" />"
+            f"<div class=\"map-label\">{label}</div>"
+            "</div>"
+        )
+    return "<div class=\"map-grid\">" + "".join(blocks) + "</div>"
+
+
+def figure_html(path, caption, wide=False):
+    cls = "figure figure-wide" if wide else "figure"
+    html = f"<img class=\"{cls}\" src=\"{path}\" alt=\"{caption}\" />"
+    if caption:
+        html += f"<div class=\"figure-caption\">{caption}</div>"
+    return html
+
+
+def _emit_text(item):
+    paragraphs = paragraphs_from_text(item.get("text"))
+    if not paragraphs:
+        return None
+    return "".join(f"<p>{p}</p>" for p in paragraphs)
+
+
+def _emit_map_grid(item):
+    html = map_grid_html(item.get("items", []))
+    if item.get("caption"):
+        html += f"<div class=\"figure-caption\">{item['caption']}</div>"
+    if item.get("source"):
+        html += f"<div class=\"figure-source\">{item['source']}</div>"
+    return html
+
+
+def _kpi_rows(item) -> List[List[Dict[str, Any]]]:
+    tiles = item.get("tiles") or []
+    columns = max(1, int(item.get("columns") or KPI_COLUMNS))
+    return [tiles[start : start + columns] for start in range(0, len(tiles), columns)]
+
+
+def _emit_kpi_tiles(item):
+    rows = _kpi_rows(item)
+    if not rows:
+        return None
+    columns = max(1, int(item.get("columns") or KPI_COLUMNS))
+    width = 100.0 / columns
+    html = "<div class=\"kpi-grid\">"
+    for row in rows:
+        html += "<div class=\"kpi-row\">"
+        for tile in row:
+            html += f"<div class=\"kpi-tile\" style=\"width: {width:.4f}%\">"
+            html += f"<div class=\"kpi-value\">{tile.get('value', '')}</div>"
+            html += f"<div class=\"kpi-label\">{tile.get('label', '')}</div>"
+            if tile.get("delta"):
+                html += f"<div class=\"kpi-delta\">{tile['delta']}</div>"
+            html += "</div>"
+        html += "</div>"
+    return html + "</div>"
+
+
+def _kpi_tiles_height(item) -> float:
+    # Every row is followed by a gap: the last one is the grid's margin.
+    return len(_kpi_rows(item)) * (KPI_ROW_HEIGHT_PT + KPI_ROW_GAP_PT)
+
+
+def _split_kpi_tiles(item, max_height_pt):
+    columns = max(1, int(item.get("columns") or KPI_COLUMNS))
+    rows_per_piece = max(1, math.floor(max_height_pt / (KPI_ROW_HEIGHT_PT + KPI_ROW_GAP_PT)))
+    tiles = item.get("tiles") or []
+    step = rows_per_piece * columns
+    pieces = []
+    for start in range(0, len(tiles), step):
+        piece = {key: value for key, value in item.items() if key not in ("refs", "footer_notes", "height_pt")}
+        piece["tiles"] = tiles[start : start + step]
+        if start == 0:
+            for key in ("refs", "footer_notes"):
+                if key in item:
+                    piece[key] = item[key]
+        pieces.append(piece)
+    return pieces
+
+
+def _validate_kpi_tiles(item, warnings):
+    tiles = item.get("tiles")
+    if not isinstance(tiles, list) or not tiles:
+        warnings.append("kpi_tiles.tiles must be a non-empty list")
+
+
+def _chart_panel_height(item) -> float:
+    return float(item.get("panel_height_pt") or CHART_PANEL_HEIGHT_PT) + CHART_PANEL_MARGIN_PT
+
+
+def _emit_chart_panel(item):
+    height = float(item.get("panel_height_pt") or CHART_PANEL_HEIGHT_PT)
+    title = item.get("title", "")
+    image_height = height - CHART_PANEL_TITLE_PT
+    return (
+        f"<div class=\"chart-panel\" style=\"height: {height:.2f}pt\">"
+        f"<div class=\"chart-panel-title\">{title}</div>"
+        f"<img class=\"chart-panel-img\" style=\"height: {image_height:.2f}pt\" "
+        f"src=\"{item.get('path', '')}\" alt=\"{title}\" />"
+        "</div>"
+    )
+
+
+_STRING = {"type": "string"}
+
+register_block_type(BlockType("text", _emit_text, schema={"text": {"type": ["string", "array"], "items": _STRING}}))
+register_block_type(BlockType("html", lambda item: item.get("html", ""), schema={"html": _STRING}))
+register_block_type(BlockType("table", None, schema={"table": {"$ref": "#/definitions/table"}}))
+register_block_type(
+    BlockType(
+        "figure",
+        lambda item: figure_html(item.get("path"), item.get("caption", ""), item.get("wide", False)),
+        asset_keys=("path",),
+        schema={"path": _STRING, "caption": _STRING, "wide": {"type": "boolean"}},
+    )
+)
+register_block_type(BlockType("map_grid", _emit_map_grid, schema={"source": _STRING}))
+register_block_type(
+    BlockType(
+        "kpi_tiles",
+        _emit_kpi_tiles,
+        height=_kpi_tiles_height,
+        split=_split_kpi_tiles,
+        validate=_validate_kpi_tiles,
+        schema={
+            "tiles": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {"label": _STRING, "value": {"type": ["string", "number"]}, "delta": _STRING},
+                    "required": ["label", "value"],
+                    "additionalProperties": True,
+                },
+            },
+            "columns": {"type": "integer", "minimum": 1},
+        },
+    )
+)
+register_block_type(
+    BlockType(
+        "chart_panel",
+        _emit_chart_panel,
+        height=_chart_panel_height,
+        asset_keys=("path",),
+        schema={"title": _STRING, "panel_height_pt": {"type": "number", "exclusiveMinimum": CHART_PANEL_TITLE_PT}},
+    )
+)
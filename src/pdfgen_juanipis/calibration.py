@@ -0,0 +1,228 @@
+import dataclasses
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+CALIBRATION_VERSION = 1
+CHARS_PER_LINE_RANGE = (10, 240)
+
+
+@dataclasses.dataclass(frozen=True)
+class LineModel:
+    """``offset + line_height * sum(ceil(chars / chars_per_line))`` over the
+    paragraphs of a probe."""
+
+    chars_per_line: float
+    line_height_pt: float
+    offset_pt: float
+
+    def estimate(self, paragraph_chars: Sequence[int]) -> float:
+        return self.offset_pt + self.line_height_pt * _line_count(paragraph_chars, self.chars_per_line)
+
+
+@dataclasses.dataclass(frozen=True)
+class TableModel:
+    header_height_pt: float
+    row_height_pt: float
+    chrome_height_pt: float
+
+    def row_offsets(self, row_count: int) -> Tuple[float, ...]:
+        return tuple(idx * self.row_height_pt for idx in range(row_count + 1))
+
+
+@dataclasses.dataclass(frozen=True)
+class ErrorStats:
+    """Absolute estimation errors in points over the calibration samples."""
+
+    count: int
+    p50_pt: float
+    p90_pt: float
+    p95_pt: float
+    max_pt: float
+
+    @classmethod
+    def from_errors(cls, errors: Sequence[float]) -> "ErrorStats":
+        ordered = sorted(abs(error) for error in errors)
+        if not ordered:
+            return cls(0, 0.0, 0.0, 0.0, 0.0)
+        return cls(
+            count=len(ordered),
+            p50_pt=_percentile(ordered, 50),
+            p90_pt=_percentile(ordered, 90),
+            p95_pt=_percentile(ordered, 95),
+            max_pt=ordered[-1],
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class Calibration:
+    """Fitted correction models for the height estimators.
+
+    ``errors`` holds the error of the calibrated models and ``baseline_errors``
+    the error of the built-in estimates, both keyed by probe class, so an
+    estimate-only run knows the tolerance it is working with.
+    """
+
+    fingerprint: str
+    line_models: Dict[str, LineModel]
+    table: Optional[TableModel] = None
+    errors: Dict[str, ErrorStats] = dataclasses.field(default_factory=dict)
+    baseline_errors: Dict[str, ErrorStats] = dataclasses.field(default_factory=dict)
+
+    def estimate(self, probe_class: str, paragraph_chars: Sequence[int]) -> Optional[float]:
+        model = self.line_models.get(probe_class)
+        if model is None:
+            return None
+        return model.estimate(paragraph_chars)
+
+    def save(self, path: str) -> None:
+        payload = {
+            "version": CALIBRATION_VERSION,
+            "fingerprint": self.fingerprint,
+            "line_models": {name: dataclasses.asdict(model) for name, model in self.line_models.items()},
+            "table": dataclasses.asdict(self.table) if self.table else None,
+            "errors": {name: dataclasses.asdict(stats) for name, stats in self.errors.items()},
+            "baseline_errors": {name: dataclasses.asdict(stats) for name, stats in self.baseline_errors.items()},
+        }
+        Path(path).write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def load_calibration(path: str) -> Calibration:
+    payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    if payload.get("version") != CALIBRATION_VERSION:
+        raise ValueError(f"Unsupported calibration file version: {payload.get('version')!r}")
+    return Calibration(
+        fingerprint=payload.get("fingerprint", ""),
+        line_models={name: LineModel(**model) for name, model in payload.get("line_models", {}).items()},
+        table=TableModel(**payload["table"]) if payload.get("table") else None,
+        errors={name: ErrorStats(**stats) for name, stats in payload.get("errors", {}).items()},
+        baseline_errors={
+            name: ErrorStats(**stats) for name, stats in payload.get("baseline_errors", {}).items()
+        },
+    )
+
+
+class CalibrationRecorder:
+    """Collects (features, measured height) samples from real layouts."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[Tuple[Tuple[int, ...], float, float]]] = {}
+        self.header_heights: List[float] = []
+        self.row_heights: List[float] = []
+        self.chrome_heights: List[float] = []
+        self.table_baseline_errors: List[float] = []
+
+    def record(
+        self, probe_class: str, paragraph_chars: Sequence[int], measured_pt: float, baseline_pt: float
+    ) -> None:
+        self.samples.setdefault(probe_class, []).append((tuple(paragraph_chars), measured_pt, baseline_pt))
+
+    def record_table(
+        self,
+        header_height_pt: float,
+        row_heights_pt: Sequence[float],
+        chrome_height_pt: float,
+        baseline_errors_pt: Sequence[float] = (),
+    ) -> None:
+        self.header_heights.append(header_height_pt)
+        self.row_heights.extend(row_heights_pt)
+        self.chrome_heights.append(chrome_height_pt)
+        self.table_baseline_errors.extend(baseline_errors_pt)
+
+    @property
+    def sample_count(self) -> int:
+        return sum(len(samples) for samples in self.samples.values()) + len(self.header_heights)
+
+    def fit(self, fingerprint: str = "") -> Calibration:
+        if not self.sample_count:
+            raise ValueError("No calibration samples were recorded; is WeasyPrint available?")
+
+        line_models: Dict[str, LineModel] = {}
+        errors: Dict[str, ErrorStats] = {}
+        baseline_errors: Dict[str, ErrorStats] = {}
+        for probe_class, samples in self.samples.items():
+            model = fit_line_model([(chars, measured) for chars, measured, _ in samples])
+            line_models[probe_class] = model
+            errors[probe_class] = ErrorStats.from_errors(
+                [model.estimate(chars) - measured for chars, measured, _ in samples]
+            )
+            baseline_errors[probe_class] = ErrorStats.from_errors(
+                [baseline - measured for _, measured, baseline in samples]
+            )
+
+        table = None
+        if self.header_heights:
+            table = TableModel(
+                header_height_pt=_median(self.header_heights),
+                row_height_pt=_median(self.row_heights) if self.row_heights else 0.0,
+                chrome_height_pt=_median(self.chrome_heights),
+            )
+            table_errors = [height - table.row_height_pt for height in self.row_heights]
+            table_errors.extend(height - table.header_height_pt for height in self.header_heights)
+            errors["table"] = ErrorStats.from_errors(table_errors)
+            baseline_errors["table"] = ErrorStats.from_errors(self.table_baseline_errors)
+
+        return Calibration(
+            fingerprint=fingerprint,
+            line_models=line_models,
+            table=table,
+            errors=errors,
+            baseline_errors=baseline_errors,
+        )
+
+
+def fit_line_model(samples: Sequence[Tuple[Sequence[int], float]]) -> LineModel:
+    """Least-squares line height and offset for the best chars-per-line."""
+    best: Optional[Tuple[float, LineModel]] = None
+    low, high = CHARS_PER_LINE_RANGE
+    for chars_per_line in range(low, high + 1):
+        lines = [_line_count(chars, chars_per_line) for chars, _ in samples]
+        heights = [measured for _, measured in samples]
+        line_height, offset = _least_squares(lines, heights)
+        error = sum((offset + line_height * count - height) ** 2 for count, height in zip(lines, heights))
+        if best is None or error < best[0] - 1e-9:
+            best = (error, LineModel(float(chars_per_line), line_height, offset))
+    return best[1]
+
+
+def format_report(calibration: Calibration) -> str:
+    lines = [f"{'class':<20} {'n':>5} {'p50':>7} {'p90':>7} {'p95':>7} {'max':>7} {'base p95':>9}"]
+    for name in sorted(calibration.errors):
+        stats = calibration.errors[name]
+        baseline = calibration.baseline_errors.get(name)
+        lines.append(
+            f"{name:<20} {stats.count:>5} {stats.p50_pt:>7.2f} {stats.p90_pt:>7.2f} "
+            f"{stats.p95_pt:>7.2f} {stats.max_pt:>7.2f} "
+            f"{(baseline.p95_pt if baseline and baseline.count else float('nan')):>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def _line_count(paragraph_chars: Sequence[int], chars_per_line: float) -> int:
+    return sum(max(1, math.ceil(chars / chars_per_line)) for chars in paragraph_chars)
+
+
+def _least_squares(xs: Sequence[float], ys: Sequence[float]) -> Tuple[float, float]:
+    count = len(xs)
+    mean_x = sum(xs) / count
+    mean_y = sum(ys) / count
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if var_x == 0:
+        # Every sample has the same line count: attribute it all to lines.
+        return (mean_y / mean_x if mean_x else 0.0), (0.0 if mean_x else mean_y)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
+    return slope, mean_y - slope * mean_x
+
+
+def _percentile(ordered: Sequence[float], percent: float) -> float:
+    rank = max(1, math.ceil(percent / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _median(values: Sequence[float]) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2.0
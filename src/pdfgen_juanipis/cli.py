@@ -57,6 +57,59 @@ def main(argv=None) -> int:
     render.add_argument("--fonts-conf", dest="fonts_conf", default=None)
     render.add_argument("--fonts-dir", dest="fonts_dir", default=None)
     render.add_argument("--css-extra", dest="css_extra", default=None, help="Extra CSS string")
+    render.add_argument(
+        "--cache-dir",
+        dest="cache_dir",
+        default=None,
+        help="Directory for the persistent measurement cache",
+    )
+    render.add_argument(
+        "--measure-mode",
+        dest="measure_mode",
+        choices=["weasyprint", "analytic", "estimate"],
+        default="weasyprint",
+        help="Measure blocks with WeasyPrint, analytically from the bundled font metrics, "
+        "or with (calibrated) estimates only",
+    )
+    render.add_argument(
+        "--calibration",
+        dest="calibration_path",
+        default=None,
+        help="Calibration file from the calibrate command, used to correct estimates",
+    )
+    render.add_argument(
+        "--verify-hints",
+        dest="verify_hints",
+        type=float,
+        default=0.0,
+        help="Fraction (0-1) of blocks with height_pt/row_heights_pt hints to re-measure and check",
+    )
+    render.add_argument(
+        "--measure-workers",
+        dest="measure_workers",
+        type=int,
+        default=0,
+        help="Measure blocks on this many WeasyPrint worker processes (weasyprint mode only)",
+    )
+    render.add_argument(
+        "--page-workers",
+        dest="page_workers",
+        type=int,
+        default=0,
+        help="Paginate the input's pages on this many worker processes",
+    )
+    render.add_argument(
+        "--plan",
+        dest="plan_path",
+        default=None,
+        help="Reuse the pagination plan in this file while it still matches; (re)write it otherwise",
+    )
+    render.add_argument(
+        "--stats-json",
+        dest="stats_json",
+        default=None,
+        help="Write per-probe-kind measurement statistics as JSON to this path",
+    )
     render.add_argument("--format", dest="fmt", default=None, help="Input format: json|yaml")
     render.add_argument("--no-validate", action="store_true")
     render.add_argument("--no-paginate", action="store_true")
@@ -67,6 +120,15 @@ def main(argv=None) -> int:
     validate.add_argument("--root", dest="root_dir", default=".", help="Project root dir")
     validate.add_argument("--format", dest="fmt", default=None, help="Input format: json|yaml")
 
+    calibrate = sub.add_parser("calibrate", help="Fit height estimators against WeasyPrint layouts")
+    calibrate.add_argument("inputs", nargs="+", help="Paths to JSON/YAML documents used as corpus")
+    calibrate.add_argument("--output", required=True, help="Where to write the calibration JSON")
+    calibrate.add_argument("--root", dest="root_dir", default=".", help="Project root dir")
+    calibrate.add_argument("--css", dest="css_path", default=None)
+    calibrate.add_argument("--fonts-conf", dest="fonts_conf", default=None)
+    calibrate.add_argument("--format", dest="fmt", default=None, help="Input format: json|yaml")
+    calibrate.add_argument("--no-validate", action="store_true")
+
     args = parser.parse_args(argv)
 
     if args.command == "validate":
@@ -79,6 +141,28 @@ def main(argv=None) -> int:
             print(f"[validate] {warning}")
         return 0 if not warnings else 1
 
+    if args.command == "calibrate":
+        from pdfgen_juanipis.calibration import format_report
+        from pdfgen_juanipis.render import calibrate_documents
+
+        root_dir = pathlib.Path(args.root_dir)
+        config = PDFGenConfig.from_root(root_dir)
+        documents = [_load_data(pathlib.Path(path), fmt=args.fmt) for path in args.inputs]
+        try:
+            calibration = calibrate_documents(
+                documents,
+                css_path=args.css_path or config.css_path,
+                fonts_conf=args.fonts_conf or config.fonts_conf,
+                root_dir=root_dir,
+                validate=not args.no_validate,
+            )
+        except ValueError as exc:
+            print(f"[calibrate] {exc}", file=sys.stderr)
+            return 1
+        calibration.save(args.output)
+        print(format_report(calibration))
+        return 0
+
     root_dir = pathlib.Path(args.root_dir)
     config = PDFGenConfig.from_root(root_dir)
 
@@ -90,26 +174,41 @@ def main(argv=None) -> int:
         config.fonts_conf = pathlib.Path(args.fonts_conf)
     if args.fonts_dir:
         config.fonts_conf = _build_fonts_conf(pathlib.Path(args.fonts_dir))
+    if args.cache_dir:
+        config.cache_dir = pathlib.Path(args.cache_dir)
+    config.measure_mode = args.measure_mode
+    if args.calibration_path:
+        config.calibration_path = pathlib.Path(args.calibration_path)
+    config.verify_hints = args.verify_hints
+    config.measure_workers = args.measure_workers
+    config.page_workers = args.page_workers
 
     data = _load_data(pathlib.Path(args.input), fmt=args.fmt)
-
-    if args.stdout:
-        pdf_bytes = PDFGen(config).render_bytes(
-            data,
-            paginate=not args.no_paginate,
-            validate=not args.no_validate,
-            css_extra=args.css_extra,
-        )
-        sys.stdout.buffer.write(pdf_bytes)
-        return 0
-
-    PDFGen(config).render(
-        data,
-        output_path=pathlib.Path(args.output),
-        paginate=not args.no_paginate,
-        validate=not args.no_validate,
-        css_extra=args.css_extra,
-    )
+    generator = PDFGen(config)
+
+    try:
+        if args.stdout:
+            pdf_bytes = generator.render_bytes(
+                data,
+                paginate=not args.no_paginate,
+                validate=not args.no_validate,
+                css_extra=args.css_extra,
+                plan=args.plan_path,
+            )
+            sys.stdout.buffer.write(pdf_bytes)
+        else:
+            generator.render(
+                data,
+                output_path=pathlib.Path(args.output),
+                paginate=not args.no_paginate,
+                validate=not args.no_validate,
+                css_extra=args.css_extra,
+                plan=args.plan_path,
+            )
+    finally:
+        generator.close()
+    if args.stats_json:
+        pathlib.Path(args.stats_json).write_text(generator.last_measure_stats.to_json(), encoding="utf-8")
     return 0
 
 
@@ -0,0 +1,945 @@
+import dataclasses
+import functools
+import html as _html
+import logging
+import math
+import re
+from array import array
+from collections import OrderedDict
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from pdfgen_juanipis.images import image_size
+
+try:
+    from fontTools.ttLib import TTFont
+
+    FONTTOOLS_AVAILABLE = True
+except Exception:  # pragma: no cover - optional dependency for analytic measurement
+    TTFont = None
+    FONTTOOLS_AVAILABLE = False
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except Exception:  # pragma: no cover - optional dependency for vectorized widths
+    np = None
+    NUMPY_AVAILABLE = False
+
+LOGGER = logging.getLogger(__name__)
+
+PACKAGE_FONTS_DIR = Path(__file__).resolve().parent / "assets" / "fonts"
+DEFAULT_FONT_FILE = PACKAGE_FONTS_DIR / "BCDEEE_Calibri_5.ttf"
+CSS_PX_TO_PT = 72.0 / 96.0
+MAX_CODEPOINT = 0x2FFFF
+# Computed styles kept per layout engine (least recently used evicted).
+MAX_COMPUTED_STYLES = 4096
+
+# Only the parts of a user-agent stylesheet that change heights.
+UA_CSS = """
+p { margin-top: 1em; margin-bottom: 1em; }
+h1 { font-size: 2em; font-weight: 700; margin-top: 0.67em; margin-bottom: 0.67em; }
+h2 { font-size: 1.5em; font-weight: 700; margin-top: 0.83em; margin-bottom: 0.83em; }
+h3 { font-size: 1.17em; font-weight: 700; margin-top: 1em; margin-bottom: 1em; }
+h4 { font-weight: 700; margin-top: 1.33em; margin-bottom: 1.33em; }
+h5 { font-size: 0.83em; font-weight: 700; margin-top: 1.67em; margin-bottom: 1.67em; }
+h6 { font-size: 0.67em; font-weight: 700; margin-top: 2.33em; margin-bottom: 2.33em; }
+ul, ol { margin-top: 1em; margin-bottom: 1em; padding-left: 40px; }
+blockquote { margin-top: 1em; margin-bottom: 1em; margin-left: 40px; margin-right: 40px; }
+strong, b, th { font-weight: 700; }
+em, i { font-style: italic; }
+sup, sub, small { font-size: smaller; }
+"""
+
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "div", "figure", "footer", "h1", "h2", "h3",
+    "h4", "h5", "h6", "header", "li", "main", "ol", "p", "section", "ul",
+}
+VOID_TAGS = {"br", "col", "hr", "img", "input", "meta", "link", "source", "wbr"}
+
+
+class UnsupportedLayout(Exception):
+    """Raised when a fragment needs layout features the analytic engine lacks."""
+
+
+class FontMetrics:
+    """Advance widths and pair kerning of one font file, in font units."""
+
+    def __init__(self, path: str):
+        font = TTFont(path, lazy=True)
+        self.path = path
+        self.units_per_em = float(font["head"].unitsPerEm)
+        cmap = font.getBestCmap() or {}
+        metrics = font["hmtx"].metrics
+
+        advances = {cp: metrics[glyph][0] for cp, glyph in cmap.items() if glyph in metrics}
+        letters = [advances[cp] for cp in range(0x21, 0x7F) if cp in advances]
+        self.default_width = float(sum(letters) / len(letters)) if letters else self.units_per_em / 2
+        limit = min(max(advances, default=0x7F), MAX_CODEPOINT) + 1
+        self.widths = array("f", [self.default_width]) * limit
+        for cp, advance in advances.items():
+            if cp < limit:
+                self.widths[cp] = advance
+        if 0x20 not in advances:
+            self.widths[0x20] = self.units_per_em / 4
+        self._np_widths = np.frombuffer(self.widths, dtype=np.float32) if NUMPY_AVAILABLE else None
+
+        hhea = font["hhea"]
+        self.ascent = hhea.ascent / self.units_per_em
+        self.descent = -hhea.descent / self.units_per_em
+        self.normal_line_height = (hhea.ascent - hhea.descent + hhea.lineGap) / self.units_per_em
+        self.kerning = _read_kerning(font, cmap)
+
+    def text_width(self, text: str, size_pt: float) -> float:
+        widths = self.widths
+        limit = len(widths)
+        default = self.default_width
+        total = 0.0
+        for char in text:
+            cp = ord(char)
+            total += widths[cp] if cp < limit else default
+        if self.kerning and len(text) > 1:
+            kerning = self.kerning
+            for left, right in zip(text, text[1:]):
+                total += kerning.get((ord(left), ord(right)), 0)
+        return total * size_pt / self.units_per_em
+
+    def text_widths(self, texts: Sequence[str], size_pt: float) -> List[float]:
+        """Width of many strings at once, vectorized with NumPy when present."""
+        if not NUMPY_AVAILABLE or not texts or self.kerning:
+            return [self.text_width(text, size_pt) for text in texts]
+        joined = "".join(texts)
+        if not joined:
+            return [0.0] * len(texts)
+        codepoints = np.frombuffer(joined.encode("utf-32-le"), dtype="<u4").astype(np.int64)
+        outside = codepoints >= len(self.widths)
+        codepoints[outside] = 0
+        glyph_widths = self._np_widths[codepoints].astype(np.float64)
+        glyph_widths[outside] = self.default_width
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        sums = np.zeros(len(texts), dtype=np.float64)
+        nonempty = lengths > 0
+        if nonempty.any():
+            sums[nonempty] = np.add.reduceat(glyph_widths, starts[nonempty])
+        return (sums * size_pt / self.units_per_em).tolist()
+
+
+@functools.lru_cache(maxsize=64)
+def load_font_metrics(path: str) -> FontMetrics:
+    return FontMetrics(path)
+
+
+def _read_kerning(font: Any, cmap: Dict[int, str]) -> Dict[Tuple[int, int], float]:
+    glyph_to_cp: Dict[str, int] = {}
+    for cp, glyph in sorted(cmap.items()):
+        glyph_to_cp.setdefault(glyph, cp)
+    pairs: Dict[Tuple[int, int], float] = {}
+
+    def add(left: str, right: str, value: float) -> None:
+        if value and left in glyph_to_cp and right in glyph_to_cp:
+            pairs.setdefault((glyph_to_cp[left], glyph_to_cp[right]), value)
+
+    if "kern" in font:
+        for table in getattr(font["kern"], "kernTables", []):
+            for (left, right), value in getattr(table, "kernTable", {}).items():
+                add(left, right, value)
+
+    if "GPOS" in font and font["GPOS"].table.LookupList is not None:
+        for lookup in font["GPOS"].table.LookupList.Lookup:
+            for sub in lookup.SubTable:
+                if lookup.LookupType == 9:
+                    if sub.ExtensionLookupType != 2:
+                        continue
+                    sub = sub.ExtSubTable
+                elif lookup.LookupType != 2:
+                    continue
+                if sub.Format == 1:
+                    for left, pair_set in zip(sub.Coverage.glyphs, sub.PairSet):
+                        for record in pair_set.PairValueRecord:
+                            value = getattr(record.Value1, "XAdvance", 0) if record.Value1 else 0
+                            add(left, record.SecondGlyph, value)
+                elif sub.Format == 2:
+                    class1 = sub.ClassDef1.classDefs
+                    class2 = sub.ClassDef2.classDefs
+                    for left in sub.Coverage.glyphs:
+                        record = sub.Class1Record[class1.get(left, 0)]
+                        for right in glyph_to_cp:
+                            value1 = record.Class2Record[class2.get(right, 0)].Value1
+                            add(left, right, getattr(value1, "XAdvance", 0) if value1 else 0)
+    return pairs
+
+
+@dataclasses.dataclass(frozen=True)
+class _Rule:
+    rank: Tuple[int, int, int, int, int, int]
+    compounds: Tuple[Tuple[Optional[str], Optional[str], Tuple[str, ...]], ...]
+    declarations: Tuple[Tuple[str, str], ...]
+
+
+class StyleSheet:
+    """The subset of a stylesheet that affects block heights."""
+
+    def __init__(self, css_texts: Sequence[str], base_dir: Path):
+        self.base_dir = base_dir
+        self.font_faces: Dict[str, List[Tuple[int, bool, str]]] = {}
+        self.rules: List[_Rule] = []
+        order = 0
+        for origin, css_text in enumerate([UA_CSS, *css_texts]):
+            css_text = re.sub(r"/\*.*?\*/", "", css_text, flags=re.DOTALL)
+            for prelude, body in re.findall(r"([^{}]+)\{([^{}]*)\}", css_text):
+                prelude = prelude.strip()
+                declarations = _parse_declarations(body)
+                if prelude.startswith("@font-face"):
+                    self._add_font_face(declarations)
+                    continue
+                if prelude.startswith("@"):
+                    continue
+                for selector in prelude.split(","):
+                    compounds = _parse_selector(selector)
+                    if compounds is None:
+                        continue
+                    order += 1
+                    for important in (False, True):
+                        decls = tuple((k, v) for k, v, imp in declarations if imp == important)
+                        if decls:
+                            self.rules.append(
+                                _Rule(
+                                    rank=(int(important), min(origin, 1), *_specificity(compounds), order),
+                                    compounds=compounds,
+                                    declarations=decls,
+                                )
+                            )
+        self.rules.sort(key=lambda rule: rule.rank)
+
+    def matching(self, path: Sequence["_Element"]) -> List[Tuple[str, str]]:
+        declarations: List[Tuple[str, str]] = []
+        for rule in self.rules:
+            if _matches(rule.compounds, path):
+                declarations.extend(rule.declarations)
+        return declarations
+
+    def font_for(self, family_value: str, weight: int, italic: bool) -> FontMetrics:
+        for family in family_value.split(","):
+            faces = self.font_faces.get(family.strip().strip("'\"").lower())
+            if not faces:
+                continue
+            styled = [face for face in faces if face[1] == italic] or faces
+            best = min(styled, key=lambda face: abs(face[0] - weight))
+            return load_font_metrics(best[2])
+        return load_font_metrics(str(DEFAULT_FONT_FILE))
+
+    def _add_font_face(self, declarations: List[Tuple[str, str, bool]]) -> None:
+        props = {key: value for key, value, _ in declarations}
+        family = props.get("font-family", "").strip().strip("'\"").lower()
+        match = re.search(r"url\(\s*['\"]?([^'\")]+)['\"]?\s*\)", props.get("src", ""))
+        if not family or not match:
+            return
+        path = (self.base_dir / match.group(1)).resolve()
+        if not path.is_file():
+            # Custom templates often keep relative urls to the bundled fonts.
+            path = PACKAGE_FONTS_DIR / Path(match.group(1)).name
+        if not path.is_file():
+            return
+        weight = _font_weight(props.get("font-weight", "400"), 400)
+        italic = props.get("font-style", "normal").strip() in ("italic", "oblique")
+        self.font_faces.setdefault(family, []).append((weight, italic, str(path)))
+
+
+def _parse_declarations(body: str) -> List[Tuple[str, str, bool]]:
+    declarations = []
+    for item in body.split(";"):
+        if ":" not in item:
+            continue
+        key, value = item.split(":", 1)
+        important = "!important" in value
+        declarations.append((key.strip().lower(), value.replace("!important", "").strip(), important))
+    return declarations
+
+
+def _parse_selector(selector: str) -> Optional[Tuple[Tuple[Optional[str], Optional[str], Tuple[str, ...]], ...]]:
+    selector = selector.strip()
+    if not selector or re.search(r"[:>+~\[*]", selector):
+        return None
+    compounds = []
+    for part in selector.split():
+        match = re.fullmatch(r"([a-zA-Z][\w-]*)?(#[\w-]+)?((?:\.[\w-]+)*)", part)
+        if not match:
+            return None
+        tag = match.group(1).lower() if match.group(1) else None
+        element_id = match.group(2)[1:] if match.group(2) else None
+        classes = tuple(cls for cls in match.group(3).split(".") if cls)
+        compounds.append((tag, element_id, classes))
+    return tuple(compounds)
+
+
+def _specificity(compounds: Sequence[Tuple[Optional[str], Optional[str], Tuple[str, ...]]]) -> Tuple[int, int, int]:
+    ids = sum(1 for _, element_id, _ in compounds if element_id)
+    classes = sum(len(cls) for _, _, cls in compounds)
+    tags = sum(1 for tag, _, _ in compounds if tag)
+    return ids, classes, tags
+
+
+def _compound_matches(compound: Tuple[Optional[str], Optional[str], Tuple[str, ...]], element: "_Element") -> bool:
+    tag, element_id, classes = compound
+    if tag and tag != element.tag:
+        return False
+    if element_id and element_id != element.attrs.get("id"):
+        return False
+    return all(cls in element.classes for cls in classes)
+
+
+def _matches(compounds: Sequence[Any], path: Sequence["_Element"]) -> bool:
+    if not path or not _compound_matches(compounds[-1], path[-1]):
+        return False
+    ancestor = len(path) - 2
+    for compound in reversed(compounds[:-1]):
+        while ancestor >= 0 and not _compound_matches(compound, path[ancestor]):
+            ancestor -= 1
+        if ancestor < 0:
+            return False
+        ancestor -= 1
+    return True
+
+
+def _font_weight(value: str, parent: int) -> int:
+    value = value.strip().lower()
+    if value.isdigit():
+        return int(value)
+    return {"normal": 400, "bold": 700, "bolder": max(parent + 300, 700), "lighter": 100}.get(value, parent)
+
+
+def _length(value: str, font_size: float, reference: float = 0.0) -> float:
+    """Convert a CSS length to points (``auto`` and unknown values are 0)."""
+    match = re.fullmatch(r"(-?[\d.]+)(pt|px|em|rem|%|in|cm|mm)?", value.strip().lower())
+    if not match:
+        return {"thin": 0.75, "medium": 2.25, "thick": 3.75}.get(value.strip().lower(), 0.0)
+    number = float(match.group(1))
+    unit = match.group(2) or "px"
+    if unit == "pt":
+        return number
+    if unit == "px":
+        return number * CSS_PX_TO_PT
+    if unit in ("em", "rem"):
+        return number * font_size
+    if unit == "%":
+        return number * reference / 100.0
+    return number * {"in": 72.0, "cm": 72.0 / 2.54, "mm": 72.0 / 25.4}[unit]
+
+
+def _fixed_length(value: Optional[str], font_size: float) -> Optional[float]:
+    if not value or value.strip() == "auto" or value.strip().endswith("%"):
+        return None
+    return _length(value, font_size)
+
+
+def _used_width(spec: str, available: float, font_size: float) -> Optional[float]:
+    """Resolve a ``width``/``max-width`` value against the containing block."""
+    spec = spec.strip().lower()
+    if spec in ("", "auto", "none"):
+        return None
+    if spec.endswith("%"):
+        try:
+            return float(spec[:-1]) * available / 100.0
+        except ValueError:
+            return None
+    return _length(spec, font_size)
+
+
+def _box_sides(value: str) -> Tuple[str, str, str, str]:
+    parts = value.split()
+    if not parts:
+        return "0", "0", "0", "0"
+    if len(parts) == 1:
+        return parts[0], parts[0], parts[0], parts[0]
+    if len(parts) == 2:
+        return parts[0], parts[1], parts[0], parts[1]
+    if len(parts) == 3:
+        return parts[0], parts[1], parts[2], parts[1]
+    return parts[0], parts[1], parts[2], parts[3]
+
+
+@dataclasses.dataclass(frozen=True)
+class ComputedStyle:
+    font: FontMetrics
+    font_family: str
+    font_size: float
+    font_weight: int
+    italic: bool
+    line_height: Tuple[str, float]
+    overflow_wrap: str = "normal"
+    display: str = "block"
+    flex_row: bool = True
+    width_spec: str = "auto"
+    max_width_spec: str = "none"
+    width: Optional[float] = None
+    height: Optional[float] = None
+    margin: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0)
+    padding: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0)
+    border: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0)
+
+    @property
+    def line_height_pt(self) -> float:
+        kind, value = self.line_height
+        if kind == "factor":
+            return value * self.font_size
+        if kind == "normal":
+            return self.font.normal_line_height * self.font_size
+        return value
+
+    @property
+    def strut(self) -> Tuple[float, float]:
+        """Strut extent (above, below) the baseline, half-leading included."""
+        ascent = self.font.ascent * self.font_size
+        descent = self.font.descent * self.font_size
+        half_leading = (self.line_height_pt - ascent - descent) / 2.0
+        return ascent + half_leading, descent + half_leading
+
+
+@dataclasses.dataclass
+class _Element:
+    tag: str
+    attrs: Dict[str, str]
+    children: List[Any] = dataclasses.field(default_factory=list)
+
+    @property
+    def classes(self) -> Tuple[str, ...]:
+        return tuple(self.attrs.get("class", "").split())
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self, root: _Element):
+        super().__init__(convert_charrefs=True)
+        self.stack = [root]
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        element = _Element(tag.lower(), {key: value or "" for key, value in attrs})
+        self.stack[-1].children.append(element)
+        if element.tag not in VOID_TAGS:
+            self.stack.append(element)
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.stack[-1].children.append(_Element(tag.lower(), {key: value or "" for key, value in attrs}))
+
+    def handle_endtag(self, tag: str) -> None:
+        tag = tag.lower()
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth].tag == tag:
+                del self.stack[depth:]
+                return
+
+    def handle_data(self, data: str) -> None:
+        self.stack[-1].children.append(data)
+
+
+def parse_fragment(fragment: str) -> _Element:
+    root = _Element("div", {})
+    builder = _TreeBuilder(root)
+    builder.feed(fragment)
+    builder.close()
+    return root
+
+
+class AnalyticLayout:
+    """Block heights from font metrics, the stylesheet and greedy line breaking.
+
+    Supports the block/inline subset used by the bulletin templates: nested
+    blocks with collapsing margins, styled inline runs, ``<br>``, fixed
+    tables, single-row flex containers with sized items and images whose
+    intrinsic size can be read from their headers.  Anything else (grid,
+    inline tables, unreadable images) raises :class:`UnsupportedLayout` so
+    callers can fall back.
+    """
+
+    def __init__(
+        self, css_path: str, page_width_pt: float, extra_css: str = "", base_url: Optional[str] = None
+    ):
+        css_file = Path(css_path)
+        try:
+            css_text = css_file.read_text(encoding="utf-8")
+        except OSError:
+            css_text = ""
+        self.page_width_pt = page_width_pt
+        self.base_url = base_url
+        self.stylesheet = StyleSheet([css_text, extra_css], css_file.parent)
+        self._style_cache: "OrderedDict[Tuple[Any, ...], ComputedStyle]" = OrderedDict()
+        root = _Element("html", {})
+        self.root_style = self.computed_style([root], None)
+        self.body_path = [root, _Element("body", {}), _Element("div", {"class": "measure-root"})]
+        style = self.root_style
+        for depth in range(2, len(self.body_path) + 1):
+            style = self.computed_style(self.body_path[:depth], style)
+        self.body_style = style
+
+    def computed_style(self, path: Sequence[_Element], parent: Optional[ComputedStyle]) -> ComputedStyle:
+        element = path[-1]
+        key = (
+            tuple((node.tag, node.attrs.get("id"), node.classes) for node in path),
+            element.attrs.get("style"),
+            parent,
+        )
+        cached = self._style_cache.get(key)
+        if cached is not None:
+            self._style_cache.move_to_end(key)
+            return cached
+
+        props: Dict[str, str] = {}
+        for name, value in self.stylesheet.matching(path):
+            props.update(_expand_shorthand(name, value))
+        for declaration in element.attrs.get("style", "").split(";"):
+            if ":" in declaration:
+                name, value = declaration.split(":", 1)
+                props.update(_expand_shorthand(name.strip().lower(), value.strip()))
+
+        parent_size = parent.font_size if parent else 12.0
+        font_size = parent_size
+        if "font-size" in props:
+            value = props["font-size"].lower()
+            if value == "smaller":
+                font_size = parent_size / 1.2
+            elif value == "larger":
+                font_size = parent_size * 1.2
+            else:
+                font_size = _length(value, parent_size, parent_size) or parent_size
+        family = props.get("font-family", parent.font_family if parent else "serif")
+        weight = _font_weight(props.get("font-weight", ""), parent.font_weight if parent else 400)
+        if "font-style" in props:
+            italic = props["font-style"] in ("italic", "oblique")
+        else:
+            italic = parent.italic if parent else False
+
+        line_height = parent.line_height if parent else ("normal", 0.0)
+        if "line-height" in props:
+            value = props["line-height"].strip().lower()
+            if value == "normal":
+                line_height = ("normal", 0.0)
+            elif re.fullmatch(r"[\d.]+", value):
+                line_height = ("factor", float(value))
+            else:
+                line_height = ("absolute", _length(value, font_size, font_size))
+
+        default_display = "block" if element.tag in BLOCK_TAGS or element.tag in ("html", "body") else "inline"
+        display = props.get("display", default_display)
+
+        def side_lengths(prefix: str, suffix: str = "") -> Tuple[float, float, float, float]:
+            return tuple(
+                _length(props.get(f"{prefix}-{side}{suffix}", "0"), font_size)
+                for side in ("top", "right", "bottom", "left")
+            )
+
+        style = ComputedStyle(
+            font=self.stylesheet.font_for(family, weight, italic),
+            font_family=family,
+            font_size=font_size,
+            font_weight=weight,
+            italic=italic,
+            line_height=line_height,
+            overflow_wrap=props.get("overflow-wrap", parent.overflow_wrap if parent else "normal"),
+            display=display,
+            flex_row=props.get("flex-direction", "row").strip() == "row"
+            and props.get("flex-wrap", "nowrap").strip() == "nowrap",
+            width_spec=props.get("width", "auto"),
+            max_width_spec=props.get("max-width", "none"),
+            width=_fixed_length(props.get("width"), font_size),
+            height=_fixed_length(props.get("height"), font_size),
+            margin=side_lengths("margin"),
+            padding=side_lengths("padding"),
+            border=side_lengths("border", "-width"),
+        )
+        self._style_cache[key] = style
+        while len(self._style_cache) > MAX_COMPUTED_STYLES:
+            self._style_cache.popitem(last=False)
+        return style
+
+    def probe_height(self, body_html: str, probe_id: str) -> Optional[float]:
+        """Height of the element *probe_id* as ``BlockMeasurer`` reports it:
+        content, padding and its own margins, without borders."""
+        root = parse_fragment(body_html)
+        measured: Dict[str, float] = {}
+        try:
+            self._layout_children(
+                root.children, list(self.body_path), self.body_style, self.page_width_pt, measured, probe_id
+            )
+        except UnsupportedLayout:
+            return None
+        return measured.get(probe_id)
+
+    def table_rows(self, table: Dict[str, Any]) -> Tuple[float, float, List[float]]:
+        """Header height, fixed chrome and body row heights of a probe table."""
+        total_width = table.get("total_width") or 532.66
+        dep_width = table.get("dep_width") or 120.0
+        groups = table.get("groups", [])
+        num_cols = sum(len(group.get("months", [])) for group in groups)
+        num_width = (total_width - dep_width) / (num_cols if num_cols else 1)
+
+        path = list(self.body_path) + [
+            _Element("div", {"class": "content"}),
+            _Element("div", {"class": "table-wrap"}),
+        ]
+        style = self.body_style
+        for depth in range(len(self.body_path) + 1, len(path) + 1):
+            style = self.computed_style(path[:depth], style)
+        table_element = _Element("table", {"id": "probe-table", "class": "tabla-abaco"})
+        table_path = path + [table_element]
+        table_style = self.computed_style(table_path, style)
+
+        def cell_style(section: str, cls: Optional[str], header: bool) -> ComputedStyle:
+            group = _Element(section, {})
+            row = _Element("tr", {})
+            cell = _Element("th" if header else "td", {"class": cls} if cls else {})
+            group_style = self.computed_style(table_path + [group], table_style)
+            row_style = self.computed_style(table_path + [group, row], group_style)
+            return self.computed_style(table_path + [group, row, cell], row_style)
+
+        def cell_heights(texts: Sequence[str], width: float, style: ComputedStyle) -> List[float]:
+            inner = width - style.padding[1] - style.padding[3] - style.border[1]
+            chrome = style.padding[0] + style.padding[2]
+            widths = style.font.text_widths([_collapse_text(text) for text in texts], style.font_size)
+            heights = []
+            for text, text_width in zip(texts, widths):
+                if not text.strip():
+                    lines = 0
+                elif text_width <= inner:
+                    lines = 1
+                else:
+                    lines = self._count_lines(
+                        [(_collapse_text(text), style)], inner, style.overflow_wrap != "normal"
+                    )
+                heights.append(lines * style.line_height_pt + chrome)
+            return heights
+
+        dep_th = cell_style("thead", "col-dep", True)
+        num_th = cell_style("thead", "col-num", True)
+        dep_td = cell_style("tbody", "col-dep", False)
+        num_td = cell_style("tbody", None, False)
+        border = max(dep_td.border[0], num_td.border[0])
+
+        top = [
+            cell_heights([group.get("title", "")], num_width * len(group.get("months", [])), num_th)[0]
+            for group in groups
+        ]
+        months = [month for group in groups for month in group.get("months", [])]
+        bottom = cell_heights(months, num_width, num_th) if months else [0.0]
+        dep_header = cell_heights(["Departamento/Mes"], dep_width, dep_th)[0]
+        header = max(max(top or [0.0]) + max(bottom) + border, dep_header) + 2 * border
+
+        rows = table.get("rows", [])
+        row_heights = cell_heights([str(row.get("dep", "")) for row in rows], dep_width, dep_td)
+        for column in range(num_cols):
+            values = []
+            for row in rows:
+                vals = row.get("vals") or []
+                values.append(str(vals[column]) if column < len(vals) else "")
+            for idx, height in enumerate(cell_heights(values, num_width, num_td)):
+                if height > row_heights[idx]:
+                    row_heights[idx] = height
+        row_heights = [height + border for height in row_heights]
+        chrome = table_style.margin[0] + table_style.margin[2]
+        return header, chrome, row_heights
+
+    def _layout_children(
+        self,
+        children: Sequence[Any],
+        path: List[_Element],
+        style: ComputedStyle,
+        width: float,
+        measured: Dict[str, float],
+        probe_id: str,
+    ) -> Tuple[float, Optional[float], Optional[float]]:
+        """Stack block children; returns (height, first top margin, last bottom margin)."""
+        items: List[Tuple[float, float, float]] = []
+        runs: List[Tuple[Union[str, _Atomic], ComputedStyle]] = []
+
+        def flush_inline() -> None:
+            if any(isinstance(text, _Atomic) or text.strip() or text == "\n" for text, _ in runs):
+                above, below = style.strut
+                height = 0.0
+                for atomic_height in self._break_lines(runs, width, style.overflow_wrap != "normal"):
+                    height += max(above, atomic_height) + below if atomic_height else style.line_height_pt
+                items.append((0.0, 0.0, height))
+            runs.clear()
+
+        for child in children:
+            if isinstance(child, str):
+                runs.append((child, style))
+                continue
+            child_path = path + [child]
+            child_style = self.computed_style(child_path, style)
+            if child_style.display in ("inline-flex", "table", "grid", "inline-grid"):
+                raise UnsupportedLayout(child.tag)
+            if child_style.display == "none":
+                continue
+            if child_style.display in ("block", "list-item", "flow-root", "flex"):
+                flush_inline()
+                if child.tag == "img":
+                    items.append(self._layout_image(child, child_style, width, measured, probe_id))
+                else:
+                    items.append(self._layout_block(child, child_path, child_style, width, measured, probe_id))
+            elif child.tag == "img":
+                image_width, image_height = self._image_box(child, child_style, width)
+                runs.append((_Atomic(image_width, image_height), child_style))
+            else:
+                self._collect_inline(child, child_path, child_style, runs)
+        flush_inline()
+
+        height = 0.0
+        first_margin: Optional[float] = None
+        previous: Optional[float] = None
+        for margin_top, margin_bottom, item_height in items:
+            if previous is None:
+                first_margin = margin_top
+            else:
+                height += _collapse_margins(previous, margin_top)
+            height += item_height
+            previous = margin_bottom
+        return height, first_margin, previous
+
+    def _layout_block(
+        self,
+        element: _Element,
+        path: List[_Element],
+        style: ComputedStyle,
+        available: float,
+        measured: Dict[str, float],
+        probe_id: str,
+    ) -> Tuple[float, float, float]:
+        top, right, bottom, left = style.margin
+        pad_top, pad_right, pad_bottom, pad_left = style.padding
+        border_top, border_right, border_bottom, border_left = style.border
+        inner = _used_width(style.width_spec, available, style.font_size)
+        if inner is None:
+            inner = available - left - right - pad_left - pad_right - border_left - border_right
+        if style.display == "flex":
+            # Flex containers establish a new formatting context: no margin
+            # collapsing through them.
+            content = self._layout_flex(element, path, style, max(inner, 1.0), measured, probe_id)
+            first_margin = last_margin = None
+        else:
+            content, first_margin, last_margin = self._layout_children(
+                element.children, path, style, max(inner, 1.0), measured, probe_id
+            )
+
+        margin_top = top
+        if first_margin is not None:
+            if pad_top == 0 and border_top == 0:
+                margin_top = _collapse_margins(top, first_margin)
+            else:
+                content += first_margin
+        margin_bottom = bottom
+        if last_margin is not None:
+            if pad_bottom == 0 and border_bottom == 0 and style.height is None:
+                margin_bottom = _collapse_margins(bottom, last_margin)
+            else:
+                content += last_margin
+        if style.height is not None:
+            content = style.height
+
+        if element.attrs.get("id") == probe_id:
+            measured[probe_id] = content + top + bottom + pad_top + pad_bottom
+        return margin_top, margin_bottom, content + pad_top + pad_bottom + border_top + border_bottom
+
+    def _layout_image(
+        self,
+        element: _Element,
+        style: ComputedStyle,
+        available: float,
+        measured: Dict[str, float],
+        probe_id: str,
+    ) -> Tuple[float, float, float]:
+        top, _, bottom, _ = style.margin
+        pad_top, _, pad_bottom, _ = style.padding
+        _, height = self._image_box(element, style, available)
+        if element.attrs.get("id") == probe_id:
+            measured[probe_id] = height + top + bottom + pad_top + pad_bottom
+        return top, bottom, height + pad_top + pad_bottom + style.border[0] + style.border[2]
+
+    def _image_box(self, element: _Element, style: ComputedStyle, available: float) -> Tuple[float, float]:
+        """Used (width, height) of a replaced image, from its header only."""
+        size = image_size(element.attrs.get("src", ""), self.base_url)
+        if size is None:
+            raise UnsupportedLayout("img")
+        _, right, _, left = style.margin
+        room = available - left - right - style.padding[1] - style.padding[3]
+        width = _used_width(style.width_spec, room, style.font_size)
+        if width is None and style.height is not None:
+            width = style.height / size.ratio
+        if width is None:
+            width = size.width_px * CSS_PX_TO_PT
+        max_width = _used_width(style.max_width_spec, room, style.font_size)
+        if max_width is not None and width > max_width:
+            width = max_width
+        height = style.height if style.height is not None else width * size.ratio
+        return width, height
+
+    def _layout_flex(
+        self,
+        element: _Element,
+        path: List[_Element],
+        style: ComputedStyle,
+        width: float,
+        measured: Dict[str, float],
+        probe_id: str,
+    ) -> float:
+        """Single-line row flex container whose items all have a width."""
+        if not style.flex_row:
+            raise UnsupportedLayout("flex")
+        tallest = 0.0
+        for child in element.children:
+            if isinstance(child, str):
+                if child.strip():
+                    raise UnsupportedLayout("flex")
+                continue
+            child_path = path + [child]
+            child_style = self.computed_style(child_path, style)
+            if child_style.display == "none":
+                continue
+            if _used_width(child_style.width_spec, width, child_style.font_size) is None:
+                raise UnsupportedLayout("flex")
+            if child.tag == "img":
+                margin_top, margin_bottom, height = self._layout_image(
+                    child, child_style, width, measured, probe_id
+                )
+            else:
+                block_style = dataclasses.replace(child_style, display="block")
+                margin_top, margin_bottom, height = self._layout_block(
+                    child, child_path, block_style, width, measured, probe_id
+                )
+            # Margins of flex items never collapse.
+            tallest = max(tallest, margin_top + height + margin_bottom)
+        return tallest
+
+    def _collect_inline(
+        self,
+        element: _Element,
+        path: List[_Element],
+        style: ComputedStyle,
+        runs: List[Tuple[Union[str, "_Atomic"], ComputedStyle]],
+    ) -> None:
+        if element.tag == "br":
+            runs.append(("\n", style))
+            return
+        for child in element.children:
+            if isinstance(child, str):
+                runs.append((child, style))
+                continue
+            child_path = path + [child]
+            child_style = self.computed_style(child_path, style)
+            if child.tag == "img":
+                raise UnsupportedLayout(child.tag)
+            if child_style.display not in ("inline", "inline-block"):
+                raise UnsupportedLayout(child.tag)
+            self._collect_inline(child, child_path, child_style, runs)
+
+    def _count_lines(
+        self, runs: Sequence[Tuple[Union[str, "_Atomic"], ComputedStyle]], width: float, break_words: bool
+    ) -> int:
+        return len(self._break_lines(runs, width, break_words))
+
+    def _break_lines(
+        self, runs: Sequence[Tuple[Union[str, "_Atomic"], ComputedStyle]], width: float, break_words: bool
+    ) -> List[float]:
+        """Greedy line breaking; returns the tallest atomic inline (image)
+        height of every line, ``0.0`` for text-only lines."""
+        lines: List[float] = []
+        x = 0.0
+        has_content = False
+        pending_space = 0.0
+        word = 0.0
+        in_word = False
+        line_atomic = 0.0
+
+        def end_line() -> None:
+            nonlocal x, has_content, pending_space, line_atomic
+            lines.append(line_atomic)
+            x, has_content, pending_space, line_atomic = 0.0, False, 0.0, 0.0
+
+        def place(word_width: float, atomic_height: float = 0.0) -> None:
+            nonlocal x, has_content, pending_space, line_atomic
+            if not has_content:
+                if break_words and not atomic_height and word_width > width:
+                    for _ in range(math.ceil(word_width / width) - 1):
+                        end_line()
+                    word_width = word_width - (math.ceil(word_width / width) - 1) * width
+                x = word_width
+                has_content = True
+            elif x + pending_space + word_width <= width + 0.01:
+                x += pending_space + word_width
+            else:
+                end_line()
+                place(word_width, atomic_height)
+                return
+            pending_space = 0.0
+            line_atomic = max(line_atomic, atomic_height)
+
+        for text, style in runs:
+            if isinstance(text, _Atomic):
+                if in_word:
+                    place(word)
+                    word, in_word = 0.0, False
+                place(text.width, text.height)
+                continue
+            if text == "\n":
+                if in_word:
+                    place(word)
+                    word, in_word = 0.0, False
+                end_line()
+                continue
+            for piece in re.split(r"(\s+)", text):
+                if not piece:
+                    continue
+                if piece.isspace():
+                    if in_word:
+                        place(word)
+                        word, in_word = 0.0, False
+                    if has_content:
+                        pending_space = style.font.text_width(" ", style.font_size)
+                    continue
+                word += style.font.text_width(piece, style.font_size)
+                in_word = True
+        if in_word:
+            place(word)
+        if has_content:
+            end_line()
+        return lines
+
+
+@dataclasses.dataclass(frozen=True)
+class _Atomic:
+    """An inline replaced box (image) taking part in line breaking."""
+
+    width: float
+    height: float
+
+
+def _collapse_margins(first: float, second: float) -> float:
+    positive = max(first, second, 0.0)
+    negative = min(first, second, 0.0)
+    return positive + negative
+
+
+def _collapse_text(text: str) -> str:
+    return re.sub(r"\s+", " ", _html.unescape(re.sub(r"<[^>]+>", " ", text))).strip()
+
+
+def _expand_shorthand(name: str, value: str) -> Dict[str, str]:
+    if name in ("margin", "padding"):
+        return dict(zip((f"{name}-top", f"{name}-right", f"{name}-bottom", f"{name}-left"), _box_sides(value)))
+    if name == "border-width":
+        sides = _box_sides(value)
+        return {f"border-{side}-width": sides[idx] for idx, side in enumerate(("top", "right", "bottom", "left"))}
+    if name == "border" or (name.startswith("border-") and name.count("-") == 1):
+        width = "medium"
+        for token in value.split():
+            if re.fullmatch(r"-?[\d.]+(pt|px|em|rem|in|cm|mm)?|thin|medium|thick", token):
+                width = token
+        if "none" in value.split() or "hidden" in value.split():
+            width = "0"
+        sides = ("top", "right", "bottom", "left") if name == "border" else (name.split("-")[1],)
+        if not set(sides) <= {"top", "right", "bottom", "left"}:
+            return {name: value}
+        return {f"border-{side}-width": width for side in sides}
+    if name == "font":
+        return {}
+    return {name: value}
@@ -0,0 +1,192 @@
+import dataclasses
+import functools
+import re
+import struct
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+SVG_HEAD_BYTES = 8192
+CSS_UNIT_TO_PX = {
+    "": 1.0,
+    "px": 1.0,
+    "pt": 96.0 / 72.0,
+    "pc": 16.0,
+    "in": 96.0,
+    "cm": 96.0 / 2.54,
+    "mm": 96.0 / 25.4,
+}
+# JPEG start-of-frame markers (SOF0..SOF15 minus DHT, JPG and DAC).
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+@dataclasses.dataclass(frozen=True)
+class ImageSize:
+    """Intrinsic image size in CSS pixels (WeasyPrint's default of one image
+    pixel per CSS pixel; EXIF rotations already applied)."""
+
+    width_px: float
+    height_px: float
+
+    @property
+    def ratio(self) -> float:
+        return self.height_px / self.width_px
+
+
+def image_size(src: str, base_dir: Optional[str] = None) -> Optional[ImageSize]:
+    """Read the intrinsic size of a PNG, JPEG, GIF or SVG from its header.
+
+    Results are cached by path, size and mtime.  Returns ``None`` for remote
+    or missing files and for formats that are not recognised.
+    """
+    path = _local_path(src, base_dir)
+    if path is None:
+        return None
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return _image_size_cached(str(path), stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=4096)
+def _image_size_cached(path: str, size: int, mtime_ns: int) -> Optional[ImageSize]:
+    try:
+        with open(path, "rb") as handle:
+            head = handle.read(32)
+            if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+                width, height = struct.unpack(">II", head[16:24])
+                return _size(width, height)
+            if head[:6] in (b"GIF87a", b"GIF89a"):
+                width, height = struct.unpack("<HH", head[6:10])
+                return _size(width, height)
+            if head.startswith(b"\xff\xd8"):
+                handle.seek(2)
+                return _jpeg_size(handle)
+            handle.seek(0)
+            text = handle.read(SVG_HEAD_BYTES).decode("utf-8", errors="ignore")
+    except (OSError, struct.error):
+        return None
+    if "<svg" in text:
+        return _svg_size(text)
+    return None
+
+
+def _local_path(src: str, base_dir: Optional[str]) -> Optional[Path]:
+    if not src:
+        return None
+    parsed = urlparse(src)
+    if parsed.scheme == "file":
+        return Path(unquote(parsed.path))
+    if parsed.scheme and len(parsed.scheme) > 1:
+        return None
+    path = Path(src)
+    if not path.is_absolute() and base_dir:
+        base = urlparse(base_dir)
+        path = Path(unquote(base.path) if base.scheme == "file" else base_dir) / path
+    return path
+
+
+def _size(width: float, height: float) -> Optional[ImageSize]:
+    if width <= 0 or height <= 0:
+        return None
+    return ImageSize(float(width), float(height))
+
+
+def _jpeg_size(handle: BinaryIO) -> Optional[ImageSize]:
+    swap = False
+    while True:
+        byte = handle.read(1)
+        while byte and byte != b"\xff":
+            byte = handle.read(1)
+        while byte == b"\xff":
+            byte = handle.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue
+        if marker in (0xD9, 0xDA):
+            return None
+        length_bytes = handle.read(2)
+        if len(length_bytes) != 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if marker in JPEG_SOF_MARKERS:
+            frame = handle.read(5)
+            if len(frame) != 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return _size(height, width) if swap else _size(width, height)
+        segment = handle.read(length - 2)
+        if marker == 0xE1 and segment.startswith(b"Exif\x00\x00"):
+            swap = _exif_orientation(segment[6:]) in (5, 6, 7, 8)
+
+
+def _exif_orientation(tiff: bytes) -> Optional[int]:
+    if tiff[:2] == b"II":
+        order = "<"
+    elif tiff[:2] == b"MM":
+        order = ">"
+    else:
+        return None
+    try:
+        offset = struct.unpack(order + "I", tiff[4:8])[0]
+        count = struct.unpack(order + "H", tiff[offset: offset + 2])[0]
+        for index in range(count):
+            entry = offset + 2 + index * 12
+            tag, _, _, value = struct.unpack(order + "HHIH", tiff[entry: entry + 10])
+            if tag == 0x0112:
+                return value
+    except struct.error:
+        return None
+    return None
+
+
+def _svg_size(text: str) -> Optional[ImageSize]:
+    match = re.search(r"<svg\b[^>]*>", text, flags=re.DOTALL)
+    if not match:
+        return None
+    tag = match.group(0)
+    width = _svg_length(_svg_attr(tag, "width"))
+    height = _svg_length(_svg_attr(tag, "height"))
+    if width and height:
+        return _size(width, height)
+    view_box = _svg_view_box(_svg_attr(tag, "viewBox"))
+    if view_box is None:
+        return None
+    box_width, box_height = view_box
+    if width:
+        return _size(width, width * box_height / box_width)
+    if height:
+        return _size(height * box_width / box_height, height)
+    return _size(box_width, box_height)
+
+
+def _svg_attr(tag: str, name: str) -> Optional[str]:
+    match = re.search(rf"\s{name}\s*=\s*(['\"])(.*?)\1", tag)
+    return match.group(2) if match else None
+
+
+def _svg_length(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    match = re.fullmatch(r"\s*([\d.]+)\s*([a-z]*)\s*", value)
+    if not match or match.group(2) not in CSS_UNIT_TO_PX:
+        return None
+    return float(match.group(1)) * CSS_UNIT_TO_PX[match.group(2)]
+
+
+def _svg_view_box(value: Optional[str]) -> Optional[Tuple[float, float]]:
+    if not value:
+        return None
+    parts = re.split(r"[\s,]+", value.strip())
+    if len(parts) != 4:
+        return None
+    try:
+        width, height = float(parts[2]), float(parts[3])
+    except ValueError:
+        return None
+    if width <= 0 or height <= 0:
+        return None
+    return width, height
@@ -0,0 +1,348 @@
+import dataclasses
+import functools
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+PACKAGE_FONTS_DIR = Path(__file__).resolve().parent / "assets" / "fonts"
+CACHE_DB_NAME = "measurements.sqlite3"
+FONT_SUFFIXES = {".ttf", ".otf", ".woff", ".woff2"}
+DEFAULT_MEMORY_BUDGET = 32 * 1024 * 1024
+# Rough per-entry overhead of the OrderedDict bookkeeping.
+ENTRY_OVERHEAD = 160
+# Persistent entries of a fingerprint nobody opened for this long are
+# pruned; pruning runs at most once per PRUNE_INTERVAL_S per cache file.
+STALE_FINGERPRINT_S = 30 * 24 * 3600.0
+PRUNE_INTERVAL_S = 24 * 3600.0
+# Granularity of a fingerprint's last_used stamp, so most opens do not write.
+LAST_USED_RESOLUTION_S = 3600.0
+# Items of a table column hashed per repr() call, so huge tables are not
+# turned into one giant string.
+TABLE_KEY_CHUNK = 4096
+MISSING = object()
+
+
+def measurement_fingerprint(css_path: str, measure_css: str, content_width: float) -> str:
+    """Hash every input that changes probe heights besides the fragment itself.
+
+    Covers the stylesheet contents, the measurement CSS template, the
+    content width, the font files (bundled ones, ``@font-face`` sources and
+    the active ``FONTCONFIG_FILE``) and the WeasyPrint version.
+    """
+    digest = hashlib.sha256()
+    css_file = Path(css_path)
+    css_text = _read_text(css_file)
+    digest.update(b"css\0" + css_text.encode("utf-8"))
+    digest.update(b"measure_css\0" + measure_css.encode("utf-8"))
+    digest.update(f"width\0{float(content_width):.4f}".encode("utf-8"))
+    for font_path in _font_files(css_file, css_text):
+        digest.update(b"font\0" + font_path.name.encode("utf-8") + _file_digest(font_path).encode("ascii"))
+    fonts_conf = os.environ.get("FONTCONFIG_FILE")
+    if fonts_conf and Path(fonts_conf).is_file():
+        digest.update(b"fontconfig\0" + _file_digest(Path(fonts_conf)).encode("ascii"))
+    digest.update(b"weasyprint\0" + _weasyprint_version().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def stylesheet_signature(css_path: str) -> Tuple[Any, ...]:
+    """Cheap change detector for a stylesheet and its fonts (paths, sizes
+    and mtimes, plus ``FONTCONFIG_FILE``) that avoids hashing file contents."""
+    css_file = Path(css_path)
+    files = [css_file, *_font_files(css_file, _read_text(css_file))]
+    fonts_conf = os.environ.get("FONTCONFIG_FILE")
+    if fonts_conf:
+        files.append(Path(fonts_conf))
+    signature = []
+    for path in files:
+        try:
+            stat = path.stat()
+        except OSError:
+            signature.append((str(path), None, None))
+            continue
+        signature.append((str(path), stat.st_size, stat.st_mtime_ns))
+    return (fonts_conf, tuple(signature))
+
+
+def probe_digest(key: Any, content_width: Optional[float]) -> str:
+    payload = repr((key, None if content_width is None else round(float(content_width), 4)))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def layout_key(*parts: Any) -> bytes:
+    """Compact 16-byte digest of the layout inputs in *parts*."""
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).digest()
+
+
+def table_layout_key(table: Dict[str, Any]) -> bytes:
+    """Digest of every table input that changes its layout: rows, column
+    groups and the table/department column widths.
+
+    Columnar rows are hashed from their column lists; dict rows hash to
+    the same digest as their columnar copy.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    groups = tuple(
+        (group.get("title", ""), tuple(group.get("months", []))) for group in table.get("groups", [])
+    )
+    digest.update(repr((groups, table.get("total_width"), table.get("dep_width"))).encode("utf-8"))
+    rows = table.get("rows", [])
+    columns = rows.columns() if hasattr(rows, "columns") else None
+    if columns is None:
+        deps: List[Any] = []
+        values: List[Any] = []
+        counts: List[int] = []
+        for row in rows:
+            vals = row.get("vals") or ()
+            deps.append(row.get("dep", ""))
+            values.extend(vals)
+            counts.append(len(vals))
+        columns = (deps, values, counts)
+    for column in columns:
+        for start in range(0, len(column), TABLE_KEY_CHUNK):
+            digest.update(repr(column[start : start + TABLE_KEY_CHUNK]).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.digest()
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    size_bytes: int
+
+
+class MemoryCache:
+    """In-process LRU cache bounded by an approximate memory budget.
+
+    Sizes are estimated with :func:`approximate_size` unless a ``sizeof``
+    callable is given; the least recently used entries are evicted once the
+    budget (or ``max_entries``) is exceeded.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MEMORY_BUDGET,
+        max_entries: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._sizeof = sizeof or approximate_size
+        self._entries: "OrderedDict[Any, Tuple[Any, int]]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Any, value: Any) -> None:
+        size = self._sizeof(key) + self._sizeof(value) + ENTRY_OVERHEAD
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= previous[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self._size += size
+        while self._size > self.max_bytes or (
+            self.max_entries is not None and len(self._entries) > self.max_entries
+        ):
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            entries=len(self._entries),
+            size_bytes=self._size,
+        )
+
+
+def approximate_size(value: Any) -> int:
+    """Shallow-recursive ``sys.getsizeof`` over tuples, lists and dataclasses."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(approximate_size(item) for item in value)
+    elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+        size += sum(approximate_size(getattr(value, field.name)) for field in dataclasses.fields(value))
+    return size
+
+
+class PersistentHeightCache:
+    """SQLite-backed probe height cache shared by processes on one machine.
+
+    Entries are stored under the fingerprint of the measurement inputs, so
+    stylesheets, themes and content widths rendered side by side share one
+    directory without seeing each other's heights.  Opening the cache
+    stamps its fingerprint as used; the entries of fingerprints unused for
+    *max_age_s* are pruned, at most once a day.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        fingerprint: str,
+        timeout_s: float = 30.0,
+        max_age_s: float = STALE_FINGERPRINT_S,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.cache_dir / CACHE_DB_NAME
+        self.fingerprint = fingerprint
+        self.timeout_s = timeout_s
+        self.max_age_s = max_age_s
+        self._local = threading.local()
+        self._initialize()
+
+    def get_many(self, digests: Iterable[str]) -> Dict[str, float]:
+        digests = list(digests)
+        found: Dict[str, float] = {}
+        if not digests:
+            return found
+        try:
+            conn = self._connection()
+            # Stay well below SQLITE_MAX_VARIABLE_NUMBER.
+            for start in range(0, len(digests), 500):
+                chunk = digests[start : start + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = conn.execute(
+                    f"SELECT digest, height FROM heights WHERE fingerprint = ? AND digest IN ({placeholders})",
+                    [self.fingerprint, *chunk],
+                ).fetchall()
+                found.update((digest, float(height)) for digest, height in rows)
+        except sqlite3.Error as exc:
+            LOGGER.warning("Measurement cache read failed: %s", exc)
+        return found
+
+    def set_many(self, items: Iterable[Tuple[str, float]]) -> None:
+        rows = [(self.fingerprint, digest, float(height)) for digest, height in items]
+        if not rows:
+            return
+        try:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO heights (fingerprint, digest, height) VALUES (?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error as exc:
+            LOGGER.warning("Measurement cache write failed: %s", exc)
+
+    def _initialize(self) -> None:
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS heights ("
+                    "fingerprint TEXT NOT NULL, digest TEXT NOT NULL, height REAL NOT NULL, "
+                    "PRIMARY KEY (fingerprint, digest))"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS fingerprints (fingerprint TEXT PRIMARY KEY, last_used REAL NOT NULL)"
+                )
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+                now = time.time()
+                conn.execute(
+                    "INSERT INTO fingerprints (fingerprint, last_used) VALUES (?, ?) "
+                    "ON CONFLICT (fingerprint) DO UPDATE SET last_used = excluded.last_used "
+                    "WHERE fingerprints.last_used < ?",
+                    (self.fingerprint, now, now - LAST_USED_RESOLUTION_S),
+                )
+                self._prune(conn, now)
+        except sqlite3.Error as exc:
+            LOGGER.warning("Measurement cache unavailable at %s: %s", self.path, exc)
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'last_prune'").fetchone()
+        if row is not None and now - row[0] < PRUNE_INTERVAL_S:
+            return
+        cutoff = now - self.max_age_s
+        conn.execute("DELETE FROM fingerprints WHERE last_used < ?", (cutoff,))
+        # Also drops rows written before fingerprints were tracked.
+        conn.execute("DELETE FROM heights WHERE fingerprint NOT IN (SELECT fingerprint FROM fingerprints)")
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_prune', ?)", (now,))
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross fork() or threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=self.timeout_s)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+def _read_text(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8")
+    except OSError:
+        return ""
+
+
+def _font_files(css_file: Path, css_text: str) -> List[Path]:
+    paths = set()
+    if PACKAGE_FONTS_DIR.is_dir():
+        paths.update(p for p in PACKAGE_FONTS_DIR.iterdir() if p.suffix.lower() in FONT_SUFFIXES)
+    for match in re.findall(r"url\(\s*['\"]?([^'\")]+)['\"]?\s*\)", css_text):
+        candidate = (css_file.parent / match).resolve()
+        if candidate.suffix.lower() in FONT_SUFFIXES and candidate.is_file():
+            paths.add(candidate)
+    return sorted(paths)
+
+
+def _file_digest(path: Path) -> str:
+    try:
+        stat = path.stat()
+    except OSError:
+        return "missing"
+    return _file_digest_cached(str(path), stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=256)
+def _file_digest_cached(path: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _weasyprint_version() -> str:
+    try:
+        import weasyprint
+    except Exception:
+        return "unavailable"
+    return str(getattr(weasyprint, "__version__", "unknown"))
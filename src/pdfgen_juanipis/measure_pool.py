@@ -0,0 +1,160 @@
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+# Probe kinds a worker can rebuild from ``MeasureProbe.args``.
+PARALLEL_PROBE_KINDS = ("html", "text", "table")
+# Probes per worker task: enough for one batch document to amortize
+# WeasyPrint's per-document cost, few enough to keep every worker busy.
+PROBES_PER_TASK = 24
+
+# (content width, [(probe kind, probe args)]) laid out as one batch document.
+ProbeChunk = Tuple[float, Sequence[Tuple[str, Tuple[Any, ...]]]]
+# (result, worker seconds, WeasyPrint layouts) of one task.
+TaskResult = Tuple[Any, float, int]
+
+# (css_path, base_url, layout) -> BlockMeasurer, per worker process.
+_WORKER_MEASURERS: Dict[Tuple[Any, ...], Any] = {}
+
+
+class WorkerPool:
+    """A pool of *workers* processes (the CPU count by default), the base
+    of the measurement and pagination pools.
+
+    Tasks that cannot be submitted, because the pool was closed or a worker
+    died, or that raise, yield a default result and a warning, so callers
+    fall back to doing the work themselves.
+    """
+
+    # Names used in the warnings of unavailable pools and failed tasks.
+    pool_name = "Worker"
+    task_name = "work"
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        start_method: Optional[str] = None,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: Tuple[Any, ...] = (),
+    ):
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(start_method) if start_method else None,
+            initializer=initializer,
+            initargs=initargs,
+        )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _submit(self, fn, *args) -> Optional[concurrent.futures.Future]:
+        try:
+            return self._executor.submit(fn, *args)
+        except RuntimeError as exc:  # shut down, or a worker died (BrokenProcessPool)
+            LOGGER.warning("%s pool unavailable: %s", self.pool_name, exc)
+            return None
+
+    def _task_result(self, future: Optional[concurrent.futures.Future], default: Any) -> Any:
+        if future is None:
+            return default
+        try:
+            return future.result()
+        except Exception as exc:
+            LOGGER.warning("Parallel %s failed: %s", self.task_name, exc)
+            return default
+
+
+class MeasurementPool(WorkerPool):
+    """Worker processes that lay out independent measurement probes in
+    parallel.
+
+    Every worker imports WeasyPrint and parses *css_path* when it starts,
+    and keeps one measurer per stylesheet and layout afterwards, so a pool
+    can serve many documents.  Workers only run layouts: cache lookups,
+    fallback estimates and telemetry stay in the calling process (see
+    ``BlockMeasurer.prefetch``).  A failed task yields ``None`` results and
+    leaves those probes to the serial path.
+    """
+
+    pool_name = "Measurement"
+    task_name = "measurement"
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        css_path: Optional[str] = None,
+        start_method: Optional[str] = None,
+    ):
+        super().__init__(workers, start_method, initializer=_warm_worker, initargs=(css_path,))
+
+    def measure(
+        self,
+        css_path: str,
+        base_url: str,
+        layout: Any,
+        chunks: Sequence[ProbeChunk],
+        tables: Sequence[Dict[str, Any]] = (),
+    ) -> Tuple[List[TaskResult], List[TaskResult]]:
+        """Heights of every probe chunk and row profiles of *tables*.
+
+        Heights come back in chunk order as lists with ``None`` where the
+        layout failed; profiles are ``None`` when the table could not be
+        profiled.
+        """
+        context = (css_path, base_url, layout)
+        chunk_futures = [
+            self._submit(_measure_chunk, context, width, list(specs)) for width, specs in chunks
+        ]
+        profile_futures = [self._submit(_measure_table_profile, context, table) for table in tables]
+        chunk_results = [
+            self._task_result(future, ([None] * len(specs), 0.0, 0))
+            for future, (_, specs) in zip(chunk_futures, chunks)
+        ]
+        profile_results = [self._task_result(future, (None, 0.0, 0)) for future in profile_futures]
+        return chunk_results, profile_results
+
+
+def _warm_worker(css_path: Optional[str]) -> None:
+    from pdfgen_juanipis import pagination
+    from pdfgen_juanipis.style_context import get_style_context
+
+    if css_path and pagination.WEASYPRINT_AVAILABLE:
+        get_style_context(css_path)
+
+
+def _worker_measurer(context: Tuple[Any, ...]) -> Any:
+    from pdfgen_juanipis.pagination import BlockMeasurer
+
+    measurer = _WORKER_MEASURERS.get(context)
+    if measurer is None:
+        measurer = _WORKER_MEASURERS[context] = BlockMeasurer(*context)
+    return measurer
+
+
+def _measure_chunk(context: Tuple[Any, ...], width: float, specs: List[Tuple[str, Tuple[Any, ...]]]) -> TaskResult:
+    measurer = _worker_measurer(context)
+    builders = {"html": measurer.html_probe, "text": measurer.text_probe, "table": measurer.table_probe}
+    items = [(f"probe-{idx}", builders[kind](*args)) for idx, (kind, args) in enumerate(specs)]
+    started, layouts = time.perf_counter(), measurer._layout_count
+    measured = measurer._measure_probes(items, width)
+    heights = [measured.get(probe_id) for probe_id, _ in items]
+    return heights, time.perf_counter() - started, measurer._layout_count - layouts
+
+
+def _measure_table_profile(context: Tuple[Any, ...], table: Dict[str, Any]) -> TaskResult:
+    measurer = _worker_measurer(context)
+    started, layouts = time.perf_counter(), measurer._layout_count
+    profile = measurer._measure_table_profile(table)
+    return profile, time.perf_counter() - started, measurer._layout_count - layouts
@@ -0,0 +1,96 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pdfgen_juanipis.measure_pool import WorkerPool
+
+# (plan, hint mismatches, telemetry) of one logical page, as planned by a
+# worker.
+PlanResult = Tuple[Any, List[Any], Any]
+
+# repr(paginator options) -> Paginator, per worker process.
+_WORKER_PAGINATORS: Dict[str, Any] = {}
+
+
+class PaginationPool(WorkerPool):
+    """Worker processes that cut independent logical pages (the source pages
+    of the ``pages`` form) into physical pages in parallel.
+
+    A worker builds one paginator per set of options and keeps it, so its
+    measurement caches serve every later page and document; the SQLite and
+    shared caches are shared with the caller as usual.  Workers only plan
+    the page breaks and send back where each block comes from (a source
+    block index, a table's row bounds or a split fragment), which is
+    rebuilt here against the caller's own pages; page numbers, headers and
+    page dicts are settled by the caller in one ordered pass (see
+    ``Paginator.paginate``).  A failed task yields ``None`` and leaves that
+    page to the caller.
+    """
+
+    pool_name = "Pagination"
+    task_name = "pagination"
+
+    def __init__(self, workers: Optional[int] = None, start_method: Optional[str] = None):
+        super().__init__(workers, start_method)
+
+    def plan(
+        self,
+        options: Dict[str, Any],
+        pages: Sequence[Dict[str, Any]],
+        seeds: Optional[Sequence[Sequence[Tuple[Any, Any]]]] = None,
+    ) -> List[Optional[PlanResult]]:
+        """Plans of *pages*, in order, by paginators built with *options*.
+
+        ``seeds[i]`` holds ``(cache key, measurement)`` pairs already known
+        for ``pages[i]``; the worker caches them before planning.
+        """
+        seeds = seeds or [()] * len(pages)
+        futures = [self._submit(_plan_page, options, page, list(seed)) for page, seed in zip(pages, seeds)]
+        results = []
+        for future, page in zip(futures, pages):
+            result = self._task_result(future, None)
+            if result is not None:
+                _decode_items(result[0], page.get("blocks", []))
+            results.append(result)
+        return results
+
+
+def _worker_paginator(options: Dict[str, Any]) -> Any:
+    from pdfgen_juanipis.pagination import Paginator
+
+    key = repr(sorted(options.items()))
+    paginator = _WORKER_PAGINATORS.get(key)
+    if paginator is None:
+        paginator = _WORKER_PAGINATORS[key] = Paginator(**options)
+    return paginator
+
+
+def _plan_page(options: Dict[str, Any], page: Dict[str, Any], seed: List[Tuple[Any, Any]]) -> PlanResult:
+    from pdfgen_juanipis.telemetry import MeasureTelemetry
+
+    paginator = _worker_paginator(options)
+    for key, value in seed:
+        paginator.measurer.cache.set(key, value)
+    # Fresh counters per task, merged into the caller's.
+    telemetry = paginator.measurer.telemetry = MeasureTelemetry()
+    paginator.hint_mismatches = []
+    plan = paginator._plan_logical_page(page)
+    _encode_items(plan, page.get("blocks", []))
+    return plan, paginator.hint_mismatches, telemetry
+
+
+def _encode_items(plan: Any, blocks: Sequence[Dict[str, Any]]) -> None:
+    """Swap every placed block for its pagination-plan entry, so no copy
+    of the page's blocks or table rows travels back to the caller."""
+    from pdfgen_juanipis.plan import _SourceIndex
+
+    index = _SourceIndex(blocks)
+    for build in plan.builds:
+        for item in build.blocks:
+            item.data = index.encode(item.data)
+
+
+def _decode_items(plan: Any, blocks: Sequence[Dict[str, Any]]) -> None:
+    from pdfgen_juanipis.plan import _decode_block
+
+    for build in plan.builds:
+        for item in build.blocks:
+            item.data = _decode_block(blocks, item.data)
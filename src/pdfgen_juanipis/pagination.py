@@ -1,22 +1,72 @@
+import array
+import bisect
+import collections.abc
 import dataclasses
+import html as _html
+import itertools
 import logging
 import math
 import os
 import re
+import sys
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 try:
-    from weasyprint import HTML, CSS
+    from weasyprint import HTML
 
     WEASYPRINT_AVAILABLE = True
 except Exception:  # pragma: no cover - optional dependency for measurement
     HTML = None
-    CSS = None
     WEASYPRINT_AVAILABLE = False
 
+from pdfgen_juanipis.blocks import RENDER_TYPES, emit_block, get_block_type
+from pdfgen_juanipis.calibration import Calibration, CalibrationRecorder
+from pdfgen_juanipis.fontmetrics import FONTTOOLS_AVAILABLE, AnalyticLayout
+from pdfgen_juanipis.measure_cache import (
+    DEFAULT_MEMORY_BUDGET,
+    MISSING,
+    CacheStats,
+    MemoryCache,
+    PersistentHeightCache,
+    layout_key,
+    measurement_fingerprint,
+    probe_digest,
+    stylesheet_signature,
+    table_layout_key,
+)
+from pdfgen_juanipis.measure_pool import PARALLEL_PROBE_KINDS, PROBES_PER_TASK, MeasurementPool
+from pdfgen_juanipis.page_pool import PaginationPool
+from pdfgen_juanipis.plan import PaginationPlan, encode_pages, plan_fingerprint
+from pdfgen_juanipis.shared_cache import SharedHeightCache, shared_cache_from_env
+from pdfgen_juanipis.style_context import StyleContext, get_style_context
+from pdfgen_juanipis.telemetry import Fragment, MeasureTelemetry
+
 LOGGER = logging.getLogger(__name__)
 CSS_PX_TO_PT = 72.0 / 96.0
+MEASURE_MODES = ("weasyprint", "analytic", "estimate")
+# Fixed part of _estimate_refs_height (rule and spacing above the refs).
+REFS_CHROME_ESTIMATE_PT = 6.0
+# Largest difference between a height hint and its measured height that
+# verification accepts.
+HINT_TOLERANCE_PT = 1.0
+PAGE_BREAKERS = ("greedy", "optimal")
+# Weights of the optimal breaker's cost function.  Every page costs "page",
+# more than the worst unused space ("slack" times the squared unused
+# fraction, not charged on the last page), so fewer pages always win.
+# "split_table" is charged per table cut at a page break, "orphan" per
+# keep-with-next block left at the bottom of a page and "overflow" per
+# block forced onto a page it does not fit.
+PAGE_BREAK_COSTS = {"page": 1000.0, "slack": 100.0, "split_table": 40.0, "orphan": 2000.0, "overflow": 10000.0}
+# Memory budget of the HTML fragment scans (see HtmlFragment) kept per
+# process, and their approximate size per character of HTML once every scan
+# (elements, chunks, word tokens) has been filled in.
+FRAGMENT_CACHE_BYTES = 64 * 1024 * 1024
+FRAGMENT_BYTES_PER_CHAR = 24
+# Table rows rendered for a table's telemetry excerpt.
+TELEMETRY_EXCERPT_ROWS = 3
 
 
 @dataclasses.dataclass(frozen=True)
@@ -49,6 +99,12 @@ class LayoutConfig:
     min_content_height_pt: float = 48.0
     header_title_align: str = "center"
     header_subtitle_align: str = "center"
+    # "chunks" re-measures growing candidate strings; "lines" lays a block out
+    # once and cuts it at line boxes, also splitting blocks to fill pages.
+    html_split_mode: str = "chunks"
+    # "greedy" fills each page in turn; "optimal" chooses every break at once
+    # to minimise PAGE_BREAK_COSTS (fewer, fuller pages) at some CPU cost.
+    page_breaker: str = "greedy"
 
     def to_template(self) -> Dict[str, float]:
         return {
@@ -67,16 +123,269 @@ class PageLayoutState:
     footer_meta_bottom_pt: float
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
+class HeaderGeometry:
+    title_top_pt: float
+    subtitle_top_pt: float
+    bottom_pt: float
+    title_style: Dict[str, Any]
+    subtitle_style: Dict[str, Any]
+
+
+@dataclasses.dataclass(frozen=True)
+class PageGeometry:
+    """Page geometry that depends only on the theme (header titles, footer
+    contact), the ``LayoutConfig`` and the stylesheet.
+
+    It is computed once per combination and shared by every logical page and
+    document using it; only the intro and footer-meta heights remain per
+    page.
+    """
+
+    header_with_titles: HeaderGeometry
+    header_without_titles: HeaderGeometry
+    footer_contact_height_pt: float
+    footer_page_height_pt: float
+
+    def header(self, show_titles: bool) -> HeaderGeometry:
+        return self.header_with_titles if show_titles else self.header_without_titles
+
+
+@dataclasses.dataclass(frozen=True)
+class TableProfile:
+    """Row geometry of a table laid out once in full.
+
+    ``row_offsets_pt[k]`` is the height of the first ``k`` body rows, so the
+    height of any row range and the number of rows fitting a budget are
+    lookups instead of new layouts.  ``chrome_height_pt`` covers the table
+    margins and borders that every chunk pays once.
+    """
+
+    header_height_pt: float
+    chrome_height_pt: float
+    row_offsets_pt: Tuple[float, ...]
+
+    @property
+    def row_count(self) -> int:
+        return len(self.row_offsets_pt) - 1
+
+    def height(self, start: int, end: int, show_header: bool) -> float:
+        rows_height = self.row_offsets_pt[end] - self.row_offsets_pt[start]
+        header_height = self.header_height_pt if show_header else 0.0
+        return self.chrome_height_pt + header_height + rows_height
+
+    def rows_that_fit(self, start: int, max_height_pt: float, show_header: bool) -> int:
+        budget = max_height_pt - self.chrome_height_pt
+        if show_header:
+            budget -= self.header_height_pt
+        if budget < 0:
+            return 0
+        end = bisect.bisect_right(self.row_offsets_pt, self.row_offsets_pt[start] + budget) - 1
+        return max(0, min(end, self.row_count) - start)
+
+
+class RowRange(collections.abc.Sequence):
+    """Read-only view of ``rows[start:end]`` that shares the underlying list.
+
+    Table chunks hold one of these instead of a copied row list, so
+    splitting a table never copies rows; slicing a view returns a view of
+    the same list.
+    """
+
+    __slots__ = ("_rows", "_start", "_end")
+
+    def __init__(self, rows: Sequence[Any], start: int = 0, end: Optional[int] = None):
+        if isinstance(rows, RowRange):
+            base = rows._start
+            end = rows._end if end is None else min(base + end, rows._end)
+            start, rows = base + start, rows._rows
+        self._rows = rows
+        self._start = start
+        self._end = len(rows) if end is None else end
+
+    @property
+    def base(self) -> Sequence[Any]:
+        """The row sequence this view reads from (never another view)."""
+        return self._rows
+
+    @property
+    def bounds(self) -> Tuple[int, int]:
+        """``(start, end)`` of the view in :attr:`base`."""
+        return self._start, self._end
+
+    def __len__(self) -> int:
+        return max(0, self._end - self._start)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return list(self)[index]
+            return RowRange(self, start, stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("row index out of range")
+        return self._rows[self._start + index]
+
+    def __iter__(self):
+        if isinstance(self._rows, list):
+            return itertools.islice(self._rows, self._start, self._end)
+        return map(self._rows.__getitem__, range(self._start, self._end))
+
+    def __eq__(self, other: object) -> bool:
+        return _sequence_eq(self, other)
+
+    def __repr__(self) -> str:
+        return f"RowRange({list(self)!r})"
+
+    def columns(self) -> Optional[Tuple[List[Any], List[Any], List[int]]]:
+        """The view's columns (see :meth:`ColumnarRows.columns`), or
+        ``None`` when it does not view a :class:`ColumnarRows`."""
+        if isinstance(self._rows, ColumnarRows):
+            return self._rows.columns(self._start, self._end)
+        return None
+
+
+class ColumnarRows(collections.abc.Sequence):
+    """Table rows stored by column instead of as ``{"dep", "vals"}`` dicts.
+
+    Department names go in one list and every row's values in one flat
+    list, delimited by an ``array`` of row offsets; repeated strings are
+    interned, so a 100k-row table costs a few pointers per cell.  Indexing
+    yields a :class:`TableRow` made on demand and slicing a
+    :class:`RowRange`, so the template, ``build_table_html`` and table
+    chunks read it like the list of dicts it replaces.  ``render_pdf``
+    converts every table once it is validated.
+    """
+
+    __slots__ = ("deps", "values", "offsets")
+
+    def __init__(self, rows: Iterable[Any] = ()):
+        pool: Dict[str, str] = {}
+        self.deps: List[Any] = []
+        self.values: List[Any] = []
+        self.offsets = array.array("Q", [0])
+        for row in rows:
+            self.deps.append(_pooled(pool, row.get("dep", "")))
+            self.values.extend(_pooled(pool, value) for value in row.get("vals") or ())
+            self.offsets.append(len(self.values))
+
+    def __len__(self) -> int:
+        return len(self.deps)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return list(self)[index]
+            return RowRange(self, start, stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("row index out of range")
+        return TableRow(self, index)
+
+    def __eq__(self, other: object) -> bool:
+        return _sequence_eq(self, other)
+
+    def __repr__(self) -> str:
+        # Carries the contents, so layout_key() tells tables apart.
+        return f"ColumnarRows(deps={self.deps!r}, values={self.values!r}, offsets={self.offsets.tolist()!r})"
+
+    def columns(self, start: int = 0, end: Optional[int] = None) -> Tuple[List[Any], List[Any], List[int]]:
+        """Department names, flat values and per-row value counts of rows
+        *start* to *end*, for hashing a table without building its rows."""
+        end = len(self) if end is None else end
+        offsets = self.offsets[start : end + 1]
+        counts = [stop - begin for begin, stop in zip(offsets, offsets[1:])]
+        return self.deps[start:end], self.values[offsets[0] : offsets[-1]], counts
+
+
+class TableRow(collections.abc.Mapping):
+    """One row of a :class:`ColumnarRows` table, read like its
+    ``{"dep": ..., "vals": [...]}`` dict; ``row.dep`` and ``row.vals`` work
+    too.  ``vals`` is a view of the table's flat value list."""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: ColumnarRows, index: int):
+        self._table = table
+        self._index = index
+
+    @property
+    def dep(self) -> Any:
+        return self._table.deps[self._index]
+
+    @property
+    def vals(self) -> RowRange:
+        offsets = self._table.offsets
+        return RowRange(self._table.values, offsets[self._index], offsets[self._index + 1])
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "dep":
+            return self.dep
+        if key == "vals":
+            return self.vals
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(("dep", "vals"))
+
+    def __len__(self) -> int:
+        return 2
+
+    def __repr__(self) -> str:
+        return f"TableRow(dep={self.dep!r}, vals={list(self.vals)!r})"
+
+
+def _sequence_eq(left: Sequence[Any], right: object) -> bool:
+    if not isinstance(right, collections.abc.Sequence) or isinstance(right, str):
+        return NotImplemented
+    return len(left) == len(right) and all(a == b for a, b in zip(left, right))
+
+
+def _pooled(pool: Dict[str, str], value: Any) -> Any:
+    return pool.setdefault(value, value) if isinstance(value, str) else value
+
+
+def compact_table_rows(pages: Iterable[Dict[str, Any]]) -> None:
+    """Store the rows of every table block in *pages* as
+    :class:`ColumnarRows`, in place."""
+    for page in pages:
+        for block in page.get("blocks", []):
+            table = block.get("table") if block.get("type") == "table" else None
+            if isinstance(table, dict) and isinstance(table.get("rows"), list):
+                table["rows"] = ColumnarRows(table["rows"])
+
+
+@dataclasses.dataclass(frozen=True)
+class HtmlLineProfile:
+    """Vertical geometry of an HTML block's top-level elements and lines.
+
+    Offsets are in points from the top of the block.  Each line entry is
+    ``(top, bottom, chars)`` where ``chars`` counts the non-whitespace
+    characters of the element's text up to the end of that line.  Elements
+    that do not hold inline content only have their extent recorded.
+    """
+
+    elements: Tuple[str, ...]
+    element_extents: Tuple[Tuple[float, float], ...]
+    element_lines: Tuple[Tuple[Tuple[float, float, int], ...], ...]
+
+
+@dataclasses.dataclass(slots=True)
 class BlockItem:
     data: Dict[str, Any]
     height_pt: float
     keep_with_next: bool = False
     refs: List[str] = dataclasses.field(default_factory=list)
     notes: List[str] = dataclasses.field(default_factory=list)
+    table_profile: Optional[TableProfile] = None
+    row_start: int = 0
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class PageBuild:
     blocks: List[BlockItem]
     height_pt: float
@@ -84,98 +393,690 @@ class PageBuild:
     notes: List[str]
 
 
+@dataclasses.dataclass
+class LogicalPagePlan:
+    """How one source page was cut into physical pages.
+
+    The incremental fields are only filled by :meth:`Paginator.repaginate`:
+    ``context_key`` digests everything but the blocks, ``block_keys`` and
+    ``groups`` hold each source block's digest and normalized items (before
+    refs are distributed), ``item_keys`` identify the distributed items and
+    ``starts`` is the greedy cursor position, and height left to place, at
+    the top of every page.
+    """
+
+    builds: List[PageBuild]
+    layout_first: PageLayoutState
+    layout_other: PageLayoutState
+    has_meta: bool
+    page_level_refs: List[str]
+    context_key: Optional[bytes] = None
+    block_keys: List[bytes] = dataclasses.field(default_factory=list)
+    groups: List[List[BlockItem]] = dataclasses.field(default_factory=list)
+    item_keys: List[Tuple[Any, ...]] = dataclasses.field(default_factory=list)
+    starts: List[Tuple[int, Optional[BlockItem], float]] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass
+class PaginationResult:
+    """Pages from :meth:`Paginator.repaginate` and, per source page, the
+    plan to reuse when the document is re-paginated after an edit
+    (``None`` for covers)."""
+
+    pages: List[Dict[str, Any]]
+    plans: List[Optional[LogicalPagePlan]]
+
+
+@dataclasses.dataclass(frozen=True)
+class HintMismatch:
+    """A ``height_pt``/``row_heights_pt`` hint that verification rejected."""
+
+    block_type: str
+    hinted_pt: float
+    measured_pt: float
+
+
+@dataclasses.dataclass(frozen=True)
+class MeasureProbe:
+    """A single fragment to lay out, as built by the ``*_probe`` helpers.
+
+    ``render`` receives the element id to use for the measured box and
+    returns the body HTML.  ``key`` is the ``layout_key`` digest used for
+    caching (``None`` disables it), ``fallback`` estimates the height when WeasyPrint is not
+    available and ``pad_pt`` is added to the final height.  ``kind`` and
+    ``args`` describe the probe for engines that do not need the HTML.
+    """
+
+    key: Optional[bytes]
+    render: Callable[[str], str]
+    fallback: Callable[[], float]
+    content_width: Optional[float] = None
+    pad_pt: float = 0.0
+    kind: str = "html"
+    args: Tuple[Any, ...] = ()
+
+
 class BlockMeasurer:
-    def __init__(self, css_path: str, base_url: str, layout: LayoutConfig):
+    def __init__(
+        self,
+        css_path: str,
+        base_url: str,
+        layout: LayoutConfig,
+        persistent_cache: Optional[PersistentHeightCache] = None,
+        calibration: Optional[Calibration] = None,
+        recorder: Optional[CalibrationRecorder] = None,
+        cache_budget_bytes: int = DEFAULT_MEMORY_BUDGET,
+        shared_cache: Optional[SharedHeightCache] = None,
+        telemetry: Optional[MeasureTelemetry] = None,
+    ):
         self.css_path = css_path
         self.base_url = base_url
         self.layout = layout
-        self._height_cache: Dict[Tuple[Any, ...], float] = {}
+        self.persistent_cache = persistent_cache
+        # Heights shared with other processes through a memory-mapped table;
+        # checked after the in-process cache and before SQLite.
+        self.shared_cache = shared_cache
+        # ``calibration`` corrects the fallback estimates; ``recorder``
+        # collects every real layout as a calibration sample.
+        self.calibration = calibration
+        self.recorder = recorder
+        # Heights, table profiles and line profiles share one LRU budget;
+        # keys are layout_key() digests namespaced by their first part.
+        self.cache = MemoryCache(max_bytes=cache_budget_bytes)
+        self._engines: Dict[float, AnalyticLayout] = {}
+        # Resolved on the first probe layout, like the analytic engines.
+        self._style_context: Optional[StyleContext] = None
+        self.telemetry = telemetry if telemetry is not None else MeasureTelemetry()
+        # WeasyPrint layouts run so far, for attributing them to probe kinds.
+        self._layout_count = 0
+
+    @property
+    def cache_stats(self) -> CacheStats:
+        return self.cache.stats
 
     def measure_html(self, html_fragment: str) -> float:
-        key = ("html", html_fragment)
-        cached = self._height_cache.get(key)
-        if cached is not None:
-            return cached
+        return self.measure_batch([self.html_probe(html_fragment)])[0]
 
-        height = self._measure_with_weasyprint(
-            f"<div class=\"content\"><div id=\"probe\">{html_fragment}</div></div>",
-            "probe",
-        )
-        if height is None:
-            height = self._estimate_html_height(html_fragment)
-        self._height_cache[key] = height
-        return height
+    def measure_html_batch(self, html_fragments: List[str]) -> List[float]:
+        return self.measure_batch([self.html_probe(fragment) for fragment in html_fragments])
 
     def measure_text_block(self, text: str, class_name: str) -> float:
-        key = ("text", class_name, text)
-        cached = self._height_cache.get(key)
-        if cached is not None:
-            return cached
-
-        html = f"<div id=\"probe\" class=\"{class_name}\">{text}</div>"
-        height = self._measure_with_weasyprint(html, "probe")
-        if height is None:
-            height = self._estimate_text_height(text, class_name)
-        self._height_cache[key] = height
-        return height
+        return self.measure_batch([self.text_probe(text, class_name)])[0]
 
     def measure_table(self, table: Dict[str, Any], show_header: bool) -> float:
-        rows_key = tuple(tuple(row.get("vals", [])) + (row.get("dep", ""),) for row in table["rows"])
-        key = ("table", show_header, rows_key)
-        cached = self._height_cache.get(key)
+        return self.measure_batch([self.table_probe(table, show_header)])[0]
+
+    def measure_table_profile(self, table: Dict[str, Any]) -> TableProfile:
+        key = layout_key("table_profile", table_layout_key(table))
+        cached = self.cache.get(key)
         if cached is not None:
+            self.telemetry.record_hit("table_profile")
             return cached
 
-        html = build_table_html(table, show_header=show_header)
-        content_width = table.get("total_width") or self.layout.content_width_pt
-        height = self._measure_with_weasyprint(html, "probe-table", content_width=content_width)
-        if height is None:
-            height = self._estimate_table_height(table, show_header)
-        self._height_cache[key] = height
-        return height
+        started, layouts = time.perf_counter(), self._layout_count
+        profile = self._measure_table_profile(table)
+        if profile is None:
+            profile = self._estimate_table_profile(table)
+        elif self.recorder is not None:
+            self._record_table_profile(table, profile)
+        self.telemetry.record_measurement(
+            [("table_profile", _table_fragment(table))],
+            time.perf_counter() - started,
+            self._layout_count - layouts,
+        )
+        self.cache.set(key, profile)
+        return profile
+
+    def hinted_table_profile(self, table: Dict[str, Any], row_heights: Sequence[float]) -> TableProfile:
+        """Profile of *table* from caller-supplied row heights.  Only the
+        header and chrome are measured, once per column layout."""
+        frame = self.measure_table_profile(dict(table, rows=[]))
+        offsets = [0.0]
+        for height in row_heights:
+            offsets.append(offsets[-1] + height)
+        return TableProfile(
+            header_height_pt=frame.header_height_pt,
+            chrome_height_pt=frame.chrome_height_pt,
+            row_offsets_pt=tuple(offsets),
+        )
+
+    def measure_html_lines(self, html_fragment: str) -> Optional[HtmlLineProfile]:
+        """Lay out *html_fragment* once and record its line boxes.
+
+        Returns ``None`` when WeasyPrint is unavailable or the fragment is
+        not a sequence of top-level elements.
+        """
+        key = layout_key("lines", html_fragment)
+        cached = self.cache.get(key, MISSING)
+        if cached is not MISSING:
+            self.telemetry.record_hit("lines")
+            return cached
+        started, layouts = time.perf_counter(), self._layout_count
+        profile = self._measure_line_profile(html_fragment)
+        self.telemetry.record_measurement(
+            [("lines", html_fragment)], time.perf_counter() - started, self._layout_count - layouts
+        )
+        self.cache.set(key, profile)
+        return profile
 
     def measure_footer_meta(self, refs: List[str], notes: List[str]) -> float:
+        """Footer-meta height as the sum of its per-ref and per-note heights
+        plus the block's fixed chrome.
+
+        Items are measured (and cached) one by one, so growing a page's ref
+        list only lays out the new refs.  Equivalent to measuring the whole
+        ``footer_meta_probe`` because every ref and note is its own block.
+        """
         if not refs and not notes:
             return 0.0
+        items_height = sum(self.measure_batch(self.footer_meta_item_probes(refs, notes)))
+        return items_height + self._footer_meta_chrome(refs[:1], notes[:1]) + _footer_meta_safety(refs)
+
+    def measure_footer_contact(self, site: str, phone: str) -> float:
+        return self.measure_batch([self.footer_contact_probe(site, phone)])[0]
+
+    def measure_footer_page(self, page_number: str) -> float:
+        return self.measure_batch([self.footer_page_probe(page_number)])[0]
+
+    def html_probe(self, html_fragment: str) -> MeasureProbe:
+        return MeasureProbe(
+            key=get_html_fragment(html_fragment).layout_key,
+            render=lambda probe_id: (
+                f"<div class=\"content\"><div id=\"{probe_id}\">{html_fragment}</div></div>"
+            ),
+            fallback=lambda: self._estimate_html_height(html_fragment),
+            kind="html",
+            args=(html_fragment,),
+        )
+
+    def text_probe(self, text: str, class_name: str) -> MeasureProbe:
+        return MeasureProbe(
+            key=layout_key("text", class_name, text),
+            render=lambda probe_id: f"<div id=\"{probe_id}\" class=\"{class_name}\">{text}</div>",
+            fallback=lambda: self._estimate_text_height(text, class_name),
+            kind="text",
+            args=(text, class_name),
+        )
+
+    def table_probe(self, table: Dict[str, Any], show_header: bool) -> MeasureProbe:
+        return MeasureProbe(
+            key=layout_key("table", show_header, table_layout_key(table)),
+            render=lambda probe_id: build_table_html(table, show_header=show_header, table_id=probe_id),
+            fallback=lambda: self._estimate_table_height(table, show_header),
+            content_width=table.get("total_width") or self.layout.content_width_pt,
+            kind="table",
+            args=(table, show_header),
+        )
+
+    def footer_meta_probe(self, refs: List[str], notes: List[str]) -> Optional[MeasureProbe]:
+        if not refs and not notes:
+            return None
         refs_html = "".join(f"<div class=\"refs-text\">{ref}</div>" for ref in refs)
         notes_html = "".join(f"<div>{note}</div>" for note in notes)
-        html = """
-        <div id=\"probe\" class=\"footer-meta\">
-          {refs_block}
-          {notes_block}
-        </div>
-        """.format(
-            refs_block=(
-                f"<div class=\"refs\"><div class=\"refs-line\"></div>{refs_html}</div>"
-                if refs
-                else ""
+        refs_block = (
+            f"<div class=\"refs\"><div class=\"refs-line\"></div>{refs_html}</div>" if refs else ""
+        )
+        notes_block = f"<div class=\"footer-notes\">{notes_html}</div>" if notes else ""
+        return MeasureProbe(
+            key=layout_key("footer_meta", tuple(refs), tuple(notes)),
+            render=lambda probe_id: (
+                f"<div id=\"{probe_id}\" class=\"footer-meta\">{refs_block}{notes_block}</div>"
             ),
-            notes_block=(f"<div class=\"footer-notes\">{notes_html}</div>" if notes else ""),
+            fallback=lambda: self._estimate_refs_height(refs) + self._estimate_notes_height(notes),
+            pad_pt=_footer_meta_safety(refs),
+            kind="footer_meta",
+            args=(tuple(refs), tuple(notes)),
         )
-        height = self._measure_with_weasyprint(html, "probe")
-        if height is None:
-            height = self._estimate_refs_height(refs) + self._estimate_notes_height(notes)
-        # Keep this conservative: small font metric differences (fallbacks,
-        # italics, accented glyphs) can under-measure footer refs and cause
-        # visual overlap with the content block in the final render.
-        safety_buffer = 8.0 + (1.5 if refs else 0.0)
-        return height + safety_buffer
 
-    def measure_footer_contact(self, site: str, phone: str) -> float:
-        html = f"<div id=\"probe\" class=\"footer-contact\"><div>{site}</div><div>{phone}</div></div>"
-        height = self._measure_with_weasyprint(html, "probe")
-        if height is None:
-            height = 22.0
-        return height
+    def footer_meta_item_probes(self, refs: List[str], notes: List[str]) -> List[MeasureProbe]:
+        """One probe per ref and note, laid out inside the footer-meta
+        containers so widths and inherited styles match the full block."""
+        probes = [
+            MeasureProbe(
+                key=layout_key("footer_ref", ref),
+                render=lambda probe_id, ref=ref: (
+                    f"<div class=\"footer-meta\"><div class=\"refs\">"
+                    f"<div id=\"{probe_id}\" class=\"refs-text\">{ref}</div></div></div>"
+                ),
+                fallback=lambda ref=ref: self._estimate_refs_height([ref]) - REFS_CHROME_ESTIMATE_PT,
+                kind="footer_ref",
+                args=(ref,),
+            )
+            for ref in refs
+        ]
+        probes.extend(
+            MeasureProbe(
+                key=layout_key("footer_note", note),
+                render=lambda probe_id, note=note: (
+                    f"<div class=\"footer-meta\"><div class=\"footer-notes\">"
+                    f"<div id=\"{probe_id}\">{note}</div></div></div>"
+                ),
+                fallback=lambda note=note: self._estimate_notes_height([note]),
+                kind="footer_note",
+                args=(note,),
+            )
+            for note in notes
+        )
+        return probes
 
-    def measure_footer_page(self, page_number: str) -> float:
+    def footer_contact_probe(self, site: str, phone: str) -> MeasureProbe:
+        return MeasureProbe(
+            key=layout_key("footer_contact", site, phone),
+            render=lambda probe_id: (
+                f"<div id=\"{probe_id}\" class=\"footer-contact\"><div>{site}</div><div>{phone}</div></div>"
+            ),
+            fallback=lambda: 22.0,
+            kind="footer_contact",
+            args=(site, phone),
+        )
+
+    def footer_page_probe(self, page_number: str) -> Optional[MeasureProbe]:
         if not page_number:
-            return 0.0
-        html = f"<div id=\"probe\" class=\"footer-page\">{page_number}</div>"
-        height = self._measure_with_weasyprint(html, "probe")
-        if height is None:
-            height = 8.0
-        return height
+            return None
+        return MeasureProbe(
+            key=layout_key("footer_page", page_number),
+            render=lambda probe_id: f"<div id=\"{probe_id}\" class=\"footer-page\">{page_number}</div>",
+            fallback=lambda: 8.0,
+            kind="footer_page",
+            args=(page_number,),
+        )
+
+    def _footer_meta_chrome(self, sample_refs: List[str], sample_notes: List[str]) -> float:
+        """Height of the footer-meta block beyond its items (top margin,
+        padding, refs rule and collapsed margins), derived once per
+        refs/notes combination from a one-item measurement."""
+        key = layout_key("footer_meta_chrome", bool(sample_refs), bool(sample_notes))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        full_probe = self.footer_meta_probe(sample_refs, sample_notes)
+        full_height, *item_heights = self.measure_batch(
+            [full_probe, *self.footer_meta_item_probes(sample_refs, sample_notes)]
+        )
+        chrome = full_height - full_probe.pad_pt - sum(item_heights)
+        self.cache.set(key, chrome)
+        return chrome
+
+    def measure_batch(self, probes: Sequence[Optional[MeasureProbe]]) -> List[float]:
+        """Measure many probes, laying out every cache miss in one document.
+
+        Probes are grouped by content width (it is baked into
+        ``MEASURE_CSS``) and each group is rendered once.  ``None`` entries
+        measure as ``0.0``.
+        """
+        heights: List[Optional[float]] = [None] * len(probes)
+        pending: Dict[Any, List[int]] = {}
+        for idx, probe in enumerate(probes):
+            if probe is None:
+                heights[idx] = 0.0
+                continue
+            if probe.key is not None:
+                cached = self.cache.get(probe.key)
+                if cached is not None:
+                    self.telemetry.record_hit(probe.kind)
+                    heights[idx] = cached + probe.pad_pt
+                    continue
+                pending.setdefault(probe.key, []).append(idx)
+            else:
+                pending[("uncached", idx)] = [idx]
+
+        if pending and self.shared_cache is not None:
+            self._load_shared(probes, pending, heights)
+        if pending and self.persistent_cache is not None:
+            self._load_persistent(probes, pending, heights)
+
+        if pending:
+            groups: Dict[float, List[Tuple[str, MeasureProbe]]] = {}
+            for slot, indices in enumerate(pending.values()):
+                probe = probes[indices[0]]
+                width = probe.content_width or self.layout.content_width_pt
+                groups.setdefault(width, []).append((f"probe-{slot}", probe))
+
+            measured: Dict[str, Optional[float]] = {}
+            derived: Dict[str, float] = {}
+            for width, items in groups.items():
+                started, layouts = time.perf_counter(), self._layout_count
+                remaining = []
+                for probe_id, probe in items:
+                    height = self._image_probe_height(probe, probe_id, width)
+                    if height is None:
+                        remaining.append((probe_id, probe))
+                    else:
+                        derived[probe_id] = height
+                if remaining:
+                    measured.update(self._measure_probes(remaining, width))
+                self.telemetry.record_measurement(
+                    [(probe.kind, _probe_fragment(probe)) for _, probe in items],
+                    time.perf_counter() - started,
+                    self._layout_count - layouts,
+                )
+
+            real: List[Tuple[MeasureProbe, float]] = []
+            for slot, indices in enumerate(pending.values()):
+                probe = probes[indices[0]]
+                height = measured.get(f"probe-{slot}")
+                if height is None:
+                    # Derived and estimated heights stay in memory: only real
+                    # layouts reach the shared tiers and the recorder.
+                    height = derived.get(f"probe-{slot}")
+                    if height is None:
+                        height = self._estimate_probe(probe)
+                    if probe.key is not None:
+                        self.cache.set(probe.key, height)
+                else:
+                    real.append((probe, height))
+                for idx in indices:
+                    heights[idx] = height + probe.pad_pt
+            self._store_measured(real)
+
+        return [float(height or 0.0) for height in heights]
+
+    def prefetch(
+        self,
+        probes: Sequence[Optional[MeasureProbe]],
+        tables: Sequence[Dict[str, Any]],
+        pool: MeasurementPool,
+    ) -> None:
+        """Lay out the cache misses among *probes* and the row profiles of
+        *tables* on *pool*'s worker processes and cache the results, so the
+        ``measure_*`` calls that follow are hits.
+
+        Every cache tier is checked first.  Figures and map grids are left
+        to the image-header shortcut, and probes whose layout failed in a
+        worker to the serial path.
+        """
+        pending: Dict[Any, List[int]] = {}
+        for idx, probe in enumerate(probes):
+            if probe is None or probe.key is None or probe.kind not in PARALLEL_PROBE_KINDS:
+                continue
+            if probe.key in pending:
+                pending[probe.key].append(idx)
+            elif self.cache.get(probe.key) is None and not _is_image_probe(probe):
+                pending[probe.key] = [idx]
+        heights: List[Optional[float]] = [None] * len(probes)
+        if pending and self.shared_cache is not None:
+            self._load_shared(probes, pending, heights)
+        if pending and self.persistent_cache is not None:
+            self._load_persistent(probes, pending, heights)
+
+        groups: Dict[float, List[MeasureProbe]] = {}
+        for indices in pending.values():
+            probe = probes[indices[0]]
+            groups.setdefault(probe.content_width or self.layout.content_width_pt, []).append(probe)
+        chunks = [
+            (width, group[start : start + PROBES_PER_TASK])
+            for width, group in groups.items()
+            for start in range(0, len(group), PROBES_PER_TASK)
+        ]
+        profile_tables: Dict[bytes, Dict[str, Any]] = {}
+        for table in tables:
+            key = layout_key("table_profile", table_layout_key(table))
+            if key not in profile_tables and self.cache.get(key) is None:
+                profile_tables[key] = table
+        if not chunks and not profile_tables:
+            return
+
+        chunk_results, profile_results = pool.measure(
+            self.css_path,
+            self.base_url,
+            self.layout,
+            [(width, [(probe.kind, probe.args) for probe in group]) for width, group in chunks],
+            list(profile_tables.values()),
+        )
+        real: List[Tuple[MeasureProbe, float]] = []
+        for (_, group), (chunk_heights, elapsed_s, layouts) in zip(chunks, chunk_results):
+            done = [(probe, height) for probe, height in zip(group, chunk_heights) if height is not None]
+            self.telemetry.record_measurement(
+                [(probe.kind, _probe_fragment(probe)) for probe, _ in done], elapsed_s, layouts
+            )
+            real.extend(done)
+        self._store_measured(real)
+        for (key, table), (profile, elapsed_s, layouts) in zip(profile_tables.items(), profile_results):
+            if profile is None:
+                continue
+            self.telemetry.record_measurement(
+                [("table_profile", _table_fragment(table))], elapsed_s, layouts
+            )
+            if self.recorder is not None:
+                self._record_table_profile(table, profile)
+            self.cache.set(key, profile)
+
+    def _store_measured(self, measured: Sequence[Tuple[MeasureProbe, float]]) -> None:
+        """Keep real layouts in every cache tier and the calibration recorder."""
+        to_persist: List[Tuple[str, float]] = []
+        to_share: List[Tuple[bytes, float]] = []
+        for probe, height in measured:
+            if self.recorder is not None:
+                self._record_probe(probe, height)
+            if probe.key is None:
+                continue
+            self.cache.set(probe.key, height)
+            if self.persistent_cache is not None:
+                # Only real layouts are persisted, never fallback estimates.
+                to_persist.append((probe_digest(probe.key, probe.content_width), height))
+            if self.shared_cache is not None:
+                to_share.append((_shared_digest(probe), height))
+        if to_persist:
+            self.persistent_cache.set_many(to_persist)
+        if to_share:
+            self.shared_cache.set_many(to_share)
+
+    def _analytic_engine(self, content_width: Optional[float] = None) -> AnalyticLayout:
+        if content_width is None:
+            content_width = self.layout.content_width_pt
+        engine = self._engines.get(content_width)
+        if engine is None:
+            engine = AnalyticLayout(
+                self.css_path,
+                self.layout.page_width_pt,
+                extra_css=MEASURE_CSS.format(content_width=content_width),
+                base_url=self.base_url,
+            )
+            self._engines[content_width] = engine
+        return engine
+
+    def _image_probe_height(self, probe: MeasureProbe, probe_id: str, content_width: float) -> Optional[float]:
+        """Figures, map grids and chart panels measured from image headers
+        and the stylesheet, so images are never decoded just to learn a
+        height."""
+        if not _is_image_probe(probe):
+            return None
+        return self._analytic_engine(content_width).probe_height(probe.render(probe_id), probe_id)
+
+    def _load_shared(
+        self,
+        probes: Sequence[Optional[MeasureProbe]],
+        pending: Dict[Any, List[int]],
+        heights: List[Optional[float]],
+    ) -> None:
+        digests = {
+            key: _shared_digest(probes[indices[0]])
+            for key, indices in pending.items()
+            if probes[indices[0]].key is not None
+        }
+        stored = self.shared_cache.get_many(digests.values())
+        for key, digest in digests.items():
+            height = stored.get(digest)
+            if height is None:
+                continue
+            self.cache.set(key, height)
+            self.telemetry.record_hit(probes[pending[key][0]].kind)
+            for idx in pending.pop(key):
+                heights[idx] = height + probes[idx].pad_pt
+
+    def _load_persistent(
+        self,
+        probes: Sequence[Optional[MeasureProbe]],
+        pending: Dict[Any, List[int]],
+        heights: List[Optional[float]],
+    ) -> None:
+        digests = {
+            key: probe_digest(key, probes[indices[0]].content_width)
+            for key, indices in pending.items()
+            if probes[indices[0]].key is not None
+        }
+        stored = self.persistent_cache.get_many(digests.values())
+        to_share: List[Tuple[bytes, float]] = []
+        for key, digest in digests.items():
+            height = stored.get(digest)
+            if height is None:
+                continue
+            self.cache.set(key, height)
+            indices = pending.pop(key)
+            self.telemetry.record_hit(probes[indices[0]].kind)
+            if self.shared_cache is not None:
+                to_share.append((_shared_digest(probes[indices[0]]), height))
+            for idx in indices:
+                heights[idx] = height + probes[idx].pad_pt
+        if to_share:
+            self.shared_cache.set_many(to_share)
+
+    def _measure_probes(
+        self, items: List[Tuple[str, MeasureProbe]], content_width: float
+    ) -> Dict[str, Optional[float]]:
+        if not WEASYPRINT_AVAILABLE:
+            return {}
+        if len(items) == 1:
+            probe_id, probe = items[0]
+            return {probe_id: self._measure_with_weasyprint(probe.render(probe_id), probe_id, content_width)}
+
+        # Every probe sits in its own block formatting context so margins do
+        # not collapse into its neighbours; a probe that still gets split
+        # across pages is re-measured on its own below.
+        body_html = "".join(
+            f"<div class=\"measure-item\">{probe.render(probe_id)}</div>" for probe_id, probe in items
+        )
+        document = self._render_probe_document(body_html, content_width, extra_css=BATCH_MEASURE_CSS)
+        if document is None:
+            return {}
+
+        wanted = {probe_id for probe_id, _ in items}
+        found: Dict[str, List[Any]] = {}
+        for page in document.pages:
+            for probe_id, box in _find_boxes_by_ids(page, wanted).items():
+                found.setdefault(probe_id, []).append(box)
+
+        results: Dict[str, Optional[float]] = {}
+        for probe_id, probe in items:
+            boxes = found.get(probe_id, [])
+            if len(boxes) == 1:
+                results[probe_id] = _box_height_pt(boxes[0])
+            else:
+                results[probe_id] = self._measure_with_weasyprint(
+                    probe.render(probe_id), probe_id, content_width
+                )
+        return results
+
+    def _measure_table_profile(self, table: Dict[str, Any]) -> Optional[TableProfile]:
+        if not WEASYPRINT_AVAILABLE:
+            return None
+
+        rows = table.get("rows", [])
+        content_width = table.get("total_width") or self.layout.content_width_pt
+        # A page tall enough for the whole table keeps every row on one page
+        # and avoids the repeated <thead> of a paged table.
+        tall_page_css = TALL_PAGE_CSS.format(
+            width=self.layout.page_width_pt,
+            height=max(self.layout.page_height_pt, 200.0 * (len(rows) + 2)),
+        )
+        document = self._render_probe_document(
+            build_table_html(table, show_header=True), content_width, extra_css=tall_page_css
+        )
+        if document is None or len(document.pages) != 1:
+            return None
+
+        table_box = _find_box_by_id(document.pages[0], "probe-table")
+        if table_box is None:
+            return None
+
+        header_box = None
+        row_boxes: List[Any] = []
+        for box in _iter_boxes(table_box):
+            tag = getattr(box, "element_tag", None)
+            if tag == "thead" and header_box is None:
+                header_box = box
+            elif tag == "tbody":
+                row_boxes.extend(
+                    child for child in box.children if getattr(child, "element_tag", None) == "tr"
+                )
+        if len(row_boxes) != len(rows):
+            return None
+
+        offsets = [0.0]
+        if row_boxes:
+            first_top = row_boxes[0].position_y
+            offsets.extend(
+                (row.position_y + row.height - first_top) * CSS_PX_TO_PT for row in row_boxes
+            )
+            header_height = (
+                (first_top - header_box.position_y) * CSS_PX_TO_PT if header_box is not None else 0.0
+            )
+        else:
+            header_height = _box_height_pt(header_box) if header_box is not None else 0.0
+
+        chrome_height = _box_height_pt(table_box) - header_height - offsets[-1]
+        return TableProfile(
+            header_height_pt=header_height,
+            chrome_height_pt=max(chrome_height, 0.0),
+            row_offsets_pt=tuple(offsets),
+        )
+
+    def _measure_line_profile(self, html_fragment: str) -> Optional[HtmlLineProfile]:
+        if not WEASYPRINT_AVAILABLE:
+            return None
+        elements = _top_level_elements(html_fragment)
+        if not elements:
+            return None
+
+        tall_page_css = TALL_PAGE_CSS.format(
+            width=self.layout.page_width_pt,
+            height=max(self.layout.page_height_pt, 10.0 * len(html_fragment)),
+        )
+        document = self._render_probe_document(
+            f"<div class=\"content\"><div id=\"probe\">{html_fragment}</div></div>",
+            extra_css=tall_page_css,
+        )
+        if document is None or len(document.pages) != 1:
+            return None
+        probe_box = _find_box_by_id(document.pages[0], "probe")
+        if probe_box is None:
+            return None
+
+        children = list(getattr(probe_box, "children", []) or [])
+        if len(children) != len(elements):
+            return None
+
+        origin = probe_box.position_y
+        extents: List[Tuple[float, float]] = []
+        element_lines: List[Tuple[Tuple[float, float, int], ...]] = []
+        for child, element_html in zip(children, elements):
+            # Anonymous boxes share their parent's element.
+            if getattr(child, "element", None) is probe_box.element:
+                return None
+            if getattr(child, "element_tag", None) != _element_parts(element_html)[1]:
+                return None
+            top = (child.position_y - origin) * CSS_PX_TO_PT
+            bottom = (child.position_y + child.margin_height() - origin) * CSS_PX_TO_PT
+            extents.append((top, bottom))
+
+            lines: List[Tuple[float, float, int]] = []
+            line_boxes = list(getattr(child, "children", []) or [])
+            if line_boxes and all(type(line).__name__ == "LineBox" for line in line_boxes):
+                chars = 0
+                for line in line_boxes:
+                    for box in _iter_boxes(line):
+                        text = getattr(box, "text", None)
+                        if isinstance(text, str):
+                            chars += _visible_char_count(text)
+                    line_top = (line.position_y - origin) * CSS_PX_TO_PT
+                    lines.append((line_top, line_top + line.height * CSS_PX_TO_PT, chars))
+            element_lines.append(tuple(lines))
+
+        return HtmlLineProfile(
+            elements=tuple(elements),
+            element_extents=tuple(extents),
+            element_lines=tuple(element_lines),
+        )
 
     def _measure_with_weasyprint(
         self, body_html: str, probe_id: str, content_width: Optional[float] = None
@@ -183,9 +1084,21 @@ class BlockMeasurer:
         if not WEASYPRINT_AVAILABLE:
             return None
 
+        document = self._render_probe_document(body_html, content_width)
+        if document is None or not document.pages:
+            return None
+
+        box = _find_box_by_id(document.pages[0], probe_id)
+        if box is None:
+            return None
+        return _box_height_pt(box)
+
+    def _render_probe_document(
+        self, body_html: str, content_width: Optional[float] = None, extra_css: str = ""
+    ) -> Optional[Any]:
         if content_width is None:
             content_width = self.layout.content_width_pt
-        measure_css = MEASURE_CSS.format(content_width=content_width)
+        measure_css = MEASURE_CSS.format(content_width=content_width) + extra_css
         full_html = f"""
 <!DOCTYPE html>
 <html lang=\"es\">
@@ -197,30 +1110,46 @@ class BlockMeasurer:
 </body>
 </html>
 """
+        self._layout_count += 1
         try:
-            document = HTML(string=full_html, base_url=self.base_url).render(
-                stylesheets=[
-                    CSS(filename=str(self.css_path)),
-                    CSS(string=measure_css),
-                ]
+            context = self._style_context
+            if context is None:
+                context = self._style_context = get_style_context(str(self.css_path))
+            return HTML(string=full_html, base_url=self.base_url).render(
+                stylesheets=[context.stylesheet, context.string_stylesheet(measure_css)],
+                font_config=context.font_config,
             )
         except Exception as exc:  # pragma: no cover - runtime dependency may fail
             LOGGER.warning("WeasyPrint measurement failed: %s", exc)
             return None
 
-        if not document.pages:
-            return None
-
-        box = _find_box_by_id(document.pages[0], probe_id)
-        if box is None:
-            return None
-
-        height = getattr(box, "height", 0.0) or 0.0
-        height += getattr(box, "margin_top", 0.0) or 0.0
-        height += getattr(box, "margin_bottom", 0.0) or 0.0
-        height += getattr(box, "padding_top", 0.0) or 0.0
-        height += getattr(box, "padding_bottom", 0.0) or 0.0
-        return float(height) * CSS_PX_TO_PT
+    def _estimate_probe(self, probe: MeasureProbe) -> float:
+        if self.calibration is not None:
+            if probe.kind == "table" and self.calibration.table is not None:
+                table, show_header = probe.args
+                profile = self._estimate_table_profile(table)
+                return profile.height(0, profile.row_count, show_header)
+            features = _probe_features(probe)
+            if features is not None:
+                estimate = self.calibration.estimate(*features)
+                if estimate is not None:
+                    return estimate
+        return probe.fallback()
+
+    def _record_probe(self, probe: MeasureProbe, height: float) -> None:
+        features = _probe_features(probe)
+        if features is not None:
+            self.recorder.record(features[0], features[1], height, probe.fallback())
+
+    def _record_table_profile(self, table: Dict[str, Any], profile: TableProfile) -> None:
+        offsets = profile.row_offsets_pt
+        row_heights = [offsets[idx + 1] - offsets[idx] for idx in range(profile.row_count)]
+        # Uncalibrated estimates: 40pt header, 16pt rows.
+        baseline_errors = [height - 16.0 for height in row_heights]
+        baseline_errors.append(profile.header_height_pt - 40.0)
+        self.recorder.record_table(
+            profile.header_height_pt, row_heights, profile.chrome_height_pt, baseline_errors
+        )
 
     def _estimate_html_height(self, html_fragment: str) -> float:
         lines = (
@@ -251,6 +1180,22 @@ class BlockMeasurer:
         row_height = 16
         return header_height + (num_rows * row_height) + 16
 
+    def _estimate_table_profile(self, table: Dict[str, Any]) -> TableProfile:
+        if self.calibration is not None and self.calibration.table is not None:
+            model = self.calibration.table
+            return TableProfile(
+                header_height_pt=model.header_height_pt,
+                chrome_height_pt=model.chrome_height_pt,
+                row_offsets_pt=model.row_offsets(len(table["rows"])),
+            )
+        # Mirrors _estimate_table_height: 40pt header, 16pt rows, 16pt chrome.
+        row_height = 16.0
+        return TableProfile(
+            header_height_pt=40.0,
+            chrome_height_pt=16.0,
+            row_offsets_pt=tuple(idx * row_height for idx in range(len(table["rows"]) + 1)),
+        )
+
     def _estimate_refs_height(self, refs: List[str]) -> float:
         if not refs:
             return 0.0
@@ -261,7 +1206,7 @@ class BlockMeasurer:
         total_lines = 0
         for ref in refs:
             total_lines += max(1, math.ceil(len(ref) / chars_per_line))
-        return 6.0 + total_lines * line_height
+        return REFS_CHROME_ESTIMATE_PT + total_lines * line_height
 
     def _estimate_notes_height(self, notes: List[str]) -> float:
         if not notes:
@@ -270,6 +1215,75 @@ class BlockMeasurer:
         return len(notes) * line_height
 
 
+class EstimateMeasurer(BlockMeasurer):
+    """Never lays anything out: every height comes from the (calibrated)
+    estimators, so pagination stays within the calibration's error bounds."""
+
+    def _measure_probes(
+        self, items: List[Tuple[str, MeasureProbe]], content_width: float
+    ) -> Dict[str, Optional[float]]:
+        return {}
+
+    def _measure_table_profile(self, table: Dict[str, Any]) -> Optional[TableProfile]:
+        return None
+
+    def _measure_line_profile(self, html_fragment: str) -> Optional[HtmlLineProfile]:
+        return None
+
+
+class AnalyticMeasurer(BlockMeasurer):
+    """Measures probes from the bundled font metrics instead of WeasyPrint.
+
+    Heights come from :class:`~pdfgen_juanipis.fontmetrics.AnalyticLayout`
+    (advance widths, kerning and greedy line breaking over the stylesheet
+    cascade).  Fragments the engine cannot lay out, such as remote images
+    or grid containers, fall back to the usual estimates.
+    """
+
+    def __init__(
+        self,
+        css_path: str,
+        base_url: str,
+        layout: LayoutConfig,
+        cache_budget_bytes: int = DEFAULT_MEMORY_BUDGET,
+        telemetry: Optional[MeasureTelemetry] = None,
+    ):
+        super().__init__(
+            css_path, base_url, layout, cache_budget_bytes=cache_budget_bytes, telemetry=telemetry
+        )
+
+    def _measure_probes(
+        self, items: List[Tuple[str, MeasureProbe]], content_width: float
+    ) -> Dict[str, Optional[float]]:
+        engine = self._analytic_engine(content_width)
+        results: Dict[str, Optional[float]] = {}
+        for probe_id, probe in items:
+            if probe.kind == "table":
+                table, show_header = probe.args
+                profile = self.measure_table_profile(table)
+                results[probe_id] = profile.height(0, profile.row_count, show_header)
+            else:
+                results[probe_id] = engine.probe_height(probe.render(probe_id), probe_id)
+        return results
+
+    def _measure_table_profile(self, table: Dict[str, Any]) -> Optional[TableProfile]:
+        content_width = table.get("total_width") or self.layout.content_width_pt
+        header_height, chrome_height, row_heights = self._analytic_engine(content_width).table_rows(table)
+        offsets = [0.0]
+        for height in row_heights:
+            offsets.append(offsets[-1] + height)
+        return TableProfile(
+            header_height_pt=header_height,
+            chrome_height_pt=chrome_height,
+            row_offsets_pt=tuple(offsets),
+        )
+
+    def _measure_line_profile(self, html_fragment: str) -> Optional[HtmlLineProfile]:
+        # Line boxes are not tracked analytically; lines mode falls back to
+        # element-level splitting.
+        return None
+
+
 MEASURE_CSS = """
 @page {{ size: Letter; margin: 0; }}
 html, body {{ margin: 0; padding: 0; }}
@@ -283,6 +1297,14 @@ html, body {{ margin: 0; padding: 0; }}
 .table-wrap {{ margin-left: 0 !important; }}
 """
 
+TALL_PAGE_CSS = """
+@page {{ size: {width}pt {height}pt; margin: 0; }}
+"""
+
+BATCH_MEASURE_CSS = """
+.measure-item { display: flow-root; break-inside: avoid; margin: 0; padding: 0; }
+"""
+
 
 def _find_box_by_id(page: Any, element_id: str) -> Optional[Any]:
     root = getattr(page, "_page_box", None)
@@ -296,13 +1318,42 @@ def _find_box_by_id(page: Any, element_id: str) -> Optional[Any]:
     return None
 
 
+def _find_boxes_by_ids(page: Any, element_ids: Iterable[str]) -> Dict[str, Any]:
+    """Collect the boxes of several elements in one traversal of *page*."""
+    root = getattr(page, "_page_box", None)
+    if root is None:
+        return {}
+
+    wanted = set(element_ids)
+    found: Dict[str, Any] = {}
+    for box in _iter_boxes(root):
+        element = getattr(box, "element", None)
+        if element is None:
+            continue
+        element_id = element.get("id")
+        if element_id in wanted and element_id not in found:
+            found[element_id] = box
+    return found
+
+
+def _box_height_pt(box: Any) -> float:
+    height = getattr(box, "height", 0.0) or 0.0
+    height += getattr(box, "margin_top", 0.0) or 0.0
+    height += getattr(box, "margin_bottom", 0.0) or 0.0
+    height += getattr(box, "padding_top", 0.0) or 0.0
+    height += getattr(box, "padding_bottom", 0.0) or 0.0
+    return float(height) * CSS_PX_TO_PT
+
+
 def _iter_boxes(box: Any) -> Iterable[Any]:
     yield box
     for child in getattr(box, "children", []) or []:
         yield from _iter_boxes(child)
 
 
-def build_table_html(table: Dict[str, Any], show_header: bool = True) -> str:
+def build_table_html(
+    table: Dict[str, Any], show_header: bool = True, table_id: str = "probe-table"
+) -> str:
     total_width = table.get("total_width") or 532.66
     dep_width = table.get("dep_width") or 120.0
     groups = table.get("groups", [])
@@ -343,7 +1394,7 @@ def build_table_html(table: Dict[str, Any], show_header: bool = True) -> str:
     return (
         f"<div class=\"content\" style=\"width: {total_width:.2f}pt;\">"
         f"<div class=\"table-wrap\" style=\"width: {total_width:.2f}pt; margin-left: 0;\">"
-        "<table id=\"probe-table\" class=\"tabla-abaco\">"
+        f"<table id=\"{table_id}\" class=\"tabla-abaco\">"
         f"<colgroup>{''.join(cols)}</colgroup>"
         f"{header_html}"
         f"{body_html}"
@@ -360,56 +1411,366 @@ class Paginator:
         css_path: str,
         base_url: str,
         fonts_conf_path: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        measure_mode: str = "weasyprint",
+        calibration: Optional[Calibration] = None,
+        calibration_recorder: Optional[CalibrationRecorder] = None,
+        cache_budget_bytes: int = DEFAULT_MEMORY_BUDGET,
+        verify_hints: float = 0.0,
+        telemetry: Optional[MeasureTelemetry] = None,
+        geometry_cache: Optional[Dict[Tuple[Any, ...], PageGeometry]] = None,
+        measure_pool: Optional[MeasurementPool] = None,
+        page_pool: Optional[PaginationPool] = None,
     ):
         if fonts_conf_path:
             os.environ.setdefault("FONTCONFIG_FILE", str(fonts_conf_path))
         self.layout = layout
-        self.measurer = BlockMeasurer(css_path, base_url, layout)
+        if measure_mode not in MEASURE_MODES:
+            raise ValueError(f"Unknown measure_mode {measure_mode!r}; expected one of {MEASURE_MODES}")
+        if measure_mode == "analytic" and not FONTTOOLS_AVAILABLE:
+            LOGGER.warning("fontTools is not installed; falling back to WeasyPrint measurement")
+            measure_mode = "weasyprint"
+        self.measure_mode = measure_mode
+        if layout.page_breaker not in PAGE_BREAKERS:
+            raise ValueError(f"Unknown page_breaker {layout.page_breaker!r}; expected one of {PAGE_BREAKERS}")
+        # Fraction of hinted blocks re-measured to check their hints; the
+        # rejected ones are collected in ``hint_mismatches``.
+        self.verify_hints = verify_hints
+        self.hint_mismatches: List[HintMismatch] = []
+        if calibration is not None and calibration.fingerprint:
+            if calibration.fingerprint != measurement_fingerprint(css_path, MEASURE_CSS, layout.content_width_pt):
+                LOGGER.warning("Calibration was fitted for a different stylesheet, fonts or WeasyPrint version")
+        if measure_mode == "analytic":
+            self.measurer: BlockMeasurer = AnalyticMeasurer(
+                css_path, base_url, layout, cache_budget_bytes=cache_budget_bytes, telemetry=telemetry
+            )
+        elif measure_mode == "estimate":
+            self.measurer = EstimateMeasurer(
+                css_path,
+                base_url,
+                layout,
+                calibration=calibration,
+                cache_budget_bytes=cache_budget_bytes,
+                telemetry=telemetry,
+            )
+        else:
+            fingerprint = measurement_fingerprint(css_path, MEASURE_CSS, layout.content_width_pt)
+            persistent_cache = None
+            if cache_dir:
+                persistent_cache = PersistentHeightCache(str(cache_dir), fingerprint)
+            self.measurer = BlockMeasurer(
+                css_path,
+                base_url,
+                layout,
+                persistent_cache=persistent_cache,
+                calibration=calibration,
+                recorder=calibration_recorder,
+                cache_budget_bytes=cache_budget_bytes,
+                shared_cache=shared_cache_from_env(fingerprint),
+                telemetry=telemetry,
+            )
         self._header_single_line_height = self.measurer.measure_text_block("X", "header-title")
+        # Theme geometry, keyed by everything it depends on; pass one dict to
+        # several paginators (as PDFGen does) to share it between renders.
+        self.geometry_cache = geometry_cache if geometry_cache is not None else {}
+        self._geometry_scope = (
+            measure_mode,
+            layout,
+            stylesheet_signature(css_path),
+            repr(calibration) if measure_mode == "estimate" else None,
+        )
+        # Only WeasyPrint layouts are slow enough to be worth farming out.
+        self.measure_pool = measure_pool if measure_mode == "weasyprint" and WEASYPRINT_AVAILABLE else None
+        # Calibration samples are recorded by this process's measurer only.
+        self.page_pool = page_pool if calibration_recorder is None else None
+        # What a page_pool worker needs to build an equivalent paginator.
+        self._worker_options = {
+            "layout": layout,
+            "css_path": css_path,
+            "base_url": base_url,
+            "fonts_conf_path": fonts_conf_path,
+            "cache_dir": cache_dir,
+            "measure_mode": measure_mode,
+            "calibration": calibration,
+            "cache_budget_bytes": cache_budget_bytes,
+            "verify_hints": verify_hints,
+        }
+
+    @property
+    def measure_stats(self) -> MeasureTelemetry:
+        """Per-probe-kind layout counts, cache hits/misses and timings."""
+        return self.measurer.telemetry
 
     def paginate(self, pages_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        result_pages: List[Dict[str, Any]] = []
-        for page in pages_data:
+        return [page_dict for _, page_dict in self._paginate_sources(pages_data)]
+
+    def paginate_with_plan(
+        self, pages_data: List[Dict[str, Any]], document: str = ""
+    ) -> Tuple[List[Dict[str, Any]], PaginationPlan]:
+        """The pages :meth:`paginate` returns and their :class:`PaginationPlan`.
+
+        *document* is a digest of the input the plan is for (see
+        ``document_digest``); ``render_pdf`` only reuses a plan whose
+        document digest and fingerprint both still match.
+        """
+        sourced = self._paginate_sources(pages_data)
+        plan = PaginationPlan(
+            fingerprint=plan_fingerprint(
+                self._worker_options["css_path"], self.layout, self.measure_mode, self._worker_options["calibration"]
+            ),
+            document=document,
+            pages=encode_pages(pages_data, sourced),
+        )
+        return [page_dict for _, page_dict in sourced], plan
+
+    def _paginate_sources(self, pages_data: List[Dict[str, Any]]) -> List[Tuple[int, Dict[str, Any]]]:
+        """Every physical page, with the index of the source page it was cut from."""
+        prefetched: List[List[Any]] = []
+        if self.measure_pool is not None:
+            prefetched = self._prefetch_measurements(pages_data)
+        if self.page_pool is not None:
+            return self._paginate_parallel(pages_data, prefetched)
+        return list(self._iter_pages(pages_data, prefetch=False))
+
+    def _paginate_parallel(
+        self, pages_data: List[Dict[str, Any]], prefetched: List[List[Any]]
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """Plan every logical page on ``page_pool``, then number the pages
+        and build their dicts here, in document order.
+
+        Page breaks of one logical page never depend on another; only the
+        running page count does (page numbers, and the header titles of the
+        first page), and it is applied in this final pass exactly as in the
+        sequential path.  Each page's task carries the measurements
+        *prefetched* for it on ``measure_pool`` (cache keys per source
+        page).  Workers' hint mismatches and measurement counters are merged
+        into this paginator's.
+        """
+        logical_pages: List[Dict[str, Any]] = []
+        seeds: List[List[Tuple[Any, Any]]] = []
+        for index, page in enumerate(pages_data):
+            if page.get("cover"):
+                continue
+            logical_pages.append(page)
+            keys = prefetched[index] if prefetched else []
+            cached = ((key, self.measurer.cache.get(key)) for key in keys)
+            seeds.append([(key, value) for key, value in cached if value is not None])
+        planned = iter(self.page_pool.plan(self._worker_options, logical_pages, seeds))
+        result_pages: List[Tuple[int, Dict[str, Any]]] = []
+        for index, page in enumerate(pages_data):
             if page.get("cover"):
-                page_copy = dict(page)
-                page_copy.setdefault("page_number", "")
-                page_copy.setdefault("show_header_titles", False)
-                result_pages.append(page_copy)
+                result_pages.append((index, _cover_page(page)))
                 continue
-            result_pages.extend(self._paginate_single_page(page, result_pages))
+            result = next(planned)
+            if result is None:
+                plan = self._plan_logical_page(page)
+            else:
+                plan, mismatches, telemetry = result
+                self.hint_mismatches.extend(mismatches)
+                self.measurer.telemetry.merge(telemetry)
+            page_dicts = self._logical_page_output(page, plan, len(result_pages))
+            result_pages.extend((index, page_dict) for page_dict in page_dicts)
         return result_pages
 
-    def _paginate_single_page(
-        self, page: Dict[str, Any], accumulated_pages: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
+    def iter_pages(self, pages_data: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield the pages :meth:`paginate` returns, each as soon as it is
+        final.
+
+        Source pages are read one at a time, and a physical page is yielded
+        once the next one has been filled (only then is it known whether it
+        is the last page of its source page and carries the refs and notes
+        footer).  Blocks are measured one source page at a time, on
+        ``measure_pool`` when there is one.  With the ``"optimal"`` breaker
+        a source page's pages come out together, after all its breaks are
+        chosen.
+        """
+        return (page_dict for _, page_dict in self._iter_pages(pages_data, prefetch=self.measure_pool is not None))
+
+    def _iter_pages(
+        self, pages_data: Iterable[Dict[str, Any]], prefetch: bool
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        page_count = 0
+        for index, page in enumerate(pages_data):
+            if page.get("cover"):
+                page_count += 1
+                yield index, _cover_page(page)
+                continue
+            if prefetch:
+                self._prefetch_measurements([page])
+            for page_dict in self._iter_logical_page(page, page_count):
+                page_count += 1
+                yield index, page_dict
+
+    def _prefetch_measurements(self, pages_data: List[Dict[str, Any]]) -> List[List[Any]]:
+        """Measure every unhinted block of the document, and every table's
+        row profile, on ``measure_pool`` before any page is filled, and
+        return the cache keys of each page's measurements.
+
+        These measurements do not depend on each other or on page breaks;
+        the serial loop is left with split pieces and page furniture.
+        """
+        probes: List[MeasureProbe] = []
+        tables: List[Dict[str, Any]] = []
+        keys: List[List[Any]] = []
+        for page in pages_data:
+            keys.append([])
+            if page.get("cover"):
+                continue
+            first = len(probes)
+            for block in page.get("blocks", []):
+                block = self._emit_block(block)
+                if block is None or _height_hint(block) is not None:
+                    continue
+                if block.get("type") == "table":
+                    if _row_height_hints(block) is not None:
+                        continue
+                    table = block.get("table", {})
+                    probes.append(self.measurer.table_probe(table, table.get("show_header", True)))
+                    tables.append(table)
+                    keys[-1].append(layout_key("table_profile", table_layout_key(table)))
+                else:
+                    probes.append(self.measurer.html_probe(block.get("html", "")))
+            keys[-1].extend(probe.key for probe in probes[first:] if probe is not None)
+        self.measurer.prefetch(probes, tables, self.measure_pool)
+        return keys
+
+    def page_geometry(self, page: Dict[str, Any]) -> PageGeometry:
+        """Header positions and fixed footer heights for *page*'s theme,
+        computed on first use and then served from ``geometry_cache``."""
+        key = (
+            self._geometry_scope,
+            page.get("title_line1", ""),
+            page.get("title_line2", ""),
+            page.get("footer_site", ""),
+            page.get("footer_phone", ""),
+            # Every page number is one line; only its absence changes height.
+            bool(page.get("page_number", "")),
+        )
+        geometry = self.geometry_cache.get(key)
+        if geometry is not None:
+            return geometry
+
+        footer_contact_height, footer_page_height = self.measurer.measure_batch(
+            [
+                self.measurer.footer_contact_probe(page.get("footer_site", ""), page.get("footer_phone", "")),
+                self.measurer.footer_page_probe(page.get("page_number", "")),
+            ]
+        )
+        geometry = PageGeometry(
+            header_with_titles=HeaderGeometry(*self._compute_header_positions(page, show_titles=True)),
+            header_without_titles=HeaderGeometry(*self._compute_header_positions(page, show_titles=False)),
+            footer_contact_height_pt=footer_contact_height,
+            footer_page_height_pt=footer_page_height,
+        )
+        self.geometry_cache[key] = geometry
+        return geometry
+
+    def _iter_logical_page(self, page: Dict[str, Any], accumulated_count: int) -> Iterator[Dict[str, Any]]:
+        plan, normalized_blocks = self._prepare_logical_page(page)
+        if self.layout.page_breaker == "optimal":
+            builds: Iterator[PageBuild] = iter(
+                self._break_pages_optimal(
+                    page, normalized_blocks, plan.layout_first, plan.layout_other, plan.has_meta
+                )
+            )
+        else:
+            builds = self._iter_greedy_pages(
+                page, _BlockCursor(normalized_blocks), plan.layout_first, plan.layout_other, plan.has_meta
+            )
+        # Hold each page back until the next one exists: only the last page
+        # of a source page gets the meta footer.
+        geometry = self.page_geometry(page)
+        build = next(builds, None)
+        build_idx = 0
+        while build is not None:
+            following = next(builds, None)
+            yield self._logical_page_dict(
+                page, plan, geometry, build, build_idx, following is None, accumulated_count + build_idx
+            )
+            build = following
+            build_idx += 1
+
+    def repaginate(
+        self, pages_data: List[Dict[str, Any]], previous: Optional[PaginationResult] = None
+    ) -> PaginationResult:
+        """Paginate *pages_data*, reusing what *previous* (an earlier result of
+        this method for an edited version of the document) already worked out.
+
+        Source pages are matched by position.  Within one, blocks whose
+        digest is unchanged keep their normalized items, the pages ending
+        before the first changed item are kept, and the greedy loop resumes
+        from there until its cursor lines up with an old page start again;
+        the remaining old pages are reused as they are.  Use the same
+        paginator (or a shared cache) so the re-measured blocks hit the
+        measurement cache too.
+        """
+        old_plans = previous.plans if previous is not None else []
+        result_pages: List[Dict[str, Any]] = []
+        plans: List[Optional[LogicalPagePlan]] = []
+        for index, page in enumerate(pages_data):
+            if page.get("cover"):
+                result_pages.append(_cover_page(page))
+                plans.append(None)
+                continue
+            old_plan = old_plans[index] if index < len(old_plans) else None
+            plan = self._plan_logical_page(page, previous=old_plan, track=True)
+            plans.append(plan)
+            result_pages.extend(self._logical_page_output(page, plan, len(result_pages)))
+        return PaginationResult(pages=result_pages, plans=plans)
+
+    def _plan_logical_page(
+        self,
+        page: Dict[str, Any],
+        previous: Optional[LogicalPagePlan] = None,
+        track: bool = False,
+    ) -> LogicalPagePlan:
+        plan, normalized_blocks = self._prepare_logical_page(page, previous, track)
+        if self.layout.page_breaker == "optimal":
+            plan.builds = self._break_pages_optimal(
+                page, normalized_blocks, plan.layout_first, plan.layout_other, plan.has_meta
+            )
+        elif track:
+            # Only resume from a previous plan made under the same context.
+            if previous is not None and previous.context_key != plan.context_key:
+                previous = None
+            plan.builds, plan.starts = self._break_pages_resuming(
+                page,
+                normalized_blocks,
+                plan.item_keys,
+                plan.layout_first,
+                plan.layout_other,
+                plan.has_meta,
+                previous,
+            )
+        else:
+            plan.builds = self._break_pages_greedy(
+                page, normalized_blocks, plan.layout_first, plan.layout_other, plan.has_meta
+            )
+        return plan
+
+    def _prepare_logical_page(
+        self,
+        page: Dict[str, Any],
+        previous: Optional[LogicalPagePlan] = None,
+        track: bool = False,
+    ) -> Tuple[LogicalPagePlan, List[BlockItem]]:
+        """Layout states, normalized blocks with their refs distributed, and
+        everything else a source page's breaks depend on; the returned plan
+        has no builds yet."""
         blocks = page.get("blocks", [])
         refs = page.get("refs", [])
         notes = page.get("footer_notes", [])
-        has_meta = bool(refs or notes)
-
-        (
-            header_title_top,
-            header_subtitle_top,
-            header_bottom,
-            header_title_style,
-            header_subtitle_style,
-        ) = self._compute_header_positions(page, show_titles=True)
-        (
-            header_title_top_other,
-            header_subtitle_top_other,
-            header_bottom_other,
-            header_title_style_other,
-            header_subtitle_style_other,
-        ) = self._compute_header_positions(page, show_titles=False)
+
+        geometry = self.page_geometry(page)
         layout_first = self._compute_layout_state(
             page,
-            header_bottom,
+            geometry.header_with_titles.bottom_pt,
             include_intro=True,
             compact_top=False,
         )
         layout_other = self._compute_layout_state(
             page,
-            header_bottom_other,
+            geometry.header_without_titles.bottom_pt,
             include_intro=False,
             compact_top=True,
         )
@@ -422,34 +1783,230 @@ class Paginator:
         )
 
         refs_catalog = page.get("refs_catalog", {})
-        normalized_blocks = self._normalize_blocks(blocks, min_page_height, refs_catalog)
+        context_key = None
+        block_keys: List[bytes] = []
+        groups: List[List[BlockItem]] = []
+        if track:
+            context = {key: value for key, value in page.items() if key != "blocks"}
+            context_key = layout_key("logical_page", self._geometry_scope, min_page_height, context)
+            block_keys = [_block_key(block) for block in blocks]
+            if previous is None or previous.context_key != context_key:
+                previous = None
+            groups = self._normalize_reusing(blocks, block_keys, min_page_height, refs_catalog, previous)
+            # Ref distribution edits the items; keep the stored groups pristine.
+            normalized_blocks = [
+                BlockItem(
+                    item.data,
+                    item.height_pt,
+                    item.keep_with_next,
+                    list(item.refs),
+                    list(item.notes),
+                    item.table_profile,
+                    item.row_start,
+                )
+                for group in groups
+                for item in group
+            ]
+        else:
+            normalized_blocks = self._normalize_blocks(blocks, min_page_height, refs_catalog)
 
         # Distribute page-level refs to blocks that contain matching <sup>
         # markers.  After this step only unmatched refs remain page-level and
         # will be rendered on the last physical page as a fallback.
+        markers = _MarkerIndex(normalized_blocks)
         remaining_page_refs = self._distribute_page_refs_to_blocks(
-            normalized_blocks, refs,
+            normalized_blocks, refs, markers,
         )
 
         # Redistribute block-level refs so each ref appears on the page that
         # contains the matching <sup>N</sup> marker.  This handles cases
         # where blocks were split during normalization or refs were attached
         # to the wrong block upstream.
-        self._redistribute_block_refs(normalized_blocks)
+        self._redistribute_block_refs(normalized_blocks, markers)
 
         has_meta = bool(remaining_page_refs or notes)
 
-        pages_build: List[PageBuild] = []
-        idx = 0
-        page_idx = 0
-        while idx < len(normalized_blocks):
+        item_keys: List[Tuple[Any, ...]] = []
+        if track:
+            item_keys = [
+                (block_key, chunk, tuple(item.refs), tuple(item.notes))
+                for block_key, group in zip(block_keys, groups)
+                for chunk, item in enumerate(group)
+            ]
+
+        plan = LogicalPagePlan(
+            builds=[],
+            layout_first=layout_first,
+            layout_other=layout_other,
+            has_meta=has_meta,
+            page_level_refs=remaining_page_refs,
+            context_key=context_key,
+            block_keys=block_keys,
+            groups=groups,
+            item_keys=item_keys,
+        )
+        return plan, normalized_blocks
+
+    def _logical_page_output(
+        self, page: Dict[str, Any], plan: LogicalPagePlan, accumulated_count: int
+    ) -> List[Dict[str, Any]]:
+        geometry = self.page_geometry(page)
+        last_idx = len(plan.builds) - 1
+        return [
+            self._logical_page_dict(
+                page, plan, geometry, build, build_idx, build_idx == last_idx, accumulated_count + build_idx
+            )
+            for build_idx, build in enumerate(plan.builds)
+        ]
+
+    def _logical_page_dict(
+        self,
+        page: Dict[str, Any],
+        plan: LogicalPagePlan,
+        geometry: PageGeometry,
+        build: PageBuild,
+        build_idx: int,
+        is_last: bool,
+        page_index: int,
+    ) -> Dict[str, Any]:
+        is_first = build_idx == 0
+        layout_state = plan.layout_first if is_first else plan.layout_other
+        show_header_titles = page_index == 0 and is_first
+        header = geometry.header(show_header_titles)
+        return self._build_page_dict(
+            page,
+            build,
+            layout_state,
+            include_intro=is_first,
+            include_meta=(plan.has_meta and is_last),
+            page_number=str(page_index + 1),
+            header_title_top=header.title_top_pt,
+            header_subtitle_top=header.subtitle_top_pt,
+            header_title_style=header.title_style,
+            header_subtitle_style=header.subtitle_style,
+            show_header_titles=show_header_titles,
+            page_level_refs=plan.page_level_refs,
+        )
+
+    def _normalize_reusing(
+        self,
+        blocks: List[Dict[str, Any]],
+        block_keys: List[bytes],
+        max_height_pt: float,
+        refs_catalog: Dict[str, str],
+        previous: Optional[LogicalPagePlan],
+    ) -> List[List[BlockItem]]:
+        """Normalized items per source block, taken from *previous* for blocks
+        whose digest it already has and normalized in one batch otherwise."""
+        known = dict(zip(previous.block_keys, previous.groups)) if previous is not None else {}
+        groups: List[Optional[List[BlockItem]]] = [known.get(key) for key in block_keys]
+        missing = [idx for idx, group in enumerate(groups) if group is None]
+        if missing:
+            fresh = self._normalize_block_groups([blocks[idx] for idx in missing], max_height_pt, refs_catalog)
+            for idx, group in zip(missing, fresh):
+                groups[idx] = group
+        return groups
+
+    def _break_pages_resuming(
+        self,
+        page: Dict[str, Any],
+        normalized_blocks: List[BlockItem],
+        item_keys: List[Tuple[Any, ...]],
+        layout_first: PageLayoutState,
+        layout_other: PageLayoutState,
+        has_meta: bool,
+        previous: Optional[LogicalPagePlan],
+    ) -> Tuple[List[PageBuild], List[Tuple[int, Optional[BlockItem], float]]]:
+        """Greedy page breaks, reusing *previous*'s pages around the edit.
+
+        An old page is kept when it, and the block after it (keep-with-next
+        looks one block ahead), lie before the first changed item and the
+        height left to place still picks the same limit.  After the resumed
+        loop closes a page, the old pages are spliced back in as soon as its
+        cursor is at an old page start inside the unchanged tail.
+        """
+        cursor = _BlockCursor(normalized_blocks)
+        builds: List[PageBuild] = []
+        starts: List[Tuple[int, Optional[BlockItem], float]] = []
+
+        def meta_limit(page_idx: int, remaining: float) -> bool:
+            layout_state = layout_first if page_idx == 0 else layout_other
+            return has_meta and remaining <= layout_state.content_height_meta_pt
+
+        old_index: Dict[int, int] = {}
+        delta = head = tail_start = 0
+        if previous is not None and previous.starts and previous.has_meta == has_meta:
+            old_keys = previous.item_keys
+            head = _common_prefix_length(old_keys, item_keys)
+            tail = _common_prefix_length(old_keys[::-1], item_keys[::-1])
+            tail = min(tail, len(old_keys) - head, len(item_keys) - head)
+            delta = len(item_keys) - len(old_keys)
+            tail_start = len(item_keys) - tail
+            old_starts = previous.starts
+            for page_idx, (idx, remainder, remaining) in enumerate(old_starts):
+                end_idx = old_starts[page_idx + 1][0] if page_idx + 1 < len(old_starts) else len(old_keys)
+                if end_idx + 1 >= head:
+                    break
+                cursor.seek(idx, remainder)
+                if meta_limit(page_idx, cursor.remaining_height()) != meta_limit(page_idx, remaining):
+                    break
+                builds.append(previous.builds[page_idx])
+                starts.append((idx, remainder, remaining))
+            for page_idx, (idx, remainder, _) in enumerate(old_starts):
+                if page_idx > 0 and remainder is None:
+                    old_index[idx + delta] = page_idx
+
+        if builds:
+            idx, remainder, _ = previous.starts[len(builds)]
+            cursor.seek(idx, remainder)
+        else:
+            cursor.seek(0)
+        pages = self._iter_greedy_pages(page, cursor, layout_first, layout_other, has_meta, page_idx=len(builds))
+        while not cursor.done:
+            idx, remainder = cursor.position
+            starts.append((idx, remainder, cursor.remaining_height()))
+            builds.append(next(pages))
+            idx, remainder = cursor.position
+            old_page = old_index.get(idx)
+            if remainder is None and old_page is not None and idx >= max(tail_start, head):
+                builds.extend(previous.builds[old_page:])
+                starts.extend(
+                    (old_idx + delta, old_remainder, remaining)
+                    for old_idx, old_remainder, remaining in previous.starts[old_page:]
+                )
+                break
+        return builds, starts
+
+    def _break_pages_greedy(
+        self,
+        page: Dict[str, Any],
+        normalized_blocks: List[BlockItem],
+        layout_first: PageLayoutState,
+        layout_other: PageLayoutState,
+        has_meta: bool,
+    ) -> List[PageBuild]:
+        cursor = _BlockCursor(normalized_blocks)
+        return list(self._iter_greedy_pages(page, cursor, layout_first, layout_other, has_meta))
+
+    def _iter_greedy_pages(
+        self,
+        page: Dict[str, Any],
+        cursor: "_BlockCursor",
+        layout_first: PageLayoutState,
+        layout_other: PageLayoutState,
+        has_meta: bool,
+        page_idx: int = 0,
+    ) -> Iterator[PageBuild]:
+        """Fill each page with as many blocks as fit, splitting tables (and
+        HTML in ``"lines"`` mode) at the page break.  Pages are yielded as
+        they are closed; *cursor* then points at the next page's start."""
+        while not cursor.done:
             layout_state = layout_first if page_idx == 0 else layout_other
             page_refs: List[str] = []
             page_notes: List[str] = []
 
             if has_meta:
-                remaining_height = sum(block.height_pt for block in normalized_blocks[idx:])
-                if remaining_height <= layout_state.content_height_meta_pt:
+                if cursor.remaining_height() <= layout_state.content_height_meta_pt:
                     limit = layout_state.content_height_meta_pt
                 else:
                     limit = layout_state.content_height_base_pt
@@ -459,42 +2016,34 @@ class Paginator:
 
             used = 0.0
             page_blocks: List[BlockItem] = []
-            while idx < len(normalized_blocks):
-                block = normalized_blocks[idx]
+            while not cursor.done:
+                block = cursor.current
                 block_height = block.height_pt
                 block_refs = list(block.refs)
                 block_notes = list(block.notes)
 
-                if block.keep_with_next and idx + 1 < len(normalized_blocks):
-                    next_block = normalized_blocks[idx + 1]
+                next_block = cursor.next
+                if block.keep_with_next and next_block is not None:
                     next_height = next_block.height_pt
                     if next_block.data.get("type") == "table":
                         available = limit - used - block_height
                         if available <= 0:
                             if page_blocks:
                                 break
-                        else:
+                        elif next_height > available:
                             next_table = next_block.data.get("table", {})
                             show_header = next_table.get("show_header", True)
+                            profile = self._table_profile(next_block)
+                            start = next_block.row_start
                             max_rows = self._max_table_rows_that_fit(
-                                next_table,
-                                next_table.get("rows", []),
+                                profile,
+                                start,
+                                start + len(next_table.get("rows", [])),
                                 available,
                                 show_header,
                             )
-                            next_height = (
-                                self.measurer.measure_table(
-                                    {
-                                        "groups": next_table.get("groups", []),
-                                        "rows": next_table.get("rows", [])[: max_rows or 1],
-                                        "total_width": next_table.get("total_width"),
-                                        "dep_width": next_table.get("dep_width"),
-                                    },
-                                    show_header,
-                                )
-                                if max_rows
-                                else next_height
-                            )
+                            if max_rows:
+                                next_height = profile.height(start, start + max_rows, show_header)
                     if used + block_height + next_height > limit:
                         if page_blocks:
                             break
@@ -512,7 +2061,9 @@ class Paginator:
                         break
                     limit = new_limit
 
-                split_table = False
+                # A block split at the page break is placed as its head; the
+                # tail takes its place at the cursor for the next page.
+                tail: Optional[BlockItem] = None
                 if block.data.get("type") == "table":
                     available_height = limit - used
                     if available_height <= 0 and page_blocks:
@@ -520,12 +2071,21 @@ class Paginator:
                     if available_height <= 0:
                         available_height = limit
 
-                    block, split_table = self._split_table_to_fit(
-                        normalized_blocks,
-                        idx,
-                        available_height,
-                    )
+                    block, tail = self._split_table_to_fit(block, available_height)
                     block_height = block.height_pt
+                elif (
+                    self.layout.html_split_mode == "lines"
+                    and block.data.get("type") == "html"
+                    and not block.keep_with_next
+                    and page_blocks
+                    and used + block_height > limit
+                    and limit - used > 0
+                ):
+                    block, tail = self._split_html_to_fit(block, limit - used)
+                    if tail is not None:
+                        block_height = block.height_pt
+                        block_refs = list(block.refs)
+                        block_notes = list(block.notes)
 
                 if used + block_height > limit and page_blocks:
                     break
@@ -543,41 +2103,150 @@ class Paginator:
                     page_refs.extend(block_refs)
                 if block_notes:
                     page_notes.extend(block_notes)
-                idx += 1
 
-                if split_table:
+                if tail is not None:
+                    cursor.replace_current(tail)
                     break
+                cursor.advance()
 
-            pages_build.append(PageBuild(blocks=page_blocks, height_pt=used, refs=page_refs, notes=page_notes))
+            yield PageBuild(blocks=page_blocks, height_pt=used, refs=page_refs, notes=page_notes)
             page_idx += 1
 
-        output_pages: List[Dict[str, Any]] = []
-        for build_idx, build in enumerate(pages_build):
-            is_first = build_idx == 0
-            is_last = build_idx == len(pages_build) - 1
-            layout_state = layout_first if is_first else layout_other
-
-            show_header_titles = len(accumulated_pages) == 0 and is_first
-            output_pages.append(
-                self._build_page_dict(
-                    page,
-                    build,
-                    layout_state,
-                    include_intro=is_first,
-                    include_meta=(has_meta and is_last),
-                    page_number=str(len(accumulated_pages) + len(output_pages) + 1),
-                    header_title_top=header_title_top if show_header_titles else header_title_top_other,
-                    header_subtitle_top=header_subtitle_top if show_header_titles else header_subtitle_top_other,
-                    header_title_style=header_title_style if show_header_titles else header_title_style_other,
-                    header_subtitle_style=(
-                        header_subtitle_style if show_header_titles else header_subtitle_style_other
-                    ),
-                    show_header_titles=show_header_titles,
-                    page_level_refs=remaining_page_refs,
-                )
-            )
+    def _break_pages_optimal(
+        self,
+        page: Dict[str, Any],
+        normalized_blocks: List[BlockItem],
+        layout_first: PageLayoutState,
+        layout_other: PageLayoutState,
+        has_meta: bool,
+    ) -> List[PageBuild]:
+        """Choose all page breaks together, Knuth-Plass style.
+
+        Break points are the gaps between blocks and between table rows
+        (heights come from the table profile).  A backward pass finds, for
+        every break point, the cheapest way to lay out the rest under
+        ``PAGE_BREAK_COSTS``; each start only scans the units that fit on
+        one page, so the work is O(units x units per page).  HTML blocks are
+        never cut here: they were already split to fit a page when
+        normalized.
+        """
+        units = self._break_units(normalized_blocks)
+        count = len(units)
+        best = [math.inf] * (count + 1)
+        best[count] = 0.0
+        next_break = [count] * (count + 1)
+        overflows = [0.0] * (count + 1)
+        costs = PAGE_BREAK_COSTS
+        for start in range(count - 1, -1, -1):
+            layout_state = layout_first if start == 0 else layout_other
+            limit = max(layout_state.content_height_base_pt, self.layout.min_content_height_pt)
+            last_limit = layout_state.content_height_meta_pt if has_meta else limit
+            last_limit = max(last_limit, self.layout.min_content_height_pt)
+            refs: List[str] = []
+            notes: List[str] = []
+            used = 0.0
+            run_base = 0.0
+            for pos in range(start, count):
+                block_idx, row = units[pos]
+                block = normalized_blocks[block_idx]
+                if row is None:
+                    used += block.height_pt
+                else:
+                    if pos == start or units[pos - 1][0] != block_idx:
+                        run_base, run_start = used, row
+                    show_header = run_start == 0 and block.data["table"].get("show_header", True)
+                    used = run_base + block.table_profile.height(run_start, row + 1, show_header)
+                if (row is None or row == 0) and (block.refs or block.notes):
+                    refs.extend(block.refs)
+                    notes.extend(block.notes)
+                    meta_limit = self._content_height_with_meta(layout_state, refs, notes)
+                    limit = max(min(limit, meta_limit), self.layout.min_content_height_pt)
+                    last_limit = max(min(last_limit, meta_limit), self.layout.min_content_height_pt)
+
+                end = pos + 1
+                page_limit = last_limit if end == count else limit
+                if used > page_limit and pos > start:
+                    if used > max(limit, last_limit):
+                        break
+                    continue
+                cost = costs["page"]
+                overflow = used - page_limit
+                if overflow > 0:
+                    cost += costs["overflow"]
+                elif end < count:
+                    cost += costs["slack"] * ((page_limit - used) / page_limit) ** 2
+                    if row is not None and units[end][0] == block_idx:
+                        cost += costs["split_table"]
+                    elif row is None and block.keep_with_next:
+                        cost += costs["orphan"]
+                if cost + best[end] < best[start]:
+                    best[start] = cost + best[end]
+                    next_break[start] = end
+                    overflows[start] = overflow
 
-        return output_pages
+        pages_build: List[PageBuild] = []
+        start = 0
+        while start < count:
+            end = next_break[start]
+            build = self._page_build_from_units(normalized_blocks, units[start:end])
+            if overflows[start] > 0:
+                LOGGER.warning(
+                    "Block exceeds page height limit by %.2fpt; forcing placement.", overflows[start]
+                )
+            pages_build.append(build)
+            start = end
+        return pages_build
+
+    def _break_units(self, normalized_blocks: List[BlockItem]) -> List[Tuple[int, Optional[int]]]:
+        """``(block index, row)`` per unit the optimal breaker places;
+        ``row`` is ``None`` for blocks that are kept whole.  Every table with
+        more than one row is profiled so it can be cut between rows."""
+        units: List[Tuple[int, Optional[int]]] = []
+        for block_idx, block in enumerate(normalized_blocks):
+            rows = block.data.get("table", {}).get("rows", []) if block.data.get("type") == "table" else []
+            if len(rows) > 1:
+                self._table_profile(block)
+                units.extend((block_idx, row) for row in range(len(rows)))
+            else:
+                units.append((block_idx, None))
+        return units
+
+    def _page_build_from_units(
+        self, normalized_blocks: List[BlockItem], units: Sequence[Tuple[int, Optional[int]]]
+    ) -> PageBuild:
+        """The page holding *units*: whole blocks as they are, table row
+        runs as chunks viewing the rows they cover."""
+        blocks: List[BlockItem] = []
+        refs: List[str] = []
+        notes: List[str] = []
+        pos = 0
+        while pos < len(units):
+            block_idx, row = units[pos]
+            block = normalized_blocks[block_idx]
+            end = pos + 1
+            if row is not None:
+                while end < len(units) and units[end][0] == block_idx:
+                    end += 1
+                last_row = units[end - 1][1] + 1
+                table = block.data["table"]
+                if row > 0 or last_row < len(table.get("rows", [])):
+                    show_header = row == 0 and table.get("show_header", True)
+                    block = BlockItem(
+                        data={
+                            "type": "table",
+                            "table": _table_chunk(table, RowRange(table.get("rows", []), row, last_row), show_header),
+                        },
+                        height_pt=block.table_profile.height(row, last_row, show_header),
+                        refs=list(block.refs) if row == 0 else [],
+                        notes=list(block.notes) if row == 0 else [],
+                        table_profile=block.table_profile,
+                        row_start=row,
+                    )
+            blocks.append(block)
+            refs.extend(block.refs)
+            notes.extend(block.notes)
+            pos = end
+        return PageBuild(blocks=blocks, height_pt=sum(block.height_pt for block in blocks), refs=refs, notes=notes)
 
     def _build_page_dict(
         self,
@@ -658,8 +2327,12 @@ class Paginator:
         title_text = page.get("title_line1", "") if show_titles else ""
         subtitle_text = page.get("title_line2", "") if show_titles else ""
 
-        title_height = self.measurer.measure_text_block(title_text, "header-title")
-        subtitle_height = self.measurer.measure_text_block(subtitle_text, "header-subtitle")
+        title_height, subtitle_height = self.measurer.measure_batch(
+            [
+                self.measurer.text_probe(title_text, "header-title"),
+                self.measurer.text_probe(subtitle_text, "header-subtitle"),
+            ]
+        )
 
         title_top = max(self.layout.header_title_top_pt, self.layout.header_title_min_top_pt)
         subtitle_top = max(
@@ -710,9 +2383,20 @@ class Paginator:
         compact_top: bool,
     ) -> PageLayoutState:
         intro_text = page.get("intro", "") if include_intro else ""
-        intro_height = (
-            self.measurer.measure_text_block(intro_text, "intro") if intro_text else 0.0
-        )
+        refs = page.get("refs", [])
+        notes = page.get("footer_notes", [])
+        geometry = self.page_geometry(page)
+        footer_contact_height = geometry.footer_contact_height_pt
+        footer_page_height = geometry.footer_page_height_pt
+        # The ref/note probes ride along in the same batch, so the footer-meta
+        # sum below is served from the cache.
+        intro_height = self.measurer.measure_batch(
+            [
+                self.measurer.text_probe(intro_text, "intro") if intro_text else None,
+                *self.measurer.footer_meta_item_probes(refs, notes),
+            ]
+        )[0]
+        footer_meta_height = self.measurer.measure_footer_meta(refs, notes)
 
         intro_top = max(self.layout.default_intro_top_pt, header_bottom + self.layout.header_gap_pt)
 
@@ -727,16 +2411,6 @@ class Paginator:
         else:
             content_top = max(min_content_top, header_bottom + self.layout.header_gap_pt)
 
-        footer_contact_height = self.measurer.measure_footer_contact(
-            page.get("footer_site", ""),
-            page.get("footer_phone", ""),
-        )
-        footer_page_height = self.measurer.measure_footer_page(page.get("page_number", ""))
-        footer_meta_height = self.measurer.measure_footer_meta(
-            page.get("refs", []),
-            page.get("footer_notes", []),
-        )
-
         reserved_base = max(
             self.layout.footer_contact_bottom_pt + footer_contact_height,
             self.layout.footer_page_bottom_pt + footer_page_height,
@@ -781,28 +2455,82 @@ class Paginator:
         max_height_pt: float,
         refs_catalog: Dict[str, str],
     ) -> List[BlockItem]:
-        normalized: List[BlockItem] = []
-        for block in blocks:
+        groups = self._normalize_block_groups(blocks, max_height_pt, refs_catalog)
+        return [item for group in groups for item in group]
+
+    def _normalize_block_groups(
+        self,
+        blocks: List[Dict[str, Any]],
+        max_height_pt: float,
+        refs_catalog: Dict[str, str],
+    ) -> List[List[BlockItem]]:
+        """Measured items of every source block, split to *max_height_pt*,
+        as one list per source block.  Each block is normalized on its own,
+        which lets re-pagination reuse the items of unchanged blocks."""
+        expanded_groups = [self._expand_blocks([block], max_height_pt) for block in blocks]
+        blocks = [block for group in expanded_groups for block in group]
+        hints = self._resolve_height_hints(blocks)
+        # Lay out every whole block without a hint in a single probe document
+        # first; only blocks that overflow the page are split and re-measured
+        # below.
+        self.measurer.measure_batch(
+            [
+                None
+                if hint is not None
+                else self.measurer.table_probe(
+                    block.get("table", {}), block.get("table", {}).get("show_header", True)
+                )
+                if block.get("type") == "table"
+                else self.measurer.html_probe(block.get("html", ""))
+                for block, hint in zip(blocks, hints)
+            ]
+        )
+
+        pending: List[Tuple[Dict[str, Any], List[str], Optional[Tuple[float, Optional[TableProfile]]]]] = []
+        for block, hint in zip(blocks, hints):
+            if block.get("type") == "table":
+                pending.append((block, [], hint))
+            elif hint is not None and hint[0] <= max_height_pt:
+                pending.append((block, [block.get("html", "")], hint))
+            else:
+                # A hinted block taller than the page is measured to split it.
+                pending.append((block, self._split_html_block(block.get("html", ""), max_height_pt), None))
+
+        chunk_heights = iter(
+            self.measurer.measure_html_batch(
+                [chunk for _, chunks, hint in pending if hint is None for chunk in chunks]
+            )
+        )
+
+        normalized: List[List[BlockItem]] = []
+        for block, split_html, hint in pending:
             block_refs = block.get("refs", [])
             block_notes = block.get("footer_notes", [])
             if block.get("type") == "table":
                 table = block.get("table", {})
                 show_header = table.get("show_header", True)
-                height = self.measurer.measure_table(table, show_header)
+                if hint is not None:
+                    height, profile = hint
+                else:
+                    height, profile = self.measurer.measure_table(table, show_header), None
                 normalized.append(
-                    BlockItem(data=block, height_pt=height, refs=block_refs, notes=block_notes)
+                    [
+                        BlockItem(
+                            data=block, height_pt=height, refs=block_refs, notes=block_notes, table_profile=profile
+                        )
+                    ]
                 )
             else:
                 html = block.get("html", "")
                 keep_with_next = _needs_keep_with_next(html)
-                split_html = self._split_html_block(html, max_height_pt)
+                normalized.append([])
                 for idx, chunk in enumerate(split_html):
                     if block_refs:
                         chunk_refs = block_refs if idx == 0 else []
                     else:
                         chunk_refs = _refs_from_html(chunk, refs_catalog)
-                    height = self.measurer.measure_html(chunk)
-                    normalized.append(
+                    height = hint[0] if hint is not None else next(chunk_heights)
+                    normalized[-1].append(
                         BlockItem(
                             data={"type": "html", "html": chunk},
                             height_pt=height,
@@ -811,12 +2539,104 @@ class Paginator:
                             notes=block_notes if idx == 0 else [],
                         )
                     )
-        return normalized
+        items = iter(normalized)
+        return [[item for _ in group for item in next(items)] for group in expanded_groups]
+
+    def _expand_blocks(self, blocks: List[Dict[str, Any]], max_height_pt: float) -> List[Dict[str, Any]]:
+        """Emit registered block types as ``html`` blocks and split the ones
+        taller than *max_height_pt* with their type's splitter."""
+        expanded: List[Dict[str, Any]] = []
+        for block in blocks:
+            block = self._emit_block(block)
+            if block is None:
+                continue
+            block_type = get_block_type(block.get("block_type"))
+            item = block.get("item")
+            if (
+                block_type is not None
+                and block_type.split is not None
+                and item is not None
+                and block.get("height_pt", 0.0) > max_height_pt
+            ):
+                pieces = (emit_block(piece) for piece in block_type.split(item, max_height_pt))
+                expanded.extend(piece for piece in pieces if piece is not None)
+                continue
+            expanded.append(block)
+        return expanded
+
+    def _emit_block(self, block: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """*block* emitted as an ``html``/``table`` block, with the height its
+        type's ``measure`` hook works out as its ``height_pt``."""
+        if block.get("type") in RENDER_TYPES:
+            return block
+        item, block = block, emit_block(block)
+        if block is None or "height_pt" in block:
+            return block
+        block_type = get_block_type(block.get("block_type"))
+        if block_type is not None and block_type.measure is not None:
+            height = block_type.measure(item, self.measurer)
+            if height is not None:
+                block["height_pt"] = height
+        return block
+
+    def _resolve_height_hints(
+        self, blocks: List[Dict[str, Any]]
+    ) -> List[Optional[Tuple[float, Optional[TableProfile]]]]:
+        """Trusted ``(height, table profile)`` per block from its
+        ``height_pt``/``row_heights_pt`` hints, or ``None`` to measure it.
+
+        With ``verify_hints`` a deterministic sample of the hinted blocks is
+        measured as well; hints off by more than ``HINT_TOLERANCE_PT`` are
+        logged, recorded in ``hint_mismatches`` and dropped.
+        """
+        hints: List[Optional[Tuple[float, Optional[TableProfile]]]] = []
+        for block in blocks:
+            height = _height_hint(block)
+            profile = None
+            if block.get("type") == "table":
+                table = block.get("table", {})
+                row_heights = _row_height_hints(block)
+                if row_heights is not None:
+                    profile = self.measurer.hinted_table_profile(table, row_heights)
+                    if height is None:
+                        height = profile.height(0, profile.row_count, table.get("show_header", True))
+            hints.append(None if height is None else (height, profile))
+
+        if self.verify_hints <= 0.0:
+            return hints
+        sampled = [
+            idx
+            for idx, (block, hint) in enumerate(zip(blocks, hints))
+            if hint is not None and _sampled_for_verification(block, self.verify_hints)
+        ]
+        measured = self.measurer.measure_batch(
+            [
+                self.measurer.table_probe(blocks[idx]["table"], blocks[idx]["table"].get("show_header", True))
+                if blocks[idx].get("type") == "table"
+                else self.measurer.html_probe(blocks[idx].get("html", ""))
+                for idx in sampled
+            ]
+        )
+        for idx, height in zip(sampled, measured):
+            hinted = hints[idx][0]
+            if abs(hinted - height) <= HINT_TOLERANCE_PT:
+                continue
+            block_type = blocks[idx].get("type", "html")
+            LOGGER.warning(
+                "Height hint of %s block is %.1fpt but it measures %.1fpt; ignoring the hint",
+                block_type,
+                hinted,
+                height,
+            )
+            self.hint_mismatches.append(HintMismatch(block_type, hinted, height))
+            hints[idx] = None
+        return hints
 
     def _distribute_page_refs_to_blocks(
         self,
         normalized_blocks: List[BlockItem],
         page_refs: List[str],
+        markers: Optional["_MarkerIndex"] = None,
     ) -> List[str]:
         """Distribute page-level refs to blocks that reference them via ``<sup>`` markers.
 
@@ -831,33 +2651,25 @@ class Paginator:
         """
         if not page_refs:
             return []
+        if markers is None:
+            markers = _MarkerIndex(normalized_blocks)
 
         # Build number → ref mapping (first occurrence wins if duplicated numbers)
         ref_by_number: Dict[str, str] = {}
         for ref in page_refs:
-            num = _parse_ref_leading_number(ref)
+            num = markers.ref_number(ref)
             if num is not None and num not in ref_by_number:
                 ref_by_number[num] = ref
 
         if not ref_by_number:
             return list(page_refs)
 
-        assigned_numbers: set = set()
-
-        for block in normalized_blocks:
-            html = block.data.get("html", "")
-            if not html:
-                continue
-            sup_numbers = _extract_sup_numbers(html)
-            for num in sup_numbers:
-                if num in ref_by_number and num not in assigned_numbers:
-                    block.refs.append(ref_by_number[num])
-                    assigned_numbers.add(num)
+        assigned_numbers = markers.assign(normalized_blocks, ref_by_number)
 
         # Return unmatched refs preserving original order
         remaining: List[str] = []
         for ref in page_refs:
-            num = _parse_ref_leading_number(ref)
+            num = markers.ref_number(ref)
             if num is not None and num in assigned_numbers:
                 continue
             remaining.append(ref)
@@ -866,6 +2678,7 @@ class Paginator:
     def _redistribute_block_refs(
         self,
         normalized_blocks: List[BlockItem],
+        markers: Optional["_MarkerIndex"] = None,
     ) -> None:
         """Redistribute block-level refs to the first block containing the
         matching ``<sup>N</sup>`` marker.
@@ -889,6 +2702,8 @@ class Paginator:
 
         if not all_refs:
             return
+        if markers is None:
+            markers = _MarkerIndex(normalized_blocks)
 
         # Clear all block refs before re-assignment.
         for block in normalized_blocks:
@@ -904,7 +2719,7 @@ class Paginator:
         ref_by_number: Dict[str, str] = {}
         non_numeric_refs: List[str] = []
         for ref in all_refs:
-            num = _parse_ref_leading_number(ref)
+            num = markers.ref_number(ref)
             if num is not None:
                 if num not in ref_by_number:
                     ref_by_number[num] = ref
@@ -912,20 +2727,12 @@ class Paginator:
                 non_numeric_refs.append(ref)
 
         # Assign numeric refs to matching blocks.
-        assigned: set = set()
-        for block in normalized_blocks:
-            html = block.data.get("html", "")
-            if not html:
-                continue
-            for num in _extract_sup_numbers(html):
-                if num in ref_by_number and num not in assigned:
-                    block.refs.append(ref_by_number[num])
-                    assigned.add(num)
+        assigned = markers.assign(normalized_blocks, ref_by_number)
 
         # Unmatched numeric refs go to the fallback block.
         fallback_block = normalized_blocks[fallback_idx]
         for ref in all_refs:
-            num = _parse_ref_leading_number(ref)
+            num = markers.ref_number(ref)
             if num is not None and num not in assigned:
                 fallback_block.refs.append(ref)
 
@@ -942,26 +2749,22 @@ class Paginator:
         if not rows:
             return [block]
 
+        profile = self.measurer.measure_table_profile(table)
         result_blocks: List[Dict[str, Any]] = []
         start_idx = 0
         first_chunk = True
 
         while start_idx < len(rows):
             show_header = first_chunk
-            max_rows = self._max_table_rows_that_fit(table, rows[start_idx:], max_height_pt, show_header)
+            max_rows = self._max_table_rows_that_fit(
+                profile, start_idx, len(rows), max_height_pt, show_header
+            )
             if max_rows < 1:
                 max_rows = 1
-            chunk_rows = rows[start_idx : start_idx + max_rows]
             result_blocks.append(
                 {
                     "type": "table",
-                    "table": {
-                        "groups": table.get("groups", []),
-                        "rows": chunk_rows,
-                        "total_width": table.get("total_width"),
-                        "dep_width": table.get("dep_width"),
-                        "show_header": show_header,
-                    },
+                    "table": _table_chunk(table, RowRange(rows, start_idx, start_idx + max_rows), show_header),
                 }
             )
             start_idx += max_rows
@@ -971,99 +2774,84 @@ class Paginator:
 
     def _split_table_to_fit(
         self,
-        blocks: List[BlockItem],
-        idx: int,
+        block: BlockItem,
         max_height_pt: float,
-    ) -> Tuple[BlockItem, bool]:
-        block = blocks[idx]
+    ) -> Tuple[BlockItem, Optional[BlockItem]]:
+        """Cut a table block at the last row that fits *max_height_pt*.
+
+        Returns the head (the block itself when it fits) and the remainder,
+        or ``None`` when nothing is left over.  Both reference rows of the
+        original table through :class:`RowRange` views.
+        """
         table = block.data.get("table", {})
         rows = table.get("rows", [])
         if not rows:
-            return block, False
+            return block, None
 
         show_header = table.get("show_header", True)
         if block.height_pt <= max_height_pt:
-            return block, False
+            return block, None
 
-        max_rows = self._max_table_rows_that_fit(table, rows, max_height_pt, show_header)
+        profile = self._table_profile(block)
+        start = block.row_start
+        end = start + len(rows)
+        max_rows = self._max_table_rows_that_fit(profile, start, end, max_height_pt, show_header)
         if max_rows <= 0:
             max_rows = 1
 
-        chunk_rows = rows[:max_rows]
-        remainder_rows = rows[max_rows:]
-
-        chunk_block = {
-            "type": "table",
-            "table": {
-                "groups": table.get("groups", []),
-                "rows": chunk_rows,
-                "total_width": table.get("total_width"),
-                "dep_width": table.get("dep_width"),
-                "show_header": show_header,
-            },
-        }
-
-        chunk_height = self.measurer.measure_table(chunk_block["table"], show_header)
-        blocks[idx] = BlockItem(
-            data=chunk_block,
-            height_pt=chunk_height,
+        head = BlockItem(
+            data={"type": "table", "table": _table_chunk(table, RowRange(rows, 0, max_rows), show_header)},
+            height_pt=profile.height(start, start + max_rows, show_header),
             refs=list(block.refs),
             notes=list(block.notes),
+            table_profile=profile,
+            row_start=start,
+        )
+        if max_rows >= len(rows):
+            return head, None
+
+        # Continuation chunks never repeat the header.
+        tail = BlockItem(
+            data={"type": "table", "table": _table_chunk(table, RowRange(rows, max_rows), False)},
+            height_pt=profile.height(start + max_rows, end, False),
+            table_profile=profile,
+            row_start=start + max_rows,
         )
+        return head, tail
 
-        if remainder_rows:
-            remainder_show_header = False if show_header else False
-            remainder_block = {
-                "type": "table",
-                "table": {
-                    "groups": table.get("groups", []),
-                    "rows": remainder_rows,
-                    "total_width": table.get("total_width"),
-                    "dep_width": table.get("dep_width"),
-                    "show_header": remainder_show_header,
-                },
-            }
-            remainder_height = self.measurer.measure_table(
-                remainder_block["table"], remainder_show_header
-            )
-            blocks.insert(
-                idx + 1,
-                BlockItem(data=remainder_block, height_pt=remainder_height),
-            )
+    def _table_profile(self, block: BlockItem) -> TableProfile:
+        """Return the row profile of a table block, measuring it on first use.
 
-        return blocks[idx], bool(remainder_rows)
+        Chunks produced by splitting share the profile of the full table and
+        address their rows through ``row_start``.
+        """
+        if block.table_profile is None:
+            block.table_profile = self.measurer.measure_table_profile(block.data.get("table", {}))
+            block.row_start = 0
+        return block.table_profile
 
     def _max_table_rows_that_fit(
         self,
-        table: Dict[str, Any],
-        remaining_rows: List[Dict[str, Any]],
+        profile: TableProfile,
+        start: int,
+        end: int,
         max_height_pt: float,
         show_header: bool,
     ) -> int:
-        low = 1
-        high = len(remaining_rows)
-        best = 0
-        while low <= high:
-            mid = (low + high) // 2
-            test_table = {
-                "groups": table.get("groups", []),
-                "rows": remaining_rows[:mid],
-                "total_width": table.get("total_width"),
-                "dep_width": table.get("dep_width"),
-            }
-            height = self.measurer.measure_table(test_table, show_header)
-            if height <= max_height_pt:
-                best = mid
-                low = mid + 1
-            else:
-                high = mid - 1
-        return best
+        return min(profile.rows_that_fit(start, max_height_pt, show_header), end - start)
 
     def _split_html_block(self, html: str, max_height_pt: float) -> List[str]:
         height = self.measurer.measure_html(html)
         if height <= max_height_pt:
             return [html]
 
+        if self.layout.html_split_mode == "lines":
+            profile = self.measurer.measure_html_lines(html)
+            if profile is not None:
+                pieces = _cut_html_by_lines(profile, max_height_pt, max_height_pt, force_first=True)
+                if len(pieces) > 1:
+                    return pieces
+
         chunks = split_html_into_chunks(html)
         if len(chunks) == 1:
             return [html]
@@ -1085,6 +2873,49 @@ class Paginator:
 
         return result
 
+    def _split_html_to_fit(
+        self,
+        block: BlockItem,
+        max_height_pt: float,
+    ) -> Tuple[BlockItem, Optional[BlockItem]]:
+        """Cut an HTML block at the last line box that fits *max_height_pt*.
+
+        Only used in ``"lines"`` mode.  Returns the head and the tail, or the
+        block and ``None`` when it cannot be cut; refs follow their
+        ``<sup>`` markers.
+        """
+        html = block.data.get("html", "")
+        profile = self.measurer.measure_html_lines(html) if html else None
+        if profile is None:
+            return block, None
+
+        pieces = _cut_html_by_lines(profile, max_height_pt, math.inf, force_first=False)
+        if len(pieces) != 2 or not pieces[0]:
+            return block, None
+        head_html, tail_html = pieces
+        head_height, tail_height = self.measurer.measure_html_batch([head_html, tail_html])
+        if head_height > max_height_pt:
+            return block, None
+
+        head_numbers = set(get_html_fragment(head_html).sup_numbers)
+        head_refs: List[str] = []
+        tail_refs: List[str] = []
+        for ref in block.refs:
+            num = _parse_ref_leading_number(ref)
+            if num is not None and num in head_numbers:
+                head_refs.append(ref)
+            else:
+                tail_refs.append(ref)
+
+        head = BlockItem(
+            data={"type": "html", "html": head_html},
+            height_pt=head_height,
+            keep_with_next=False,
+            refs=head_refs,
+            notes=list(block.notes),
+        )
+        return head, BlockItem(data={"type": "html", "html": tail_html}, height_pt=tail_height, refs=tail_refs)
+
     def _content_height_with_meta(
         self, layout_state: PageLayoutState, refs: List[str], notes: List[str]
     ) -> float:
@@ -1110,50 +2941,275 @@ class Paginator:
             return self.layout.min_content_height_pt
         return content_height
 
-def _split_single_element_by_words(html: str, target_words: int = 80) -> List[str]:
-    """Split a single HTML element into multiple elements by word count.
+VOID_TAGS = {"area", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr"}
+# A tag or the text between two tags.
+_FRAGMENT_TOKEN = re.compile(r"<[^>]+>|[^<]+")
+# A tag, a word or a whitespace run.
+_WORD_TOKEN = re.compile(r"<[^>]+>|[^\s<]+|\s+")
+_TAG_NAME = re.compile(r"<\s*(/?)\s*([\w-]+)")
+# Fragments emitted by the figure, map_grid and chart_panel block types.
+_IMAGE_BLOCK = re.compile(r"""\s*<(?:img|div)\s[^>]*class=["'](?:figure|map-grid|chart-panel)\b""", re.IGNORECASE)
+_SUP_MARKER = re.compile(r"<sup[^>]*>\s*(\d+)\s*</sup>", re.IGNORECASE)
+_REF_BRACKETS = re.compile(r"\[(.*?)\]")
+_REF_SEPARATOR = re.compile(r"[;,]\s*")
+_REF_RANGE = re.compile(r"^(\d+)\s*[-–]\s*(\d+)$")
 
-    Detects the outermost wrapping tag (e.g. ``<p ...>``) and splits the inner
-    text content into chunks of approximately *target_words* words each,
-    re-wrapping every chunk in the same tag.  Inline HTML tags (``<em>``,
-    ``<strong>``, ``<sup>``, ``<a>``, etc.) inside the element are preserved
-    in whichever chunk they fall into.
-    """
-    # Match the outermost opening and closing tag.
+
+def _element_parts(html: str) -> Optional[Tuple[str, str, str, str]]:
+    """Return ``(open_tag, tag_name, inner, close_tag)`` of a single element."""
+    return get_html_fragment(html).element_parts
+
+
+def _scan_element_parts(html: str) -> Optional[Tuple[str, str, str, str]]:
     open_match = re.match(r"^(\s*<(\w+)(?:\s[^>]*)?>)", html, re.IGNORECASE | re.DOTALL)
     if not open_match:
-        return [html]
-    open_tag = open_match.group(1)
+        return None
     tag_name = open_match.group(2)
     close_tag_pattern = re.compile(rf"(</\s*{re.escape(tag_name)}\s*>\s*)$", re.IGNORECASE)
     close_match = close_tag_pattern.search(html)
     if not close_match:
-        return [html]
-    close_tag = close_match.group(1)
-    inner = html[open_match.end(): close_match.start()]
+        return None
+    return (
+        open_match.group(1),
+        tag_name.lower(),
+        html[open_match.end(): close_match.start()],
+        close_match.group(1),
+    )
 
-    # Split inner HTML by word boundaries while keeping HTML tags intact.
-    # Tokens are either HTML tags or whitespace-separated words.
-    tokens = re.findall(r"<[^>]+>|[^\s<]+|\s+", inner)
 
-    # Build a continuation open tag that zeroes out margins so split chunks
-    # render as a single continuous text flow without visible paragraph gaps.
+def _continuation_open_tag(open_tag: str) -> str:
+    """Zero the margins of *open_tag* so a continuation chunk flows on."""
     if re.search(r'\bstyle\s*=', open_tag, re.IGNORECASE):
-        # Append margin reset to existing style attribute.
-        cont_open_tag = re.sub(
+        return re.sub(
             r'(style\s*=\s*["\'])',
             r'\1margin:0;padding:0;',
             open_tag,
             count=1,
             flags=re.IGNORECASE,
         )
-    else:
-        # Inject a style attribute before the closing '>'.
-        cont_open_tag = re.sub(
-            r'\s*/?\s*>$',
-            ' style="margin:0;padding:0;">',
-            open_tag,
-        )
+    return re.sub(
+        r'\s*/?\s*>$',
+        ' style="margin:0;padding:0;">',
+        open_tag,
+    )
+
+
+def _top_level_elements(html: str) -> Optional[List[str]]:
+    """Split *html* into its top-level elements, or ``None`` if it has
+    top-level text or unbalanced markup."""
+    elements = get_html_fragment(html).elements
+    return None if elements is None else list(elements)
+
+
+def _scan_top_level_elements(html: str) -> Optional[Tuple[str, ...]]:
+    elements: List[str] = []
+    depth = 0
+    start = 0
+    for match in _FRAGMENT_TOKEN.finditer(html):
+        token = match.group(0)
+        if not token.startswith("<"):
+            if depth == 0 and token.strip():
+                return None
+            continue
+        name, kind = _tag_kind(token)
+        if depth == 0:
+            if kind != "open":
+                return None
+            start = match.start()
+        if kind == "open":
+            depth += 1
+        elif kind == "close":
+            depth -= 1
+        if depth == 0:
+            elements.append(html[start: match.end()])
+        if depth < 0:
+            return None
+    if depth != 0 or not elements:
+        return None
+    return tuple(elements)
+
+
+def _tag_kind(token: str) -> Tuple[str, str]:
+    match = _TAG_NAME.match(token)
+    if not match:
+        return "", "other"
+    name = match.group(2).lower()
+    if match.group(1):
+        return name, "close"
+    if name in VOID_TAGS or token.rstrip().endswith("/>"):
+        return name, "void"
+    return name, "open"
+
+
+def _visible_char_count(text: str) -> int:
+    return sum(1 for char in text if not char.isspace())
+
+
+def _slice_element(element_html: str, start_chars: int, end_chars: Optional[int]) -> str:
+    """Return the words of *element_html* between two visible-character
+    offsets as a standalone element.
+
+    Inline tags left open at either edge are closed and re-opened so the
+    slice stays balanced; slices after the first use a margin-reset tag.
+    """
+    fragment = get_html_fragment(element_html)
+    if fragment.element_parts is None:
+        return element_html
+    open_tag, _, _, close_tag = fragment.element_parts
+    end = math.inf if end_chars is None else end_chars
+
+    stack: List[Tuple[str, str]] = []
+    prefix: Optional[List[Tuple[str, str]]] = None
+    out: List[str] = []
+    pos = 0
+    for token, width in zip(fragment.word_tokens, fragment.token_widths):
+        if token.startswith("<"):
+            name, kind = _tag_kind(token)
+            if kind == "close":
+                inside = start_chars < pos <= end or (start_chars == pos == 0)
+            else:
+                inside = start_chars <= pos < end
+            if inside and prefix is None:
+                prefix = list(stack)
+            if inside:
+                out.append(token)
+            if kind == "open":
+                stack.append((name, token))
+            elif kind == "close":
+                for depth in range(len(stack) - 1, -1, -1):
+                    if stack[depth][0] == name:
+                        del stack[depth]
+                        break
+            continue
+
+        if width == 0:
+            if start_chars < pos < end:
+                out.append(token)
+            continue
+        if pos >= start_chars and pos + width <= end:
+            if prefix is None:
+                prefix = list(stack)
+            out.append(token)
+        pos += width
+        if pos >= end:
+            break
+
+    prefix = prefix or []
+    # Close whatever is still open inside the slice.
+    open_names = [name for name, _ in prefix]
+    for token in out:
+        if token.startswith("<"):
+            name, kind = _tag_kind(token)
+            if kind == "open":
+                open_names.append(name)
+            elif kind == "close" and name in open_names:
+                del open_names[len(open_names) - 1 - open_names[::-1].index(name)]
+    chunk_inner = "".join(token for _, token in prefix) + "".join(out).strip()
+    chunk_inner += "".join(f"</{name}>" for name in reversed(open_names))
+    tag = open_tag if start_chars == 0 else _continuation_open_tag(open_tag)
+    return f"{tag}{chunk_inner}{close_tag}"
+
+
+def _word_boundaries(element_html: str) -> List[int]:
+    """Visible-character offsets at which a word of *element_html* ends."""
+    boundaries = [0]
+    for width in get_html_fragment(element_html).token_widths:
+        if width:
+            boundaries.append(boundaries[-1] + width)
+    return boundaries
+
+
+def _cut_html_by_lines(
+    profile: HtmlLineProfile,
+    first_budget_pt: float,
+    budget_pt: float,
+    force_first: bool = True,
+) -> List[str]:
+    """Cut a profiled block into pieces at line-box boundaries.
+
+    The first piece fits *first_budget_pt* and the others *budget_pt*.
+    When *force_first* is false and nothing fits the first budget, the
+    first piece is empty.  Oversized lines or elements are placed alone.
+    """
+    pieces: List[str] = []
+    current: List[str] = []
+    piece_top = 0.0
+    budget = first_budget_pt
+
+    def flush() -> None:
+        nonlocal budget
+        pieces.append("".join(current))
+        current.clear()
+        budget = budget_pt
+
+    for element_html, (top, bottom), lines in zip(
+        profile.elements, profile.element_extents, profile.element_lines
+    ):
+        boundaries = _word_boundaries(element_html) if lines else [0]
+        total_chars = boundaries[-1]
+        trailing = bottom - lines[-1][1] if lines else 0.0
+        consumed = 0
+        while True:
+            if bottom - piece_top <= budget:
+                current.append(element_html if consumed == 0 else _slice_element(element_html, consumed, None))
+                break
+
+            cut: Optional[Tuple[float, int]] = None
+            next_top: Optional[float] = None
+            for line_top, line_bottom, chars in lines:
+                snapped = boundaries[bisect.bisect_right(boundaries, chars) - 1]
+                if snapped <= consumed:
+                    continue
+                if line_bottom + trailing - piece_top <= budget:
+                    cut = (line_bottom, snapped)
+                    continue
+                if cut is None and not current and (force_first or pieces):
+                    cut = (line_bottom, snapped)
+                    continue
+                next_top = line_top
+                break
+
+            if cut is not None and cut[1] < total_chars:
+                current.append(_slice_element(element_html, consumed, cut[1]))
+                consumed = cut[1]
+                flush()
+                piece_top = next_top if next_top is not None else cut[0]
+                continue
+
+            if not current and (force_first or pieces):
+                # Nothing smaller can be cut from this element: place it alone.
+                current.append(element_html if consumed == 0 else _slice_element(element_html, consumed, None))
+                flush()
+                piece_top = bottom
+                break
+
+            flush()
+            if consumed == 0:
+                piece_top = top
+
+    if current or not pieces:
+        pieces.append("".join(current))
+    return [piece for idx, piece in enumerate(pieces) if piece or idx == 0]
+
+
+def _split_single_element_by_words(html: str, target_words: int = 80) -> List[str]:
+    """Split a single HTML element into multiple elements by word count.
+
+    Detects the outermost wrapping tag (e.g. ``<p ...>``) and splits the inner
+    text content into chunks of approximately *target_words* words each,
+    re-wrapping every chunk in the same tag.  Inline HTML tags (``<em>``,
+    ``<strong>``, ``<sup>``, ``<a>``, etc.) inside the element are preserved
+    in whichever chunk they fall into.
+    """
+    fragment = get_html_fragment(html)
+    if fragment.element_parts is None:
+        return [html]
+    open_tag, _, _, close_tag = fragment.element_parts
+    tokens = fragment.word_tokens
+
+    # Continuation chunks zero out margins so they render as a single
+    # continuous text flow without visible paragraph gaps.
+    cont_open_tag = _continuation_open_tag(open_tag)
 
     chunks: List[str] = []
     current_tokens: List[str] = []
@@ -1181,7 +3237,124 @@ def _split_single_element_by_words(html: str, target_words: int = 80) -> List[st
     return chunks if len(chunks) > 1 else [html]
 
 
+def _height_hint(block: Dict[str, Any]) -> Optional[float]:
+    value = block.get("height_pt")
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        return None
+    return float(value)
+
+
+def _row_height_hints(block: Dict[str, Any]) -> Optional[Tuple[float, ...]]:
+    """Per-row heights of a table block, or ``None`` unless there is exactly
+    one valid height per row."""
+    values = block.get("row_heights_pt")
+    rows = block.get("table", {}).get("rows", [])
+    if not isinstance(values, list) or len(values) != len(rows):
+        return None
+    if any(isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0 for value in values):
+        return None
+    return tuple(float(value) for value in values)
+
+
+def _block_key(block: Dict[str, Any]) -> bytes:
+    """Digest of a source block for matching it across repaginations;
+    table rows are hashed with :func:`table_layout_key` rather than
+    through their repr."""
+    if block.get("type") != "table":
+        return layout_key("block", block)
+    table = block.get("table", {})
+    return layout_key(
+        "block",
+        {key: value for key, value in block.items() if key != "table"},
+        {key: value for key, value in table.items() if key != "rows"},
+        table_layout_key(table),
+    )
+
+
+def _sampled_for_verification(block: Dict[str, Any], rate: float) -> bool:
+    if rate >= 1.0:
+        return True
+    if block.get("type") == "table":
+        content = table_layout_key(block.get("table", {}))
+    else:
+        content = block.get("html", "")
+    digest = layout_key("hint", block.get("type"), content)
+    return int.from_bytes(digest[:4], "little") < rate * 2 ** 32
+
+
+def _probe_fragment(probe: MeasureProbe) -> Fragment:
+    if probe.kind in ("html", "text"):
+        return probe.args[0]
+    if probe.kind == "table":
+        return _table_fragment(*probe.args)
+    return probe.render("probe")
+
+
+def _table_fragment(table: Dict[str, Any], show_header: bool = True) -> Fragment:
+    """Telemetry size of *table* in cells, and an excerpt of its first
+    rows, without building the markup of the whole table."""
+    rows = table.get("rows", [])
+    columns = 1 + sum(len(group.get("months", [])) for group in table.get("groups", []))
+    excerpt = build_table_html(dict(table, rows=rows[:TELEMETRY_EXCERPT_ROWS]), show_header=show_header)
+    return len(rows) * columns, excerpt
+
+
+def _is_image_probe(probe: MeasureProbe) -> bool:
+    """Whether *probe* is a figure, map grid or chart panel whose height the
+    image-header shortcut can work out (other HTML with inline images is
+    laid out as usual)."""
+    return FONTTOOLS_AVAILABLE and probe.kind == "html" and bool(_IMAGE_BLOCK.match(probe.args[0]))
+
+
+def _shared_digest(probe: MeasureProbe) -> bytes:
+    width = None if probe.content_width is None else round(float(probe.content_width), 4)
+    return layout_key(probe.key, width)
+
+
+def _footer_meta_safety(refs: Sequence[str]) -> float:
+    # Keep this conservative: small font metric differences (fallbacks,
+    # italics, accented glyphs) can under-measure footer refs and cause
+    # visual overlap with the content block in the final render.
+    return 8.0 + (1.5 if refs else 0.0)
+
+
+def _probe_features(probe: MeasureProbe) -> Optional[Tuple[str, Tuple[int, ...]]]:
+    """Calibration class and per-paragraph character counts of a probe."""
+    if probe.kind == "html":
+        html_fragment = probe.args[0]
+        probe_class = "section-title" if "section-title" in html_fragment else "html"
+        paragraphs = _top_level_elements(html_fragment) or [html_fragment]
+    elif probe.kind == "text":
+        text, probe_class = probe.args
+        paragraphs = [text]
+    elif probe.kind == "footer_meta":
+        refs, notes = probe.args
+        probe_class = "footer_meta"
+        paragraphs = list(refs) + list(notes)
+    elif probe.kind in ("footer_ref", "footer_note"):
+        probe_class = probe.kind
+        paragraphs = list(probe.args)
+    elif probe.kind == "footer_contact":
+        probe_class = "footer_contact"
+        paragraphs = list(probe.args)
+    elif probe.kind == "footer_page":
+        probe_class = "footer_page"
+        paragraphs = list(probe.args)
+    else:
+        return None
+    chars: List[int] = []
+    for paragraph in paragraphs:
+        for line in re.split(r"<br\s*/?>", paragraph):
+            text = _html.unescape(re.sub(r"<[^>]+>", " ", line))
+            chars.append(len(" ".join(text.split())))
+    return probe_class, tuple(chars)
+
+
 def split_html_into_chunks(html: str) -> List[str]:
+    return list(get_html_fragment(html).chunks)
+
+
+def _scan_html_chunks(html: str) -> List[str]:
     lowered = html.lower()
     for tag in ("p", "div", "li", "h1", "h2", "h3", "h4", "h5", "h6"):
         close_tag = f"</{tag}>"
@@ -1232,14 +3405,127 @@ def split_html_into_chunks(html: str) -> List[str]:
     return [html]
 
 
+class HtmlFragment:
+    """What the paginator reads from one HTML fragment, scanned once.
+
+    Fragments are shared through :func:`get_html_fragment`, so the normalize,
+    ref-distribution and split passes (and later runs over the same
+    content) read these instead of scanning the string again.  Markers and
+    keep-with-next classes are found up front; element boundaries, chunks,
+    word tokens, bracketed ref ids and the measurement key only when first
+    asked for.  Treat the tuples as read-only.
+    """
+
+    __slots__ = (
+        "html",
+        "keep_with_next",
+        "sup_numbers",
+        "_elements",
+        "_element_parts",
+        "_chunks",
+        "_word_tokens",
+        "_token_widths",
+        "_ref_ids",
+        "_layout_key",
+    )
+
+    def __init__(self, html: str):
+        self.html = html
+        lowered = html.lower()
+        self.keep_with_next = "section-title" in lowered or "section-subtitle" in lowered
+        self.sup_numbers: Tuple[str, ...] = tuple(_SUP_MARKER.findall(html)) if "<sup" in lowered else ()
+        self._elements: Any = MISSING
+        self._element_parts: Any = MISSING
+        self._chunks: Optional[Tuple[str, ...]] = None
+        self._word_tokens: Optional[Tuple[str, ...]] = None
+        self._token_widths: Optional[Tuple[int, ...]] = None
+        self._ref_ids: Optional[Tuple[str, ...]] = None
+        self._layout_key: Optional[bytes] = None
+
+    @property
+    def layout_key(self) -> bytes:
+        """Measurement cache key of the fragment as an ``html`` probe."""
+        if self._layout_key is None:
+            self._layout_key = layout_key("html", self.html)
+        return self._layout_key
+
+    @property
+    def elements(self) -> Optional[Tuple[str, ...]]:
+        """Top-level elements, or ``None`` (see :func:`_top_level_elements`)."""
+        if self._elements is MISSING:
+            self._elements = _scan_top_level_elements(self.html)
+        return self._elements
+
+    @property
+    def element_parts(self) -> Optional[Tuple[str, str, str, str]]:
+        if self._element_parts is MISSING:
+            self._element_parts = _scan_element_parts(self.html)
+        return self._element_parts
+
+    @property
+    def chunks(self) -> Tuple[str, ...]:
+        """Pieces :func:`split_html_into_chunks` cuts the fragment into."""
+        if self._chunks is None:
+            self._chunks = tuple(_scan_html_chunks(self.html))
+        return self._chunks
+
+    @property
+    def word_tokens(self) -> Tuple[str, ...]:
+        """Tags, words and whitespace runs of the single element's inner
+        HTML (empty when the fragment is not one element)."""
+        if self._word_tokens is None:
+            parts = self.element_parts
+            self._word_tokens = tuple(_WORD_TOKEN.findall(parts[2])) if parts is not None else ()
+        return self._word_tokens
+
+    @property
+    def token_widths(self) -> Tuple[int, ...]:
+        """Visible characters of each of :attr:`word_tokens` (0 for tags
+        and whitespace)."""
+        if self._token_widths is None:
+            self._token_widths = tuple(
+                0 if token.startswith("<") else _visible_char_count(_html.unescape(token))
+                for token in self.word_tokens
+            )
+        return self._token_widths
+
+    @property
+    def ref_ids(self) -> Tuple[str, ...]:
+        """Catalog ids cited as ``[1]``, ``[2, 4]`` or ``[3-5]``."""
+        if self._ref_ids is None:
+            self._ref_ids = tuple(_scan_ref_ids(self.html)) if "[" in self.html else ()
+        return self._ref_ids
+
+
+def get_html_fragment(html: str) -> HtmlFragment:
+    """The shared :class:`HtmlFragment` of *html*, from a process-wide
+    cache bounded by ``FRAGMENT_CACHE_BYTES``."""
+    with _FRAGMENT_LOCK:
+        fragment = _FRAGMENTS.get(html)
+        if fragment is None:
+            fragment = HtmlFragment(html)
+            _FRAGMENTS.set(html, fragment)
+    return fragment
+
+
+def _fragment_size(value: Any) -> int:
+    # Sized up front, for the scans a fragment may fill in later.
+    if isinstance(value, HtmlFragment):
+        return FRAGMENT_BYTES_PER_CHAR * len(value.html)
+    return sys.getsizeof(value)
+
+
+_FRAGMENTS = MemoryCache(max_bytes=FRAGMENT_CACHE_BYTES, sizeof=_fragment_size)
+_FRAGMENT_LOCK = threading.Lock()
+
+
 def _needs_keep_with_next(html: str) -> bool:
-    lowered = html.lower()
-    return "section-title" in lowered or "section-title-serif" in lowered or "section-subtitle" in lowered
+    return get_html_fragment(html).keep_with_next
 
 
 def _extract_sup_numbers(html: str) -> List[str]:
     """Extract numbers from ``<sup>N</sup>`` markers in *html*."""
-    return re.findall(r"<sup[^>]*>\s*(\d+)\s*</sup>", html, re.IGNORECASE)
+    return list(get_html_fragment(html).sup_numbers)
 
 
 def _parse_ref_leading_number(ref: str) -> Optional[str]:
@@ -1251,7 +3537,7 @@ def _parse_ref_leading_number(ref: str) -> Optional[str]:
 def _refs_from_html(html: str, refs_catalog: Dict[str, str]) -> List[str]:
     if not refs_catalog:
         return []
-    ids = _extract_ref_ids(html)
+    ids = get_html_fragment(html).ref_ids
     refs = []
     for ref_id in ids:
         ref_text = refs_catalog.get(ref_id)
@@ -1261,14 +3547,18 @@ def _refs_from_html(html: str, refs_catalog: Dict[str, str]) -> List[str]:
 
 
 def _extract_ref_ids(html: str) -> List[str]:
+    return list(get_html_fragment(html).ref_ids)
+
+
+def _scan_ref_ids(html: str) -> List[str]:
     ids: List[str] = []
     seen = set()
-    for match in re.findall(r"\[(.*?)\]", html):
-        for token in re.split(r"[;,]\s*", match.strip()):
+    for match in _REF_BRACKETS.findall(html):
+        for token in _REF_SEPARATOR.split(match.strip()):
             token = token.strip()
             if not token:
                 continue
-            range_match = re.match(r"^(\d+)\s*[-–]\s*(\d+)$", token)
+            range_match = _REF_RANGE.match(token)
             if range_match:
                 start = int(range_match.group(1))
                 end = int(range_match.group(2))
@@ -1279,15 +3569,136 @@ def _extract_ref_ids(html: str) -> List[str]:
                         ids.append(key)
                         seen.add(key)
                 continue
-            if re.match(r"^\d+$", token):
+            if token.isdecimal():
                 if token not in seen:
                     ids.append(token)
                     seen.add(token)
     return ids
 
 
+class _MarkerIndex:
+    """Where each ``<sup>N</sup>`` marker of a logical page first appears,
+    and the leading number of every ref looked up so far.
+
+    Built once per logical page and shared by both ref-distribution passes:
+    placing a ref is a dictionary lookup instead of a scan over every
+    block's markers.  Refs only move between blocks here, never the
+    markers, so the index stays valid for the whole page.
+    """
+
+    __slots__ = ("first_marker", "_ref_numbers")
+
+    def __init__(self, blocks: Sequence[BlockItem]):
+        # marker number -> (block index, position among the block's markers)
+        self.first_marker: Dict[str, Tuple[int, int]] = {}
+        self._ref_numbers: Dict[str, Optional[str]] = {}
+        for idx, block in enumerate(blocks):
+            html = block.data.get("html", "")
+            if not html:
+                continue
+            for position, num in enumerate(get_html_fragment(html).sup_numbers):
+                self.first_marker.setdefault(num, (idx, position))
+
+    def ref_number(self, ref: str) -> Optional[str]:
+        try:
+            return self._ref_numbers[ref]
+        except KeyError:
+            num = self._ref_numbers[ref] = _parse_ref_leading_number(ref)
+            return num
+
+    def assign(self, blocks: Sequence[BlockItem], ref_by_number: Dict[str, str]) -> set:
+        """Append every ref to the block holding its number's first marker;
+        returns the numbers placed.  A block receives its refs in the order
+        of its markers."""
+        placed = sorted(
+            (self.first_marker[num], num) for num in ref_by_number if num in self.first_marker
+        )
+        for (idx, _), num in placed:
+            blocks[idx].refs.append(ref_by_number[num])
+        return {num for _, num in placed}
+
+
+def _cover_page(page: Dict[str, Any]) -> Dict[str, Any]:
+    page_copy = dict(page)
+    page_copy.setdefault("page_number", "")
+    page_copy.setdefault("show_header_titles", False)
+    return page_copy
+
+
 def _suffix_sums(values: List[float]) -> List[float]:
     suffix = [0.0] * (len(values) + 1)
     for idx in range(len(values) - 1, -1, -1):
         suffix[idx] = suffix[idx + 1] + values[idx]
     return suffix
+
+
+def _common_prefix_length(left: Sequence[Any], right: Sequence[Any]) -> int:
+    length = 0
+    for a, b in zip(left, right):
+        if a != b:
+            break
+        length += 1
+    return length
+
+
+def _table_chunk(table: Dict[str, Any], rows: Sequence[Dict[str, Any]], show_header: bool) -> Dict[str, Any]:
+    return {
+        "groups": table.get("groups", []),
+        "rows": rows,
+        "total_width": table.get("total_width"),
+        "dep_width": table.get("dep_width"),
+        "show_header": show_header,
+    }
+
+
+class _BlockCursor:
+    """Index-based walk over a page's normalized blocks.
+
+    A block split at a page break is replaced in place by its remainder
+    instead of inserting into the list, and the height left to place comes
+    from suffix sums computed once, so a page costs O(blocks on it).
+    """
+
+    def __init__(self, blocks: List[BlockItem]):
+        self._blocks = blocks
+        self._suffix = _suffix_sums([block.height_pt for block in blocks])
+        self._idx = 0
+        self._current: Optional[BlockItem] = blocks[0] if blocks else None
+
+    @property
+    def position(self) -> Tuple[int, Optional[BlockItem]]:
+        """``(index, remainder)``: the remainder is ``None`` unless the block
+        at *index* was split and only its tail is left to place."""
+        if self.done or self._current is self._blocks[self._idx]:
+            return self._idx, None
+        return self._idx, self._current
+
+    def seek(self, idx: int, remainder: Optional[BlockItem] = None) -> None:
+        self._idx = idx
+        if remainder is not None:
+            self._current = remainder
+        else:
+            self._current = self._blocks[idx] if idx < len(self._blocks) else None
+
+    @property
+    def done(self) -> bool:
+        return self._idx >= len(self._blocks)
+
+    @property
+    def current(self) -> BlockItem:
+        return self._current
+
+    @property
+    def next(self) -> Optional[BlockItem]:
+        idx = self._idx + 1
+        return self._blocks[idx] if idx < len(self._blocks) else None
+
+    def remaining_height(self) -> float:
+        return self._current.height_pt + self._suffix[self._idx + 1]
+
+    def replace_current(self, block: BlockItem) -> None:
+        self._current = block
+
+    def advance(self) -> None:
+        self._idx += 1
+        self._current = self._blocks[self._idx] if self._idx < len(self._blocks) else None
@@ -0,0 +1,216 @@
+import dataclasses
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pdfgen_juanipis.blocks import RENDER_TYPES, emit_block
+from pdfgen_juanipis.fontmetrics import FONTTOOLS_AVAILABLE
+from pdfgen_juanipis.measure_cache import layout_key, measurement_fingerprint
+
+PLAN_VERSION = 1
+# Page dict fields copied unchanged from the source page; a plan does not
+# repeat them.
+SOURCE_FIELDS = ("header_logo_path", "title_line1", "title_line2", "footer_site", "footer_phone")
+# Files whose intrinsic size can move page breaks.
+ASSET_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".bmp", ".tif", ".tiff"}
+_SRC_ATTR = re.compile(r"""\bsrc\s*=\s*["']([^"']+)["']""", re.IGNORECASE)
+
+
+@dataclasses.dataclass(frozen=True)
+class PaginationPlan:
+    """Where every physical page of a paginated document comes from, so it
+    can be rendered again without measuring or paginating anything.
+
+    ``pages`` holds one entry per physical page: the index of its
+    ``source`` page, its geometry, refs and notes, and its ``blocks`` as
+    ``{"block": index}`` for a whole source block, ``{"block": index,
+    "rows": [start, end], "show_header": bool}`` for a run of a table's
+    rows, or ``{"html": fragment}`` for a piece of a split block.  Covers
+    are ``{"source": index, "cover": true}``.  ``fingerprint`` covers the
+    stylesheet, fonts, WeasyPrint version, layout, measure mode and
+    calibration (see :func:`plan_fingerprint`); ``document`` is the digest
+    of the input the plan was made for (see :func:`document_digest`).
+    """
+
+    fingerprint: str
+    document: str
+    pages: List[Dict[str, Any]]
+
+    def matches(self, fingerprint: str, document: str) -> bool:
+        return self.fingerprint == fingerprint and self.document == document
+
+    def save(self, path: str) -> None:
+        payload = {
+            "version": PLAN_VERSION,
+            "fingerprint": self.fingerprint,
+            "document": self.document,
+            "pages": self.pages,
+        }
+        Path(path).write_text(json.dumps(payload, separators=(",", ":"), sort_keys=True), encoding="utf-8")
+
+
+def load_plan(path: str) -> PaginationPlan:
+    payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    if payload.get("version") != PLAN_VERSION:
+        raise ValueError(f"Unsupported pagination plan version: {payload.get('version')!r}")
+    return PaginationPlan(
+        fingerprint=payload.get("fingerprint", ""),
+        document=payload.get("document", ""),
+        pages=payload.get("pages", []),
+    )
+
+
+def plan_fingerprint(css_path: str, layout: Any, measure_mode: str, calibration: Any = None) -> str:
+    """Digest of everything page breaks depend on besides the document."""
+    from pdfgen_juanipis.pagination import MEASURE_CSS
+
+    # Mirror the paginator's fallback, so both sides agree on the mode.
+    if measure_mode == "analytic" and not FONTTOOLS_AVAILABLE:
+        measure_mode = "weasyprint"
+    measured = measurement_fingerprint(str(css_path), MEASURE_CSS, layout.content_width_pt)
+    return layout_key("plan", measured, layout, measure_mode, repr(calibration)).hex()
+
+
+def document_digest(data: Any, *options: Any) -> str:
+    """Digest of a document's input data and the *options* it is prepared
+    with; pass :func:`asset_signature` among the options so edited images
+    invalidate the plan too."""
+    return layout_key("document", data, options).hex()
+
+
+def asset_signature(data: Any, base_dir: str) -> Tuple[Tuple[str, Optional[int], Optional[int]], ...]:
+    """``(path, size, mtime)`` of every image *data* references, by asset
+    path or by ``src`` attribute in its HTML, relative paths resolved
+    against *base_dir*.  Missing files are listed with ``None``."""
+    paths = set()
+    pending = [data]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+        elif isinstance(value, str):
+            if "<" in value:
+                paths.update(_SRC_ATTR.findall(value))
+            elif os.path.splitext(value)[1].lower() in ASSET_SUFFIXES:
+                paths.add(value)
+    signature = []
+    for value in sorted(paths):
+        path = Path(value[len("file://") :] if value.startswith("file://") else value)
+        if os.path.splitext(path.name)[1].lower() not in ASSET_SUFFIXES:
+            continue
+        try:
+            stat = (Path(base_dir) / path).stat()
+        except OSError:
+            signature.append((value, None, None))
+            continue
+        signature.append((value, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def encode_pages(
+    pages_data: Sequence[Dict[str, Any]], sourced_pages: Sequence[Tuple[int, Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """Plan entries of paginated pages, given as ``(source index, page dict)``."""
+    indexes: Dict[int, "_SourceIndex"] = {}
+    entries: List[Dict[str, Any]] = []
+    for source, page_dict in sourced_pages:
+        source_page = pages_data[source]
+        if source_page.get("cover"):
+            entries.append({"source": source, "cover": True})
+            continue
+        index = indexes.get(source)
+        if index is None:
+            index = indexes[source] = _SourceIndex(source_page.get("blocks", []))
+        entry = {
+            key: value for key, value in page_dict.items() if key not in SOURCE_FIELDS and key != "blocks"
+        }
+        entry["source"] = source
+        entry["intro"] = bool(page_dict.get("intro"))
+        entry["blocks"] = [index.encode(block) for block in page_dict.get("blocks", [])]
+        entries.append(entry)
+    return entries
+
+
+def pages_from_plan(plan: PaginationPlan, pages_data: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The page dicts *plan* describes, rebuilt from the prepared source
+    pages it was made from."""
+    from pdfgen_juanipis.pagination import _cover_page
+
+    pages: List[Dict[str, Any]] = []
+    for entry in plan.pages:
+        source_page = pages_data[entry["source"]]
+        if entry.get("cover"):
+            pages.append(_cover_page(source_page))
+            continue
+        blocks = source_page.get("blocks", [])
+        page_dict = {key: value for key, value in entry.items() if key != "source"}
+        for key in SOURCE_FIELDS:
+            page_dict[key] = source_page.get(key, "")
+        page_dict["intro"] = source_page.get("intro", "") if entry.get("intro") else ""
+        page_dict["blocks"] = [_decode_block(blocks, block) for block in entry.get("blocks", [])]
+        pages.append(page_dict)
+    return pages
+
+
+class _SourceIndex:
+    """Finds the source block behind each block of a paginated page."""
+
+    def __init__(self, blocks: Sequence[Dict[str, Any]]):
+        self.tables: List[Tuple[int, Dict[str, Any]]] = []
+        self.by_html: Dict[str, int] = {}
+        for idx, block in enumerate(blocks):
+            if block.get("type") == "table":
+                self.tables.append((idx, block))
+            else:
+                html = _source_html(block)
+                if html is not None:
+                    self.by_html.setdefault(html, idx)
+        self.by_id: Dict[int, int] = {id(block): idx for idx, block in self.tables}
+        self.by_rows: Dict[int, int] = {id(block.get("table", {}).get("rows")): idx for idx, block in self.tables}
+
+    def encode(self, block: Dict[str, Any]) -> Dict[str, Any]:
+        from pdfgen_juanipis.pagination import RowRange
+
+        if block.get("type") == "table":
+            idx = self.by_id.get(id(block))
+            if idx is not None:
+                return {"block": idx}
+            table = block.get("table", {})
+            rows = table.get("rows")
+            if isinstance(rows, RowRange):
+                idx = self.by_rows.get(id(rows.base))
+            if idx is None:
+                raise ValueError("Table block does not view the rows of a source table")
+            return {"block": idx, "rows": list(rows.bounds), "show_header": table.get("show_header", True)}
+        html = block.get("html", "")
+        idx = self.by_html.get(html)
+        return {"block": idx} if idx is not None else {"html": html}
+
+
+def _source_html(block: Dict[str, Any]) -> Optional[str]:
+    """HTML a source block is paginated as when it is not split."""
+    if block.get("type") not in RENDER_TYPES:
+        block = emit_block(block)
+        if block is None:
+            return None
+    return block.get("html", "")
+
+
+def _decode_block(blocks: Sequence[Dict[str, Any]], entry: Dict[str, Any]) -> Dict[str, Any]:
+    from pdfgen_juanipis.pagination import RowRange, _table_chunk
+
+    if "html" in entry:
+        return {"type": "html", "html": entry["html"]}
+    block = blocks[entry["block"]]
+    if block.get("type") == "table":
+        if "rows" not in entry:
+            return block
+        table = block.get("table", {})
+        start, end = entry["rows"]
+        chunk = _table_chunk(table, RowRange(table.get("rows", []), start, end), entry["show_header"])
+        return {"type": "table", "table": chunk}
+    return {"type": "html", "html": _source_html(block)}
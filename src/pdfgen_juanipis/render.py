@@ -3,12 +3,26 @@ import pathlib
 import sys
 
 from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML, CSS
+from weasyprint import HTML
 
 if __name__ == "__main__" and __package__ is None:
     sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2] / "src"))
 
-from pdfgen_juanipis.pagination import LayoutConfig, Paginator
+from pdfgen_juanipis.blocks import emit_block
+from pdfgen_juanipis.calibration import CalibrationRecorder, load_calibration
+from pdfgen_juanipis.measure_cache import measurement_fingerprint
+from pdfgen_juanipis.measure_pool import MeasurementPool
+from pdfgen_juanipis.page_pool import PaginationPool
+from pdfgen_juanipis.pagination import MEASURE_CSS, LayoutConfig, Paginator, compact_table_rows
+from pdfgen_juanipis.plan import (
+    PaginationPlan,
+    asset_signature,
+    document_digest,
+    load_plan,
+    pages_from_plan,
+    plan_fingerprint,
+)
+from pdfgen_juanipis.style_context import get_style_context
 from pdfgen_juanipis.validator import normalize_assets, validate_and_normalize
 
 ROOT = pathlib.Path(__file__).resolve().parents[2]
@@ -176,19 +190,6 @@ def build_sample_data():
     return data
 
 
-def _paragraphs_from_text(text):
-    if isinstance(text, list):
-        return [t.strip() for t in text if t and t.strip()]
-    if not text:
-        return []
-    chunks = []
-    for block in str(text).split("\n\n"):
-        block = " ".join([line.strip() for line in block.splitlines()]).strip()
-        if block:
-            chunks.append(block)
-    return chunks
-
-
 def _section_heading_html(title, subtitle):
     html = f"<div class=\"section-title\">{title}</div>" if title else ""
     if subtitle:
@@ -196,28 +197,6 @@ def _section_heading_html(title, subtitle):
     return html
 
 
-def _map_grid_html(items):
-    blocks = []
-    for item in items:
-        path = item.get("path")
-        label = item.get("label", "")
-        blocks.append(
-            "<div class=\"map-item\">"
-            f"<img class=\"map-img\" src=\"{path}\" alt=\"{label}\" />"
-            f"<div class=\"map-label\">{label}</div>"
-            "</div>"
-        )
-    return "<div class=\"map-grid\">" + "".join(blocks) + "</div>"
-
-
-def _figure_html(path, caption, wide=False):
-    cls = "figure figure-wide" if wide else "figure"
-    html = f"<img class=\"{cls}\" src=\"{path}\" alt=\"{caption}\" />"
-    if caption:
-        html += f"<div class=\"figure-caption\">{caption}</div>"
-    return html
-
-
 def _blocks_from_section(section):
     blocks = []
     title_html = _section_heading_html(section.get("title"), section.get("subtitle"))
@@ -225,36 +204,9 @@ def _blocks_from_section(section):
         blocks.append({"type": "html", "html": title_html, "keep_with_next": True})
 
     for item in section.get("content", []):
-        itype = item.get("type", "text")
-        if itype == "text":
-            paragraphs = _paragraphs_from_text(item.get("text"))
-            if paragraphs:
-                html = "".join(f"<p>{p}</p>" for p in paragraphs)
-                block = {"type": "html", "html": html}
-            else:
-                continue
-        elif itype == "figure":
-            block = {
-                "type": "html",
-                "html": _figure_html(item.get("path"), item.get("caption", ""), item.get("wide", False)),
-            }
-        elif itype == "map_grid":
-            html = _map_grid_html(item.get("items", []))
-            if item.get("caption"):
-                html += f"<div class=\"figure-caption\">{item['caption']}</div>"
-            if item.get("source"):
-                html += f"<div class=\"figure-source\">{item['source']}</div>"
-            block = {"type": "html", "html": html}
-        elif itype == "table":
-            block = {"type": "table", "table": item.get("table", {})}
-        else:
-            block = {"type": "html", "html": item.get("html", "")}
-
-        if item.get("refs"):
-            block["refs"] = item.get("refs")
-        if item.get("footer_notes"):
-            block["footer_notes"] = item.get("footer_notes")
-        blocks.append(block)
+        block = emit_block(item)
+        if block is not None:
+            blocks.append(block)
 
     if section.get("refs") and blocks:
         blocks[0].setdefault("refs", [])
@@ -295,6 +247,72 @@ def _build_pages_from_sections(data):
     return data
 
 
+def _prepare_data(data, validate, root_dir):
+    if validate:
+        data, warnings = validate_and_normalize(data, root_dir=root_dir)
+        for warning in warnings:
+            print(f"[validate] {warning}")
+    else:
+        data = normalize_assets(data, root_dir=root_dir)
+
+    if "sections" in data and "pages" not in data:
+        data = _build_pages_from_sections(data)
+    # Validation worked on a copy, so its row dicts can go.
+    compact_table_rows(data.get("pages", []))
+    return data
+
+
+def _layout_from_theme(data):
+    # Build LayoutConfig from theme overrides (if any)
+    _layout_kw = {}
+    _theme = data.get("theme") or {}
+    for _key in ("header_title_align", "header_subtitle_align", "html_split_mode", "page_breaker"):
+        if _key in _theme:
+            _layout_kw[_key] = str(_theme[_key])
+    return LayoutConfig(**_layout_kw)
+
+
+def calibrate_documents(
+    documents,
+    css_path=None,
+    fonts_conf=None,
+    root_dir=None,
+    validate=True,
+):
+    """Paginate *documents* with WeasyPrint and fit estimator corrections
+    from every measurement taken along the way."""
+    root_dir = pathlib.Path(root_dir) if root_dir else ROOT
+    css_path = pathlib.Path(css_path) if css_path else CSS_PATH
+    fonts_conf = pathlib.Path(fonts_conf) if fonts_conf else None
+    if fonts_conf and fonts_conf.exists():
+        os.environ.setdefault("FONTCONFIG_FILE", str(fonts_conf))
+
+    recorder = CalibrationRecorder()
+    layout = LayoutConfig()
+    for data in documents:
+        data = _prepare_data(data, validate, root_dir)
+        layout = _layout_from_theme(data)
+        paginator = Paginator(
+            layout,
+            str(css_path),
+            str(root_dir),
+            fonts_conf_path=str(fonts_conf) if fonts_conf else None,
+            calibration_recorder=recorder,
+        )
+        paginator.paginate(data["pages"])
+    return recorder.fit(measurement_fingerprint(str(css_path), MEASURE_CSS, layout.content_width_pt))
+
+
+def _read_plan(path):
+    if not path.exists():
+        return None
+    try:
+        return load_plan(str(path))
+    except ValueError as exc:
+        print(f"[plan] Ignoring {path}: {exc}")
+        return None
+
+
 def render_pdf(
     data,
     output_path=OUTPUT_PDF,
@@ -307,6 +325,17 @@ def render_pdf(
     root_dir=None,
     output_bytes=False,
     dpi=192,
+    cache_dir=None,
+    measure_mode="weasyprint",
+    calibration_path=None,
+    verify_hints=0.0,
+    telemetry=None,
+    geometry_cache=None,
+    measure_workers=0,
+    measure_pool=None,
+    page_workers=0,
+    page_pool=None,
+    plan=None,
 ):
     root_dir = pathlib.Path(root_dir) if root_dir else ROOT
     template_dir = pathlib.Path(template_dir) if template_dir else TEMPLATE_DIR
@@ -318,35 +347,72 @@ def render_pdf(
     env = Environment(loader=FileSystemLoader(str(template_dir)))
     template = env.get_template(TEMPLATE_NAME)
 
-    if validate:
-        data, warnings = validate_and_normalize(data, root_dir=root_dir)
-        for warning in warnings:
-            print(f"[validate] {warning}")
-    else:
-        data = normalize_assets(data, root_dir=root_dir)
-
-    if "sections" in data and "pages" not in data:
-        data = _build_pages_from_sections(data)
-
-    # Build LayoutConfig from theme overrides (if any)
-    _layout_kw = {}
-    _theme = data.get("theme") or {}
-    for _key in ("header_title_align", "header_subtitle_align"):
-        if _key in _theme:
-            _layout_kw[_key] = str(_theme[_key])
-    layout = LayoutConfig(**_layout_kw)
-    paginator = Paginator(layout, str(css_path), str(root_dir), fonts_conf_path=str(fonts_conf))
-    if paginate:
-        data["pages"] = paginator.paginate(data["pages"])
+    # A plan is a PaginationPlan, or the path of a plan file that is
+    # (re)written whenever the document has to be paginated again.
+    plan_path = None
+    if plan is not None and not isinstance(plan, PaginationPlan):
+        plan_path = pathlib.Path(plan)
+        plan = _read_plan(plan_path)
+    source_digest = ""
+    source_data = data
+    data = _prepare_data(data, validate, root_dir)
+    if plan_path is not None or plan is not None:
+        # Prepared data names the resolved asset files.
+        assets = asset_signature(data, str(root_dir))
+        source_digest = document_digest(source_data, validate, str(root_dir), assets)
+    layout = _layout_from_theme(data)
+    calibration = load_calibration(str(calibration_path)) if calibration_path else None
+    if (
+        paginate
+        and plan is not None
+        and plan.matches(plan_fingerprint(str(css_path), layout, measure_mode, calibration), source_digest)
+    ):
+        data["pages"] = pages_from_plan(plan, data["pages"])
+        paginate = False
+    elif paginate and plan is not None:
+        print("[plan] Stylesheet, fonts, layout or document changed; paginating again")
+    # A pool passed in is the caller's to close; one started here only
+    # lives for this render.
+    own_pools = []
+    if measure_pool is None and measure_workers and paginate and measure_mode == "weasyprint":
+        measure_pool = MeasurementPool(measure_workers, str(css_path))
+        own_pools.append(measure_pool)
+    if page_pool is None and page_workers and paginate:
+        page_pool = PaginationPool(page_workers)
+        own_pools.append(page_pool)
+    try:
+        if paginate:
+            paginator = Paginator(
+                layout,
+                str(css_path),
+                str(root_dir),
+                fonts_conf_path=str(fonts_conf),
+                cache_dir=str(cache_dir) if cache_dir else None,
+                measure_mode=measure_mode,
+                calibration=calibration,
+                verify_hints=verify_hints,
+                telemetry=telemetry,
+                geometry_cache=geometry_cache,
+                measure_pool=measure_pool,
+                page_pool=page_pool,
+            )
+            if plan_path is not None:
+                data["pages"], plan = paginator.paginate_with_plan(data["pages"], document=source_digest)
+                plan.save(str(plan_path))
+            else:
+                data["pages"] = paginator.paginate(data["pages"])
+    finally:
+        for pool in own_pools:
+            pool.close()
     data["layout"] = layout.to_template()
 
     html = template.render(**data)
 
-    stylesheets = [CSS(filename=str(css_path))]
-    if css_extra:
-        stylesheets.append(CSS(string=str(css_extra)))
+    # Same parsed stylesheet and font configuration the paginator measured with.
+    style_context = get_style_context(str(css_path))
+    stylesheets, font_config = style_context.render_stylesheets(str(css_extra or ""))
 
-    weasyprint_options = {"dpi": dpi}
+    weasyprint_options = {"dpi": dpi, "font_config": font_config}
     if output_bytes or output_path is None:
         return HTML(string=html, base_url=str(root_dir)).write_pdf(
             stylesheets=stylesheets, **weasyprint_options
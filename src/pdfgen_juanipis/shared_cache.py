@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import fcntl
+
+    SHARED_CACHE_AVAILABLE = True
+except ImportError:  # pragma: no cover - POSIX only
+    fcntl = None
+    SHARED_CACHE_AVAILABLE = False
+
+LOGGER = logging.getLogger(__name__)
+
+SHARED_CACHE_ENV = "PDFGEN_SHARED_CACHE"
+SHARED_CACHE_SLOTS_ENV = "PDFGEN_SHARED_CACHE_SLOTS"
+DEFAULT_SHARED_SLOTS = 1 << 18
+
+MAGIC = b"PDFGHC02"
+# magic, slot count
+HEADER = struct.Struct("<8sQ")
+HEADER_SIZE = 64
+# sequence, state, key digest, height
+SLOT = struct.Struct("<II16sd")
+SLOT_EMPTY = 0
+SLOT_FULL = 1
+MAX_PROBES = 64
+READ_RETRIES = 4
+
+# (pid, path, fingerprint, slots) -> open cache.  One mapping per process:
+# a forked child reopens the file, since flock is shared with the parent's
+# descriptor.
+_OPEN_CACHES: Dict[Tuple[int, str, str, int], "SharedHeightCache"] = {}
+_OPEN_CACHES_LOCK = threading.Lock()
+
+
+class SharedHeightCache:
+    """Open-addressing table of 16-byte digests to heights in a memory-mapped
+    file, shared by every process on the machine that opens the same path.
+
+    Reads take no lock: each slot carries a sequence number that writers
+    make odd while they update it, and readers retry (or treat the slot as
+    a miss) when it changes under them.  Writers serialize on ``flock``.
+    Inserts are best effort: when the probe window is full the value is
+    simply not shared.  Slot keys mix in the measurement fingerprint, so
+    processes with different stylesheets, fonts or content widths can share
+    one file: each only ever finds its own entries.  Opening the file with
+    a different slot count resets it.
+    """
+
+    def __init__(self, path: str, fingerprint: str, slots: int = DEFAULT_SHARED_SLOTS):
+        if not SHARED_CACHE_AVAILABLE:
+            raise OSError("Shared measurement cache requires fcntl (POSIX)")
+        self.path = path
+        self.slots = int(slots)
+        self.fingerprint = hashlib.sha256(fingerprint.encode("utf-8")).digest()
+        self._size = HEADER_SIZE + self.slots * SLOT.size
+        self._write_lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            self._initialize()
+            self._map = mmap.mmap(self._fd, self._size)
+        except Exception:
+            os.close(self._fd)
+            raise
+
+    def get_many(self, digests: Iterable[bytes]) -> Dict[bytes, float]:
+        found: Dict[bytes, float] = {}
+        if not self._header_matches():
+            return found
+        for digest in digests:
+            height = self._lookup(self._slot_key(digest))
+            if height is not None:
+                found[digest] = height
+        return found
+
+    def set_many(self, items: Iterable[Tuple[bytes, float]]) -> None:
+        items = list(items)
+        if not items:
+            return
+        with self._write_lock, _FileLock(self._fd):
+            if not self._header_matches():
+                return
+            for digest, height in items:
+                self._insert(self._slot_key(digest), float(height))
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+    def _initialize(self) -> None:
+        with _FileLock(self._fd):
+            current_size = os.fstat(self._fd).st_size
+            header = os.pread(self._fd, HEADER.size, 0)
+            if len(header) == HEADER.size and current_size >= self._size:
+                magic, slots = HEADER.unpack(header)
+                if magic == MAGIC and slots == self.slots:
+                    return
+            # Invalidate the header first so readers in other processes stop
+            # trusting the slots, zero them in place (never shrink the file:
+            # other processes may still have it mapped) and publish the new
+            # header last.
+            os.pwrite(self._fd, bytes(HEADER_SIZE), 0)
+            if current_size < self._size:
+                os.ftruncate(self._fd, self._size)
+            zeros = bytes(1 << 20)
+            for offset in range(HEADER_SIZE, self._size, len(zeros)):
+                os.pwrite(self._fd, zeros[: min(len(zeros), self._size - offset)], offset)
+            os.pwrite(self._fd, HEADER.pack(MAGIC, self.slots), 0)
+
+    def _header_matches(self) -> bool:
+        magic, slots = HEADER.unpack_from(self._map, 0)
+        return magic == MAGIC and slots == self.slots
+
+    def _slot_key(self, digest: bytes) -> bytes:
+        return hashlib.blake2b(digest, digest_size=16, key=self.fingerprint).digest()
+
+    def _slot_offsets(self, digest: bytes) -> Iterable[int]:
+        start = int.from_bytes(digest[:8], "little") % self.slots
+        for step in range(min(MAX_PROBES, self.slots)):
+            yield HEADER_SIZE + ((start + step) % self.slots) * SLOT.size
+
+    def _lookup(self, digest: bytes) -> Optional[float]:
+        for offset in self._slot_offsets(digest):
+            for _ in range(READ_RETRIES):
+                sequence, state, key, height = SLOT.unpack_from(self._map, offset)
+                if sequence % 2 == 0 and SLOT.unpack_from(self._map, offset)[0] == sequence:
+                    break
+            else:
+                # A writer kept this slot busy; treat as a miss.
+                return None
+            if state == SLOT_EMPTY:
+                return None
+            if key == digest:
+                return height
+        return None
+
+    def _insert(self, digest: bytes, height: float) -> None:
+        for offset in self._slot_offsets(digest):
+            sequence, state, key, _ = SLOT.unpack_from(self._map, offset)
+            if state == SLOT_EMPTY or key == digest:
+                struct.pack_into("<I", self._map, offset, sequence + 1)
+                SLOT.pack_into(self._map, offset, sequence + 1, SLOT_FULL, digest, height)
+                struct.pack_into("<I", self._map, offset, sequence + 2)
+                return
+
+
+def shared_cache_from_env(fingerprint: str) -> Optional[SharedHeightCache]:
+    """The cache named by ``PDFGEN_SHARED_CACHE`` (a file path, e.g. under
+    ``/dev/shm``), or ``None`` when it is unset or unusable.
+
+    The file is opened and mapped once per process and fingerprint; later
+    calls return the same cache, which stays open for the process's life.
+    """
+    path = os.environ.get(SHARED_CACHE_ENV)
+    if not path:
+        return None
+    try:
+        slots = int(os.environ.get(SHARED_CACHE_SLOTS_ENV, DEFAULT_SHARED_SLOTS))
+        key = (os.getpid(), path, fingerprint, slots)
+        with _OPEN_CACHES_LOCK:
+            cache = _OPEN_CACHES.get(key)
+            if cache is None:
+                cache = _OPEN_CACHES[key] = SharedHeightCache(path, fingerprint, slots=slots)
+        return cache
+    except (OSError, ValueError) as exc:
+        LOGGER.warning("Shared measurement cache unavailable at %s: %s", path, exc)
+        return None
+
+
+class _FileLock:
+    def __init__(self, fd: int):
+        self._fd = fd
+
+    def __enter__(self) -> None:
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc_info) -> None:
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
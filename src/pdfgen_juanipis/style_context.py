@@ -0,0 +1,96 @@
+import dataclasses
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+try:
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    WEASYPRINT_AVAILABLE = True
+except Exception:  # pragma: no cover - optional dependency for measurement
+    CSS = None
+    FontConfiguration = None
+    WEASYPRINT_AVAILABLE = False
+
+from pdfgen_juanipis.measure_cache import stylesheet_signature
+
+MAX_STRING_STYLESHEETS = 64
+
+
+@dataclasses.dataclass
+class StyleContext:
+    """A parsed stylesheet and the font configuration its ``@font-face``
+    rules were loaded into.
+
+    Probe layouts and the final ``write_pdf`` must use the stylesheets
+    together with ``font_config``; extra CSS strings are parsed through
+    :meth:`string_stylesheet` so they share the same configuration, or
+    through :meth:`render_stylesheets` when they may bring fonts of their
+    own.
+    """
+
+    css_path: str
+    signature: Tuple[Any, ...]
+    font_config: Any
+    stylesheet: Any
+    _strings: "OrderedDict[str, Any]" = dataclasses.field(default_factory=OrderedDict)
+    _lock: threading.Lock = dataclasses.field(default_factory=threading.Lock)
+
+    def string_stylesheet(self, css_text: str) -> Any:
+        with self._lock:
+            sheet = self._strings.get(css_text)
+            if sheet is not None:
+                self._strings.move_to_end(css_text)
+                return sheet
+        sheet = CSS(string=css_text, font_config=self.font_config)
+        with self._lock:
+            self._strings[css_text] = sheet
+            while len(self._strings) > MAX_STRING_STYLESHEETS:
+                self._strings.popitem(last=False)
+        return sheet
+
+    def render_stylesheets(self, css_extra: str = "") -> Tuple[List[Any], Any]:
+        """Stylesheets and font configuration for one render with *css_extra*.
+
+        Extra CSS with ``@font-face`` rules gets a font configuration of its
+        own, loaded with the main stylesheet too, so its fonts do not leak
+        into later renders sharing this context.
+        """
+        if not css_extra:
+            return [self.stylesheet], self.font_config
+        if "@font-face" not in css_extra.lower():
+            return [self.stylesheet, self.string_stylesheet(css_extra)], self.font_config
+        font_config = FontConfiguration()
+        stylesheets = [
+            CSS(filename=self.css_path, font_config=font_config),
+            CSS(string=css_extra, font_config=font_config),
+        ]
+        return stylesheets, font_config
+
+
+_CONTEXTS: "dict[str, StyleContext]" = {}
+_CONTEXTS_LOCK = threading.Lock()
+
+
+def get_style_context(css_path: str) -> Optional[StyleContext]:
+    """Shared context for *css_path*, rebuilt only when the stylesheet, the
+    font files it references or ``FONTCONFIG_FILE`` change."""
+    if not WEASYPRINT_AVAILABLE:
+        return None
+    path = str(Path(css_path).resolve())
+    signature = stylesheet_signature(path)
+    with _CONTEXTS_LOCK:
+        context = _CONTEXTS.get(path)
+        if context is not None and context.signature == signature:
+            return context
+        font_config = FontConfiguration()
+        context = StyleContext(
+            css_path=path,
+            signature=signature,
+            font_config=font_config,
+            stylesheet=CSS(filename=path, font_config=font_config),
+        )
+        _CONTEXTS[path] = context
+        return context
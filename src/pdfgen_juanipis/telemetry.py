@@ -0,0 +1,130 @@
+import dataclasses
+import heapq
+import json
+import math
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+LARGEST_FRAGMENTS = 5
+FRAGMENT_EXCERPT_CHARS = 160
+
+# A measured fragment: its HTML, sized in characters, or a ``(cells,
+# excerpt)`` pair for tables, whose full markup is not built just to be
+# counted.
+Fragment = Union[str, Tuple[int, str]]
+
+
+@dataclasses.dataclass
+class ProbeKindStats:
+    """Measurement counters for one probe kind.
+
+    ``layouts`` counts the WeasyPrint layouts that contained at least one
+    probe of the kind.  A batch layout's wall time is shared evenly among
+    the probes it measured, and each share is one timing sample.
+    """
+
+    layouts: int = 0
+    hits: int = 0
+    misses: int = 0
+    total_time_s: float = 0.0
+    samples_s: List[float] = dataclasses.field(default_factory=list, repr=False)
+    # Min-heap of (size, excerpt) for the largest fragments measured, and
+    # the unit of their sizes ("chars", or "cells" for tables).
+    largest: List[Tuple[int, str]] = dataclasses.field(default_factory=list)
+    unit: str = "chars"
+
+    @property
+    def p95_time_s(self) -> float:
+        if not self.samples_s:
+            return 0.0
+        ordered = sorted(self.samples_s)
+        return ordered[max(1, math.ceil(0.95 * len(ordered))) - 1]
+
+    def add_fragment(self, fragment: Fragment) -> None:
+        if isinstance(fragment, tuple):
+            self.unit = "cells"
+            size, excerpt = fragment
+        else:
+            size, excerpt = len(fragment), fragment
+        self.keep_largest((size, excerpt[:FRAGMENT_EXCERPT_CHARS]))
+
+    def keep_largest(self, entry: Tuple[int, str]) -> None:
+        if len(self.largest) < LARGEST_FRAGMENTS:
+            heapq.heappush(self.largest, entry)
+        elif entry[0] > self.largest[0][0]:
+            heapq.heapreplace(self.largest, entry)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "layouts": self.layouts,
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_time_s": self.total_time_s,
+            "p95_time_s": self.p95_time_s,
+            "largest_fragments": [
+                {self.unit: size, "excerpt": excerpt} for size, excerpt in sorted(self.largest, reverse=True)
+            ],
+        }
+
+
+class MeasureTelemetry:
+    """Per-kind measurement statistics of a :class:`BlockMeasurer`.
+
+    Kinds are the probe kinds (``html``, ``text``, ``table``,
+    ``footer_meta``, ``footer_contact``, ``footer_page``, ...) plus
+    ``table_profile`` and ``lines`` for the row and line profiles.
+    """
+
+    def __init__(self):
+        self.kinds: Dict[str, ProbeKindStats] = {}
+        self.layouts = 0
+
+    def kind(self, name: str) -> ProbeKindStats:
+        stats = self.kinds.get(name)
+        if stats is None:
+            stats = self.kinds[name] = ProbeKindStats()
+        return stats
+
+    def record_hit(self, kind: str) -> None:
+        self.kind(kind).hits += 1
+
+    def record_measurement(
+        self, measured: Sequence[Tuple[str, Fragment]], elapsed_s: float, layouts: int
+    ) -> None:
+        """Record ``(kind, fragment)`` cache misses resolved together in
+        *elapsed_s* seconds by *layouts* WeasyPrint layouts."""
+        if not measured:
+            return
+        self.layouts += layouts
+        share = elapsed_s / len(measured)
+        for name in {kind for kind, _ in measured}:
+            self.kind(name).layouts += layouts
+        for kind, fragment in measured:
+            stats = self.kind(kind)
+            stats.misses += 1
+            stats.total_time_s += share
+            stats.samples_s.append(share)
+            stats.add_fragment(fragment)
+
+    def merge(self, other: "MeasureTelemetry") -> None:
+        """Add the counters of *other* (e.g. a worker process's) to these."""
+        self.layouts += other.layouts
+        for name, theirs in other.kinds.items():
+            stats = self.kind(name)
+            stats.layouts += theirs.layouts
+            stats.hits += theirs.hits
+            stats.misses += theirs.misses
+            stats.total_time_s += theirs.total_time_s
+            stats.samples_s.extend(theirs.samples_s)
+            if theirs.largest:
+                stats.unit = theirs.unit
+            for entry in theirs.largest:
+                stats.keep_largest(entry)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "layouts": self.layouts,
+            "kinds": {name: self.kinds[name].to_dict() for name in sorted(self.kinds)},
+        }
+
+    def to_json(self, indent: int = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
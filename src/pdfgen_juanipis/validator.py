@@ -4,8 +4,10 @@ import pathlib
 import re
 from typing import Any, Dict, List, Tuple
 
+from pdfgen_juanipis.blocks import BLOCK_TYPES, extend_schema
 
-ALLOWED_BLOCK_TYPES = {"text", "table", "figure", "map_grid", "html"}
+# The block-type registry itself, so registered types are accepted too.
+ALLOWED_BLOCK_TYPES = BLOCK_TYPES
 DEFAULT_TABLE_WIDTH = 532.66
 DEFAULT_DEP_WIDTH = 120.0
 
@@ -70,9 +72,9 @@ def _normalize_blocks_assets(blocks: List[Dict[str, Any]], assets_dir: pathlib.P
         if not isinstance(block, dict):
             continue
         block_type = block.get("type", "text")
-        if block_type == "figure":
-            _normalize_path(block, "path", assets_dir, [])
-        elif block_type == "map_grid":
+        for key in _asset_keys(block_type):
+            _normalize_path(block, key, assets_dir, [])
+        if block_type == "map_grid":
             items = block.get("items", [])
             if isinstance(items, list):
                 for item in items:
@@ -130,10 +132,14 @@ def _validate_blocks(
             warnings.append(f"Unknown block type: {block_type}")
             continue
 
+        for key in _asset_keys(block_type):
+            _normalize_path(block, key, assets_dir, warnings)
+        if ALLOWED_BLOCK_TYPES[block_type].validate is not None:
+            ALLOWED_BLOCK_TYPES[block_type].validate(block, warnings)
+
         if block_type == "table":
             _validate_table(block.get("table", {}), warnings)
-        elif block_type == "figure":
-            _normalize_path(block, "path", assets_dir, warnings)
+            _validate_row_heights(block, warnings)
         elif block_type == "map_grid":
             items = block.get("items", [])
             if not isinstance(items, list):
@@ -187,6 +193,23 @@ def _validate_table(table: Dict[str, Any], warnings: List[str]) -> None:
             row["vals"] = vals[:num_cols]
 
 
+def _asset_keys(block_type: str) -> Tuple[str, ...]:
+    registered = ALLOWED_BLOCK_TYPES.get(block_type)
+    return registered.asset_keys if registered is not None else ()
+
+
+def _validate_row_heights(block: Dict[str, Any], warnings: List[str]) -> None:
+    row_heights = block.get("row_heights_pt")
+    if row_heights is None:
+        return
+    rows = block.get("table", {}).get("rows", [])
+    if not isinstance(row_heights, list) or len(row_heights) != len(rows):
+        warnings.append(
+            f"table row_heights_pt must list one height per row ({len(rows)}); ignoring the hint"
+        )
+        del block["row_heights_pt"]
+
+
 def _validate_text_block(block: Dict[str, Any], refs_catalog: Dict[str, str], warnings: List[str]) -> None:
     text = block.get("text", "")
     if isinstance(text, list):
@@ -278,7 +301,7 @@ def _validate_schema(data: Dict[str, Any], root_dir: pathlib.Path) -> List[str]:
         warnings.append(f"Failed to read schema.json: {exc}")
         return warnings
 
-    validator = Draft7Validator(schema)
+    validator = Draft7Validator(extend_schema(schema))
     errors = sorted(validator.iter_errors(data), key=lambda e: e.path)
     for err in errors:
         loc = ".".join(str(p) for p in err.path)
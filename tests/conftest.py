@@ -1,5 +1,66 @@
+import dataclasses
 import pathlib
 import sys
 
+import pytest
+
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT / "src"))
+
+from pdfgen_juanipis.pagination import LayoutConfig, Paginator  # noqa: E402
+
+
+@pytest.fixture
+def make_paginator(tmp_path):
+    """Paginators over a dummy stylesheet in ``tmp_path``, in estimate mode
+    unless ``measure_mode`` says otherwise.  ``page_breaker`` goes to the
+    layout and every other keyword to :class:`Paginator`."""
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+
+    def make(page_breaker=None, **kwargs):
+        layout = LayoutConfig()
+        if page_breaker is not None:
+            layout = dataclasses.replace(layout, page_breaker=page_breaker)
+        kwargs.setdefault("measure_mode", "estimate")
+        return Paginator(layout, str(css_path), str(tmp_path), **kwargs)
+
+    return make
+
+
+@pytest.fixture
+def make_page():
+    """Source pages of the ``pages`` form holding *blocks*."""
+
+    def make(blocks, title="Titulo", refs=(), notes=(), **fields):
+        page = {
+            "header_banner_path": "banner.png",
+            "header_logo_path": "logo.png",
+            "title_line1": title,
+            "title_line2": "Subtitulo",
+            "blocks": blocks,
+            "refs": list(refs),
+            "footer_notes": list(notes),
+            "page_number": "1",
+        }
+        page.update(fields)
+        return page
+
+    return make
+
+
+@pytest.fixture
+def make_table():
+    """Two-month tables of *row_count* departments."""
+
+    def make(row_count, **fields):
+        table = {
+            "groups": [{"title": "G", "months": ["Enero", "Febrero"]}],
+            "rows": [{"dep": f"Dept {idx}", "vals": ["1", "2"]} for idx in range(row_count)],
+            "total_width": 532.66,
+            "dep_width": 120.0,
+        }
+        table.update(fields)
+        return table
+
+    return make
@@ -0,0 +1,100 @@
+import pathlib
+
+import pytest
+
+from pdfgen_juanipis.blocks import (
+    BLOCK_TYPES,
+    KPI_ROW_GAP_PT,
+    KPI_ROW_HEIGHT_PT,
+    BlockType,
+    emit_block,
+    extend_schema,
+    register_block_type,
+)
+from pdfgen_juanipis.pagination import LayoutConfig, Paginator
+from pdfgen_juanipis.validator import validate_and_normalize
+
+KPI_ROW_PT = KPI_ROW_HEIGHT_PT + KPI_ROW_GAP_PT
+
+
+def _tiles(count):
+    return [{"label": f"Indicador {idx}", "value": idx} for idx in range(count)]
+
+
+def test_emit_block_for_builtin_types():
+    assert emit_block({"type": "text", "text": "Uno\n\nDos"})["html"] == "<p>Uno</p><p>Dos</p>"
+    assert emit_block({"type": "text", "text": ""}) is None
+    table = {"groups": [], "rows": []}
+    assert emit_block({"type": "table", "table": table, "refs": ["1 Fuente"]}) == {
+        "type": "table",
+        "table": table,
+        "refs": ["1 Fuente"],
+    }
+
+    kpi = emit_block({"type": "kpi_tiles", "tiles": _tiles(6)})
+    assert kpi["type"] == "html" and kpi["block_type"] == "kpi_tiles"
+    assert kpi["html"].count('class="kpi-tile"') == 6
+    assert kpi["height_pt"] == pytest.approx(2 * KPI_ROW_PT)
+
+    panel = emit_block({"type": "chart_panel", "path": "chart.png", "panel_height_pt": 120})
+    assert panel["height_pt"] == pytest.approx(128.0)
+    assert emit_block({"type": "text", "text": "Uno", "height_pt": 0})["height_pt"] == 0
+    assert emit_block({"type": "table", "table": table, "row_heights_pt": []})["row_heights_pt"] == []
+
+
+def test_paginator_places_fixed_height_blocks_without_measuring(tmp_path):
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    paginator = Paginator(LayoutConfig(), str(css_path), str(tmp_path))
+    blocks = [
+        {"type": "kpi_tiles", "tiles": _tiles(40)},
+        {"type": "chart_panel", "path": "chart.png"},
+    ]
+    items = paginator._normalize_blocks(blocks, 5 * KPI_ROW_PT + 1.0, {})
+
+    assert [item.height_pt for item in items] == pytest.approx([5 * KPI_ROW_PT] * 2 + [188.0])
+    assert sum(item.data["html"].count('class="kpi-tile"') for item in items[:2]) == 40
+    assert "html" not in paginator.measure_stats.kinds
+
+
+def test_registered_type_is_validated_and_in_schema(tmp_path):
+    register_block_type(
+        BlockType(
+            "banner_strip",
+            lambda item: f"<div class=\"strip\">{item.get('label', '')}</div>",
+            height=lambda item: 20.0,
+            schema={"label": {"type": "string"}},
+        )
+    )
+    try:
+        schema = extend_schema({"definitions": {"block": {"properties": {"type": {"type": "string"}}}}})
+        assert "banner_strip" in schema["definitions"]["block"]["properties"]["type"]["enum"]
+        assert schema["definitions"]["block"]["properties"]["label"] == {"type": "string"}
+
+        data = {"sections": [{"content": [{"type": "banner_strip", "label": "Hola"}, {"type": "kpi_tiles"}]}]}
+        _, warnings = validate_and_normalize(data, root_dir=pathlib.Path.cwd())
+        assert not any("Unknown block type" in warning for warning in warnings)
+        assert any("kpi_tiles.tiles" in warning for warning in warnings)
+    finally:
+        del BLOCK_TYPES["banner_strip"]
+
+
+def test_measure_hook_sizes_blocks_with_the_paginators_measurer(tmp_path):
+    register_block_type(
+        BlockType(
+            "captioned_logo",
+            lambda item: f"<div class=\"logo\"><p>{item['caption']}</p></div>",
+            measure=lambda item, measurer: 40.0 + measurer.measure_text_block(item["caption"], "figure-caption"),
+        )
+    )
+    try:
+        css_path = tmp_path / "dummy.css"
+        css_path.write_text(".content { font-size: 12pt; }")
+        paginator = Paginator(LayoutConfig(), str(css_path), str(tmp_path), measure_mode="estimate")
+        caption = paginator.measurer.measure_text_block("Logo", "figure-caption")
+        items = paginator._normalize_blocks([{"type": "captioned_logo", "caption": "Logo"}], 600.0, {})
+
+        assert [item.height_pt for item in items] == pytest.approx([40.0 + caption])
+        assert "html" not in paginator.measure_stats.kinds
+    finally:
+        del BLOCK_TYPES["captioned_logo"]
@@ -0,0 +1,80 @@
+import pathlib
+
+import pytest
+
+from pdfgen_juanipis.calibration import (
+    Calibration,
+    CalibrationRecorder,
+    ErrorStats,
+    LineModel,
+    TableModel,
+    fit_line_model,
+    load_calibration,
+)
+from pdfgen_juanipis.pagination import EstimateMeasurer, LayoutConfig, Paginator
+
+
+def test_fit_line_model_recovers_parameters():
+    truth = LineModel(chars_per_line=60, line_height_pt=13.2, offset_pt=4.0)
+    samples = [((chars, 30), truth.estimate((chars, 30))) for chars in range(5, 400, 7)]
+    model = fit_line_model(samples)
+    assert model.chars_per_line == 60
+    assert model.line_height_pt == pytest.approx(13.2)
+    assert model.offset_pt == pytest.approx(4.0)
+
+
+def test_error_stats_percentiles():
+    stats = ErrorStats.from_errors([-1.0] + [0.5] * 8 + [10.0])
+    assert stats.count == 10
+    assert stats.p50_pt == 0.5
+    assert stats.p90_pt == 1.0
+    assert stats.max_pt == 10.0
+
+
+def test_calibration_round_trip(tmp_path):
+    calibration = Calibration(
+        fingerprint="fp",
+        line_models={"html": LineModel(70.0, 14.0, 2.0)},
+        table=TableModel(header_height_pt=30.0, row_height_pt=15.0, chrome_height_pt=4.0),
+        errors={"html": ErrorStats.from_errors([0.5, 1.0])},
+    )
+    path = tmp_path / "calibration.json"
+    calibration.save(str(path))
+    assert load_calibration(str(path)) == calibration
+
+
+def test_recorder_requires_samples():
+    with pytest.raises(ValueError):
+        CalibrationRecorder().fit()
+
+
+def test_estimate_measurer_uses_calibration(tmp_path):
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    calibration = Calibration(
+        fingerprint="",
+        line_models={"html": LineModel(10.0, 10.0, 1.0)},
+        table=TableModel(header_height_pt=30.0, row_height_pt=15.0, chrome_height_pt=4.0),
+    )
+    measurer = EstimateMeasurer(str(css_path), str(tmp_path), LayoutConfig(), calibration=calibration)
+
+    assert measurer.measure_html("<p>abcdefghijklmnopqrst</p><p>x</p>") == pytest.approx(31.0)
+    table = {"groups": [], "rows": [{"dep": "A", "vals": []}] * 3}
+    assert measurer.measure_table(table, show_header=True) == pytest.approx(79.0)
+    assert measurer.measure_table_profile(table).rows_that_fit(0, 64.0, show_header=True) == 2
+
+
+def test_recorder_collects_real_layouts():
+    css_path = pathlib.Path(__file__).resolve().parents[1] / "src" / "pdfgen_juanipis" / "templates" / "boletin.css"
+    paginator = Paginator(LayoutConfig(), str(css_path), str(css_path.parent), measure_mode="analytic")
+    if paginator.measure_mode != "analytic":
+        pytest.skip("analytic measurement unavailable")
+    recorder = CalibrationRecorder()
+    paginator.measurer.recorder = recorder
+
+    fragments = [f"<p>{'palabra ' * count}</p>" for count in range(1, 120, 6)]
+    paginator.measurer.measure_html_batch(fragments)
+    calibration = recorder.fit()
+
+    assert calibration.errors["html"].count == len(fragments)
+    assert calibration.errors["html"].p95_pt < calibration.baseline_errors["html"].p95_pt
@@ -9,6 +9,7 @@ from pdfgen_juanipis.pagination import (
     BlockItem,
     LayoutConfig,
     Paginator,
+    _MarkerIndex,
     _extract_sup_numbers,
     _parse_ref_leading_number,
 )
@@ -329,3 +330,29 @@ def test_redistribute_non_numeric_refs_to_fallback(tmp_path):
 
     assert blocks[0].refs == ["1 Fuente A"]
     assert blocks[1].refs == ["Nota sin numero"]
+
+
+def test_marker_index_is_shared_by_both_passes(tmp_path):
+    """One index serves both passes; a block gets its refs in marker order
+    and a marker repeated later does not move its ref."""
+    layout = LayoutConfig()
+    css = tmp_path / "dummy.css"
+    css.write_text(".content { font-size: 12pt; }")
+    paginator = Paginator(layout, str(css), str(tmp_path))
+
+    blocks = [
+        _make_block('<p>Uno<sup>3</sup> y<sup>1</sup></p>'),
+        _make_block('<p>Dos<sup>1</sup><sup>2</sup></p>', refs=["2 Fuente B", "Nota libre"]),
+    ]
+    markers = _MarkerIndex(blocks)
+    assert markers.first_marker == {"3": (0, 0), "1": (0, 1), "2": (1, 1)}
+
+    remaining = paginator._distribute_page_refs_to_blocks(
+        blocks, ["1 Fuente A", "3 Fuente C", "7 Sin marcador"], markers
+    )
+    assert remaining == ["7 Sin marcador"]
+    assert blocks[0].refs == ["3 Fuente C", "1 Fuente A"]
+
+    paginator._redistribute_block_refs(blocks, markers)
+    assert blocks[0].refs == ["3 Fuente C", "1 Fuente A"]
+    assert blocks[1].refs == ["2 Fuente B", "Nota libre"]
@@ -0,0 +1,114 @@
+import pathlib
+
+import pytest
+
+from pdfgen_juanipis import fontmetrics
+from pdfgen_juanipis.pagination import MEASURE_CSS, LayoutConfig, Paginator
+
+pytestmark = pytest.mark.skipif(not fontmetrics.FONTTOOLS_AVAILABLE, reason="fontTools not installed")
+
+CSS_PATH = pathlib.Path(fontmetrics.__file__).resolve().parent / "templates" / "boletin.css"
+
+
+def _engine(width=444.0):
+    return fontmetrics.AnalyticLayout(str(CSS_PATH), 612.0, MEASURE_CSS.format(content_width=width))
+
+
+def test_font_metrics_widths_from_bundled_font():
+    metrics = fontmetrics.load_font_metrics(str(fontmetrics.DEFAULT_FONT_FILE))
+    assert metrics.text_width("", 12) == 0.0
+    assert metrics.text_width("WW", 12) == pytest.approx(2 * metrics.text_width("W", 12))
+    assert metrics.text_width("W", 12) > metrics.text_width("i", 12)
+    assert metrics.text_width("abc", 24) == pytest.approx(2 * metrics.text_width("abc", 12))
+    assert metrics.text_widths(["abc", "", "W"], 12) == pytest.approx(
+        [metrics.text_width("abc", 12), 0.0, metrics.text_width("W", 12)]
+    )
+
+
+def test_stylesheet_resolves_font_faces():
+    engine = _engine()
+    regular = engine.stylesheet.font_for("Calibri", 400, False)
+    bold = engine.stylesheet.font_for("Calibri", 700, False)
+    assert "Bold" in bold.path and "Bold" not in regular.path
+
+
+def test_analytic_heights_grow_with_text_and_narrower_width():
+    short = '<div class="content"><div id="p"><p>Hola mundo</p></div></div>'
+    long = '<div class="content"><div id="p"><p>' + "palabra " * 200 + "</p></div></div>"
+    wide = _engine(444.0)
+    narrow = _engine(220.0)
+
+    one_line = wide.probe_height(short, "p")
+    assert one_line > 0
+    assert wide.probe_height(long, "p") > 5 * one_line
+    assert narrow.probe_height(long, "p") > wide.probe_height(long, "p")
+
+
+def test_computed_styles_key_on_inline_style_and_parent_style():
+    engine = _engine()
+    small = '<div class="content"><div id="p"><p style="font-size: 8pt">Hola mundo</p></div></div>'
+    large = '<div class="content"><div id="p"><p style="font-size: 20pt">Hola mundo</p></div></div>'
+    assert engine.probe_height(large, "p") > engine.probe_height(small, "p")
+
+    root = fontmetrics._Element("html", {})
+    span = fontmetrics._Element("span", {})
+    inline = engine.computed_style([root, span], engine.root_style)
+    block = engine.computed_style([root, span], fontmetrics.dataclasses.replace(engine.root_style, font_size=20.0))
+    assert (inline.font_size, block.font_size) == (engine.root_style.font_size, 20.0)
+
+    for idx in range(fontmetrics.MAX_COMPUTED_STYLES + 10):
+        engine.computed_style([root, fontmetrics._Element("p", {"style": f"margin-top: {idx}pt"})], engine.root_style)
+    assert len(engine._style_cache) == fontmetrics.MAX_COMPUTED_STYLES
+
+
+def test_analytic_layout_rejects_images():
+    html = '<div class="content"><div id="p"><img src="x.png"></div></div>'
+    assert _engine().probe_height(html, "p") is None
+
+
+def test_paginator_analytic_mode_splits_long_content():
+    layout = LayoutConfig()
+    paginator = Paginator(layout, str(CSS_PATH), str(CSS_PATH.parent), measure_mode="analytic")
+    paragraphs = "".join(f"<p>Parrafo {idx} " + "texto de prueba " * 40 + "</p>" for idx in range(30))
+    pages = paginator.paginate(
+        [
+            {
+                "header_banner_path": "banner.png",
+                "header_logo_path": "logo.png",
+                "title_line1": "Titulo",
+                "title_line2": "Subtitulo",
+                "footer_site": "abaco.org.co",
+                "footer_phone": "Telefono: 313 245 79 78",
+                "blocks": [{"type": "html", "html": paragraphs}],
+                "refs": [],
+                "footer_notes": [],
+                "page_number": "1",
+            }
+        ]
+    )
+    assert len(pages) > 1
+
+    profile = paginator.measurer.measure_table_profile(
+        {
+            "groups": [{"title": "2024", "months": ["Ene", "Feb"]}],
+            "rows": [{"dep": "Antioquia", "vals": [1, 2]}] * 4,
+        }
+    )
+    assert profile.row_count == 4
+    assert profile.header_height_pt > 0
+    assert profile.row_offsets_pt[-1] == pytest.approx(4 * profile.row_offsets_pt[1])
+
+
+def test_paginator_rejects_unknown_measure_mode():
+    with pytest.raises(ValueError):
+        Paginator(LayoutConfig(), str(CSS_PATH), str(CSS_PATH.parent), measure_mode="guess")
+
+
+def test_incremental_footer_meta_matches_full_block():
+    paginator = Paginator(LayoutConfig(), str(CSS_PATH), str(CSS_PATH.parent), measure_mode="analytic")
+    measurer = paginator.measurer
+    refs = [f"{idx} Fuente: Encuesta nacional de hogares, " + "boletin tecnico " * (idx % 5) for idx in range(1, 19)]
+    notes = ["Nota: cifras preliminares.", "Las estimaciones se ajustan a proyecciones de poblacion " * 3]
+    for case_refs, case_notes in ((refs, notes), (refs[:1], []), ([], notes), (refs[:7], notes[:1])):
+        full = measurer.measure_batch([measurer.footer_meta_probe(case_refs, case_notes)])[0]
+        assert measurer.measure_footer_meta(case_refs, case_notes) == pytest.approx(full, abs=0.01)
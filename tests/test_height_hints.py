@@ -0,0 +1,39 @@
+import pytest
+
+
+def test_height_hints_are_trusted(make_paginator, make_table):
+    paginator = make_paginator(measure_mode="weasyprint")
+    blocks = [
+        {"type": "html", "html": "<p>Grafico mensual</p>", "height_pt": 123.0},
+        {"type": "table", "table": make_table(3), "row_heights_pt": [10.0, 20.0, 30.0]},
+        {"type": "html", "html": "<p>Sin pista</p>", "height_pt": -4},
+    ]
+    items = paginator._normalize_blocks(blocks, 600.0, {})
+
+    assert items[0].height_pt == 123.0
+    profile = items[1].table_profile
+    assert profile.row_offsets_pt == (0.0, 10.0, 30.0, 60.0)
+    assert items[1].height_pt == pytest.approx(profile.header_height_pt + profile.chrome_height_pt + 60.0)
+    assert items[2].height_pt == paginator.measurer.measure_html("<p>Sin pista</p>")
+
+
+def test_oversized_hint_is_still_split(make_paginator):
+    paginator = make_paginator(measure_mode="weasyprint")
+    html = "".join(f"<p>Parrafo {idx} " + "texto " * 40 + "</p>" for idx in range(40))
+    items = paginator._normalize_blocks([{"type": "html", "html": html, "height_pt": 5000.0}], 300.0, {})
+    assert len(items) > 1
+    assert all(item.height_pt != 5000.0 for item in items)
+
+
+def test_verify_hints_drops_wrong_hints(make_paginator):
+    paginator = make_paginator(measure_mode="weasyprint", verify_hints=1.0)
+    measured = paginator.measurer.measure_html("<p>Texto</p>")
+    blocks = [
+        {"type": "html", "html": "<p>Texto</p>", "height_pt": measured + 50.0},
+        {"type": "html", "html": "<p>Texto</p>", "height_pt": measured + 0.5},
+    ]
+    items = paginator._normalize_blocks(blocks, 600.0, {})
+
+    assert [item.height_pt for item in items] == [measured, measured + 0.5]
+    assert len(paginator.hint_mismatches) == 1
+    assert paginator.hint_mismatches[0].hinted_pt == measured + 50.0
@@ -0,0 +1,100 @@
+import pathlib
+import struct
+import zlib
+
+import pytest
+
+from pdfgen_juanipis import fontmetrics
+from pdfgen_juanipis.calibration import CalibrationRecorder
+from pdfgen_juanipis.images import ImageSize, image_size
+from pdfgen_juanipis.measure_cache import PersistentHeightCache, probe_digest
+from pdfgen_juanipis.pagination import BlockMeasurer, LayoutConfig
+
+CSS_PATH = pathlib.Path(fontmetrics.__file__).resolve().parent / "templates" / "boletin.css"
+
+
+def _png(path, width, height):
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = b"IHDR" + ihdr
+    path.write_bytes(
+        b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + chunk + struct.pack(">I", zlib.crc32(chunk))
+    )
+    return path
+
+
+def _jpeg(path, width, height, orientation=None):
+    data = b"\xff\xd8"
+    if orientation is not None:
+        tiff = b"MM\x00\x2a" + struct.pack(">I", 8) + struct.pack(">H", 1)
+        tiff += struct.pack(">HHIHH", 0x0112, 3, 1, orientation, 0) + b"\x00\x00\x00\x00"
+        app1 = b"Exif\x00\x00" + tiff
+        data += b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1
+    sof = struct.pack(">BHHB", 8, height, width, 3) + b"\x01\x11\x00" * 3
+    data += b"\xff\xc0" + struct.pack(">H", len(sof) + 2) + sof + b"\xff\xd9"
+    path.write_bytes(data)
+    return path
+
+
+def test_image_size_reads_headers(tmp_path):
+    assert image_size(str(_png(tmp_path / "a.png", 400, 200))) == ImageSize(400, 200)
+    (tmp_path / "b.gif").write_bytes(b"GIF89a" + struct.pack("<HH", 30, 20) + b"\x00" * 8)
+    assert image_size(str(tmp_path / "b.gif")) == ImageSize(30, 20)
+    assert image_size(str(_jpeg(tmp_path / "c.jpg", 640, 480))) == ImageSize(640, 480)
+    assert image_size(str(_jpeg(tmp_path / "d.jpg", 640, 480, orientation=6))) == ImageSize(480, 640)
+
+    (tmp_path / "e.svg").write_text('<svg xmlns="http://www.w3.org/2000/svg" width="3in" viewBox="0 0 300 150"/>')
+    assert image_size(str(tmp_path / "e.svg")) == ImageSize(288, 144)
+    assert image_size("file://" + str(tmp_path / "a.png")) == ImageSize(400, 200)
+    assert image_size("a.png", str(tmp_path)) == ImageSize(400, 200)
+    assert image_size(str(tmp_path / "missing.png")) is None
+    assert image_size("https://example.org/a.png") is None
+
+
+def test_image_size_cache_tracks_file_changes(tmp_path):
+    path = _png(tmp_path / "a.png", 400, 200)
+    assert image_size(str(path)) == ImageSize(400, 200)
+    _png(path, 100, 300)
+    assert image_size(str(path)) == ImageSize(100, 300)
+
+
+@pytest.mark.skipif(not fontmetrics.FONTTOOLS_AVAILABLE, reason="fontTools not installed")
+def test_figure_and_map_grid_heights_from_headers(tmp_path):
+    figure = _png(tmp_path / "figure.png", 400, 200)
+    tile = _png(tmp_path / "tile.png", 100, 100)
+    measurer = BlockMeasurer(str(CSS_PATH), str(tmp_path), LayoutConfig())
+
+    # 400px = 300pt wide, 150pt tall; the 4pt bottom margin collapses with
+    # the 8pt (8pt * 1.1) caption line.
+    figure_html = f'<img class="figure" src="{figure}" alt="" /><div class="figure-caption">Mapa</div>'
+    assert measurer.measure_html(figure_html) == pytest.approx(150.0 + 4.0 + 8.8)
+
+    wide_html = f'<img class="figure figure-wide" src="{figure}" alt="" />'
+    assert measurer.measure_html(wide_html) == pytest.approx(LayoutConfig().content_width_pt / 2)
+
+    items = "".join(
+        f'<div class="map-item"><img class="map-img" src="{tile}" alt="" /><div class="map-label">X</div></div>'
+        for _ in range(3)
+    )
+    tile_side = 0.31 * LayoutConfig().content_width_pt
+    grid_height = measurer.measure_html(f'<div class="map-grid">{items}</div>')
+    assert tile_side + 4.0 < grid_height < tile_side + 40.0
+
+
+@pytest.mark.skipif(not fontmetrics.FONTTOOLS_AVAILABLE, reason="fontTools not installed")
+def test_header_heights_stay_out_of_shared_tiers_and_calibration(tmp_path):
+    figure = _png(tmp_path / "figure.png", 400, 200)
+    persistent = PersistentHeightCache(str(tmp_path / "cache"), "fp-1")
+    recorder = CalibrationRecorder()
+    measurer = BlockMeasurer(
+        str(CSS_PATH), str(tmp_path), LayoutConfig(), persistent_cache=persistent, recorder=recorder
+    )
+
+    probe = measurer.html_probe(f'<img class="figure" src="{figure}" alt="" />')
+    assert measurer.measure_batch([probe]) == [pytest.approx(150.0)]
+    assert measurer.cache.get(probe.key) == pytest.approx(150.0)
+    assert persistent.get_many([probe_digest(probe.key, None)]) == {}
+    assert not recorder.samples
+
+    # Paragraphs with inline icons are not figures.
+    icon = measurer.html_probe(f'<p>Texto <img class="icon" src="{figure}" alt="" /></p>')
+    assert measurer._image_probe_height(icon, "probe-0", LayoutConfig().content_width_pt) is None
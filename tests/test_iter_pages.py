@@ -0,0 +1,42 @@
+import copy
+
+import pytest
+
+
+@pytest.fixture
+def make_document(make_page):
+    def make():
+        blocks = [{"type": "html", "html": f"<p>Parrafo {idx}</p>", "height_pt": 90.0} for idx in range(20)]
+        refs, notes = ["Fuente: DANE"], ["Nota al pie"]
+        return [
+            {"cover": True, "cover_image_path": "cover.png"},
+            make_page(blocks, "Primera", refs, notes),
+            make_page(copy.deepcopy(blocks[:12]), "Segunda", refs, notes),
+        ]
+
+    return make
+
+
+def test_iter_pages_yields_what_paginate_returns(make_paginator, make_document):
+    paginator = make_paginator()
+    streamed = list(paginator.iter_pages(make_document()))
+    assert streamed == paginator.paginate(make_document())
+    assert [page["page_number"] for page in streamed[1:]] == [str(idx) for idx in range(2, len(streamed) + 1)]
+
+
+def test_iter_pages_reads_source_pages_lazily(make_paginator, make_document):
+    consumed = []
+
+    def source():
+        for page in make_document():
+            consumed.append(page.get("title_line1"))
+            yield page
+
+    pages = make_paginator().iter_pages(source())
+    next(pages)
+    assert consumed == [None]
+    first = next(pages)
+    assert consumed == [None, "Primera"]
+    assert first["title_line1"] == "Primera"
+    list(pages)
+    assert consumed == [None, "Primera", "Segunda"]
@@ -0,0 +1,135 @@
+import sqlite3
+
+from pdfgen_juanipis.measure_cache import (
+    PRUNE_INTERVAL_S,
+    MemoryCache,
+    PersistentHeightCache,
+    layout_key,
+    measurement_fingerprint,
+    probe_digest,
+    stylesheet_signature,
+    table_layout_key,
+)
+from pdfgen_juanipis.pagination import ColumnarRows, RowRange
+
+
+def test_persistent_cache_round_trip(tmp_path):
+    digest = probe_digest(("html", "<p>Uno</p>"), None)
+    cache = PersistentHeightCache(str(tmp_path), "fp-1")
+    cache.set_many([(digest, 14.5)])
+
+    reopened = PersistentHeightCache(str(tmp_path), "fp-1")
+    assert reopened.get_many([digest]) == {digest: 14.5}
+
+
+def test_persistent_cache_keeps_other_fingerprints(tmp_path):
+    digest = probe_digest(("html", "<p>Uno</p>"), None)
+    PersistentHeightCache(str(tmp_path), "fp-1").set_many([(digest, 14.5)])
+
+    other = PersistentHeightCache(str(tmp_path), "fp-2")
+    assert other.get_many([digest]) == {}
+    other.set_many([(digest, 9.0)])
+    assert PersistentHeightCache(str(tmp_path), "fp-1").get_many([digest]) == {digest: 14.5}
+    assert PersistentHeightCache(str(tmp_path), "fp-2").get_many([digest]) == {digest: 9.0}
+
+
+def test_persistent_cache_prunes_unused_fingerprints(tmp_path):
+    digest = probe_digest(("html", "<p>Uno</p>"), None)
+    cache = PersistentHeightCache(str(tmp_path), "fp-1")
+    cache.set_many([(digest, 14.5)])
+    PersistentHeightCache(str(tmp_path), "fp-2").set_many([(digest, 9.0)])
+
+    # fp-1 was last used long ago and the last prune is a day old.
+    with sqlite3.connect(str(cache.path)) as conn:
+        conn.execute("UPDATE fingerprints SET last_used = 0 WHERE fingerprint = 'fp-1'")
+        conn.execute("UPDATE meta SET value = value - ? WHERE key = 'last_prune'", (PRUNE_INTERVAL_S,))
+    PersistentHeightCache(str(tmp_path), "fp-2")
+
+    with sqlite3.connect(str(cache.path)) as conn:
+        assert conn.execute("SELECT DISTINCT fingerprint FROM heights").fetchall() == [("fp-2",)]
+
+
+def test_fingerprint_tracks_stylesheet_and_width(tmp_path):
+    css = tmp_path / "boletin.css"
+    css.write_text(".content { font-size: 12pt; }")
+    base = measurement_fingerprint(str(css), "measure", 444.0)
+
+    assert measurement_fingerprint(str(css), "measure", 444.0) == base
+    assert measurement_fingerprint(str(css), "measure", 400.0) != base
+    assert measurement_fingerprint(str(css), "other", 444.0) != base
+
+    css.write_text(".content { font-size: 11pt; }")
+    assert measurement_fingerprint(str(css), "measure", 444.0) != base
+
+
+def test_probe_digest_includes_content_width():
+    key = ("table", True, (("1",),))
+    assert probe_digest(key, 532.66) != probe_digest(key, 444.0)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_bytes=10_000, max_entries=2)
+    cache.set(b"a", 1.0)
+    cache.set(b"b", 2.0)
+    assert cache.get(b"a") == 1.0
+    cache.set(b"c", 3.0)
+
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == 1.0 and cache.get(b"c") == 3.0
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.evictions, stats.entries) == (3, 1, 1, 2)
+
+
+def test_memory_cache_respects_byte_budget():
+    cache = MemoryCache(max_bytes=2_000)
+    for idx in range(100):
+        cache.set(layout_key("html", idx), float(idx))
+    assert cache.stats.size_bytes <= 2_000
+    assert cache.stats.evictions == 100 - len(cache)
+
+
+def test_table_layout_key_covers_geometry():
+    table = {
+        "groups": [{"title": "2024", "months": ["Ene"]}],
+        "rows": [{"dep": "Antioquia", "vals": ["1"]}],
+        "total_width": 500.0,
+        "dep_width": 120.0,
+    }
+    base = table_layout_key(table)
+    assert table_layout_key(dict(table)) == base
+    assert table_layout_key({**table, "dep_width": 100.0}) != base
+    assert table_layout_key({**table, "total_width": 400.0}) != base
+    assert table_layout_key({**table, "groups": [{"title": "2025", "months": ["Ene"]}]}) != base
+    assert len(base) == 16
+
+
+def test_table_layout_key_follows_row_contents():
+    rows = [{"dep": f"Dep {idx}", "vals": [str(idx), "x" * (idx % 3)]} for idx in range(10)]
+    columnar = ColumnarRows(rows)
+    assert table_layout_key({"rows": columnar}) == table_layout_key({"rows": rows})
+    assert table_layout_key({"rows": RowRange(columnar, 2, 7)}) == table_layout_key({"rows": rows[2:7]})
+    assert table_layout_key({"rows": [{"dep": "a", "vals": ["b", "c"]}]}) != table_layout_key(
+        {"rows": [{"dep": "a", "vals": ["b"]}, {"dep": "c", "vals": []}]}
+    )
+
+    table = {"rows": columnar}
+    base = table_layout_key(table)
+    columnar.values[3] = "editado"
+    assert table_layout_key(table) != base
+
+
+def test_stylesheet_signature_tracks_css_and_fontconfig(tmp_path, monkeypatch):
+    monkeypatch.delenv("FONTCONFIG_FILE", raising=False)
+    css = tmp_path / "boletin.css"
+    css.write_text(".content { font-size: 12pt; }")
+    base = stylesheet_signature(str(css))
+    assert stylesheet_signature(str(css)) == base
+
+    css.write_text(".content { font-size: 11pt; }")
+    changed = stylesheet_signature(str(css))
+    assert changed != base
+
+    fonts_conf = tmp_path / "fonts.conf"
+    fonts_conf.write_text("<fontconfig/>")
+    monkeypatch.setenv("FONTCONFIG_FILE", str(fonts_conf))
+    assert stylesheet_signature(str(css)) != changed
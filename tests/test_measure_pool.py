@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+
+import pytest
+
+from pdfgen_juanipis.measure_pool import MeasurementPool
+from pdfgen_juanipis.pagination import BlockMeasurer, LayoutConfig, TableProfile
+
+pytestmark = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="fork start method unavailable"
+)
+
+PARENT_PID = os.getpid()
+
+
+def _fake_measure_probes(self, items, content_width):
+    # Height encodes the worker and the fragment, so the test can tell that
+    # the layout ran in another process.
+    return {probe_id: float(os.getpid() != PARENT_PID) * len(probe.args[0]) for probe_id, probe in items}
+
+
+def _fake_table_profile(self, table):
+    return TableProfile(header_height_pt=10.0, chrome_height_pt=1.0, row_offsets_pt=(0.0, 12.0))
+
+
+@pytest.fixture
+def measurer(tmp_path, monkeypatch):
+    monkeypatch.setattr(BlockMeasurer, "_measure_probes", _fake_measure_probes)
+    monkeypatch.setattr(BlockMeasurer, "_measure_table_profile", _fake_table_profile)
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    return BlockMeasurer(str(css_path), str(tmp_path), LayoutConfig())
+
+
+def test_prefetch_measures_on_workers_and_fills_cache(measurer):
+    fragments = [f"<p>{'x' * idx}</p>" for idx in range(1, 40)]
+    table = {"groups": [{"title": "2024", "months": ["Ene"]}], "rows": [{"dep": "Antioquia", "vals": ["1"]}]}
+    with MeasurementPool(2, start_method="fork") as pool:
+        measurer.prefetch(
+            [measurer.html_probe(fragment) for fragment in fragments] + [measurer.html_probe(fragments[0])],
+            [table],
+            pool,
+        )
+
+    for fragment in fragments:
+        assert measurer.cache.get(measurer.html_probe(fragment).key) == float(len(fragment))
+    assert measurer.measure_table_profile(table).row_count == 1
+    stats = measurer.telemetry.kinds
+    assert stats["html"].misses == len(fragments)
+    assert stats["table_profile"].misses == 1
+    assert stats["table_profile"].hits == 1
+
+
+def test_prefetch_skips_cached_probes(measurer):
+    measurer.cache.set(measurer.html_probe("<p>cached</p>").key, 5.0)
+    with MeasurementPool(1, start_method="fork") as pool:
+        measurer.prefetch([measurer.html_probe("<p>cached</p>")], [], pool)
+    assert measurer.cache.get(measurer.html_probe("<p>cached</p>").key) == 5.0
+    assert "html" not in measurer.telemetry.kinds
@@ -0,0 +1,42 @@
+import copy
+
+import pytest
+
+
+@pytest.fixture
+def blocks(make_table):
+    return [
+        {"type": "html", "html": "<p>Mitad de pagina</p>", "height_pt": 250.0},
+        {"type": "table", "table": make_table(20), "row_heights_pt": [15.0] * 20},
+        {"type": "html", "html": "<p>Cierre</p>", "height_pt": 40.0},
+    ]
+
+
+def _tables(pages):
+    return [[len(block["table"]["rows"]) for block in page["blocks"] if block["type"] == "table"] for page in pages]
+
+
+def test_optimal_breaker_moves_table_instead_of_splitting_it(make_paginator, make_page, blocks):
+    greedy = make_paginator("greedy").paginate([make_page(copy.deepcopy(blocks))])
+    optimal = make_paginator("optimal").paginate([make_page(blocks)])
+
+    assert _tables(greedy)[0] and sum(map(len, _tables(greedy))) == 2
+    assert len(optimal) == len(greedy) == 2
+    assert _tables(optimal) == [[], [20]]
+    assert [block["html"] for block in optimal[1]["blocks"] if block["type"] == "html"] == ["<p>Cierre</p>"]
+
+
+def test_optimal_breaker_splits_tables_taller_than_a_page(make_paginator, make_page, blocks):
+    blocks[1]["row_heights_pt"] = [60.0] * 20
+    pages = make_paginator("optimal").paginate([make_page(blocks)])
+
+    chunks = [rows for page in _tables(pages) for rows in page]
+    assert len(chunks) > 1 and sum(chunks) == 20
+    table_blocks = [block["table"] for page in pages for block in page["blocks"] if block["type"] == "table"]
+    assert table_blocks[0]["show_header"] is True
+    assert all(table["show_header"] is False for table in table_blocks[1:])
+
+
+def test_unknown_page_breaker_is_rejected(make_paginator):
+    with pytest.raises(ValueError):
+        make_paginator("best")
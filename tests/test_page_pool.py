@@ -0,0 +1,74 @@
+import multiprocessing
+
+import pytest
+
+from pdfgen_juanipis.page_pool import PaginationPool
+from pdfgen_juanipis.pagination import ColumnarRows, RowRange
+
+pytestmark = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="fork start method unavailable"
+)
+
+
+@pytest.fixture
+def make_document(make_page):
+    def make():
+        pages = [{"cover": True, "cover_image_path": "cover.png"}]
+        for idx, count in enumerate((3, 14, 1, 9)):
+            blocks = [
+                {"type": "html", "html": f"<p>Parrafo {idx}.{block}<sup>1</sup></p>", "height_pt": 120.0}
+                for block in range(count)
+            ]
+            pages.append(make_page(blocks, f"Capitulo {idx}", refs=["1 Fuente DANE"]))
+        return pages
+
+    return make
+
+
+def test_parallel_pagination_matches_sequential(make_paginator, make_document):
+    expected = make_paginator().paginate(make_document())
+    with PaginationPool(2, start_method="fork") as pool:
+        paginator = make_paginator(page_pool=pool)
+        pages = paginator.paginate(make_document())
+        without_cover = paginator.paginate(make_document()[1:])
+
+    assert pages == expected
+    assert [page["page_number"] for page in pages] == [""] + [str(idx) for idx in range(2, len(pages) + 1)]
+    assert without_cover == make_paginator().paginate(make_document()[1:])
+    assert [page["show_header_titles"] for page in without_cover] == [True] + [False] * (len(without_cover) - 1)
+    # Workers' measurement counters come back to the caller.
+    assert paginator.measure_stats.kinds["footer_meta"].misses > 0
+
+
+def test_failed_pool_falls_back_to_this_process(make_paginator, make_document):
+    pool = PaginationPool(1, start_method="fork")
+    pool.close()
+    assert make_paginator(page_pool=pool).paginate(make_document()) == make_paginator().paginate(make_document())
+
+
+def test_parallel_table_chunks_view_the_callers_rows(make_paginator, make_document):
+    table = {
+        "groups": [{"title": "G", "months": ["Enero", "Febrero"]}],
+        "rows": ColumnarRows({"dep": f"Dept {idx}", "vals": ["1", "2"]} for idx in range(200)),
+    }
+    document = make_document()
+    document[2]["blocks"].insert(3, {"type": "table", "table": table})
+    with PaginationPool(2, start_method="fork") as pool:
+        pages = make_paginator(page_pool=pool).paginate(document)
+
+    assert pages == make_paginator().paginate(document)
+    chunks = [block["table"]["rows"] for page in pages for block in page.get("blocks", []) if block["type"] == "table"]
+    assert len(chunks) > 1
+    assert all(isinstance(rows, RowRange) and rows.base is table["rows"] for rows in chunks)
+
+
+def test_workers_cache_the_seeded_measurements(make_paginator, make_document):
+    page = dict(make_document()[1], blocks=[{"type": "html", "html": f"<p>Corto {idx}</p>"} for idx in range(3)])
+    serial = make_paginator()
+    seed = [(serial.measurer.html_probe(block["html"]).key, 500.0) for block in page["blocks"]]
+    for key, height in seed:
+        serial.measurer.cache.set(key, height)
+    with PaginationPool(1, start_method="fork") as pool:
+        plan, _, _ = pool.plan(serial._worker_options, [page], [seed])[0]
+
+    assert len(plan.builds) == len(serial._plan_logical_page(page).builds) == 3
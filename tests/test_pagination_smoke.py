@@ -1,8 +1,22 @@
+import math
+
+import pytest
+
+from pdfgen_juanipis import pagination
 from pdfgen_juanipis.pagination import (
+    BlockMeasurer,
+    ColumnarRows,
+    HtmlLineProfile,
     LayoutConfig,
     Paginator,
+    RowRange,
+    TableProfile,
+    build_table_html,
+    get_html_fragment,
     split_html_into_chunks,
+    _cut_html_by_lines,
     _needs_keep_with_next,
+    _slice_element,
     _split_single_element_by_words,
 )
 
@@ -78,6 +92,26 @@ def test_keep_with_next_detects_titles():
     assert _needs_keep_with_next('<p>normal</p>') is False
 
 
+def test_html_fragment_is_scanned_once_and_shared():
+    html = '<p class="section-title">Uno<sup>1</sup> [2, 4-5]</p><p>Dos</p>'
+    fragment = get_html_fragment(html)
+    assert get_html_fragment(html) is fragment
+    assert fragment.keep_with_next is True
+    assert fragment.sup_numbers == ("1",)
+    assert fragment.ref_ids == ("2", "4", "5")
+    assert fragment.elements == ('<p class="section-title">Uno<sup>1</sup> [2, 4-5]</p>', "<p>Dos</p>")
+    assert list(fragment.chunks) == split_html_into_chunks(html)
+    assert fragment.chunks is get_html_fragment(html).chunks
+
+
+def test_html_fragment_cache_is_bounded_by_bytes(monkeypatch):
+    monkeypatch.setattr(pagination._FRAGMENTS, "max_bytes", 200_000)
+    for idx in range(50):
+        get_html_fragment(f"<p>{idx} " + "palabra " * 200 + "</p>")
+    assert pagination._FRAGMENTS.stats.size_bytes <= 200_000
+    assert 0 < len(pagination._FRAGMENTS) < 50
+
+
 def test_paginator_smoke(tmp_path):
     layout = LayoutConfig()
     css_path = tmp_path / "dummy.css"
@@ -106,3 +140,194 @@ def test_paginator_smoke(tmp_path):
     paginated = paginator.paginate(pages)
     assert paginated
     assert paginated[0]["blocks"], "Expected blocks to be preserved"
+
+
+def test_measure_batch_matches_single_measurements(tmp_path):
+    layout = LayoutConfig()
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    fragments = [
+        "<p>Uno</p>",
+        "<p>" + "Texto largo " * 60 + "</p>",
+        '<div class="section-title">Titulo</div>',
+    ]
+
+    batch = BlockMeasurer(str(css_path), str(tmp_path), layout)
+    batch_heights = batch.measure_html_batch(fragments)
+
+    single = BlockMeasurer(str(css_path), str(tmp_path), layout)
+    single_heights = [single.measure_html(fragment) for fragment in fragments]
+
+    assert batch_heights == pytest.approx(single_heights, abs=0.5)
+    assert batch.measure_batch([None, batch.footer_page_probe("")]) == [0.0, 0.0]
+
+
+def test_table_profile_lookups():
+    profile = TableProfile(
+        header_height_pt=30.0,
+        chrome_height_pt=10.0,
+        row_offsets_pt=(0.0, 15.0, 30.0, 50.0, 65.0),
+    )
+    assert profile.row_count == 4
+    assert profile.height(0, 4, True) == 105.0
+    assert profile.height(1, 3, False) == 45.0
+    assert profile.rows_that_fit(0, 80.0, True) == 2
+    assert profile.rows_that_fit(2, 45.0, False) == 2
+    assert profile.rows_that_fit(0, 20.0, True) == 0
+
+
+def test_paginator_splits_large_table_without_losing_rows(tmp_path):
+    layout = LayoutConfig()
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    paginator = Paginator(layout, str(css_path), str(tmp_path))
+    rows = [{"dep": f"Dept {idx}", "vals": [str(idx)] * 2} for idx in range(120)]
+
+    pages = [
+        {
+            "header_banner_path": "banner.png",
+            "header_logo_path": "logo.png",
+            "title_line1": "Titulo",
+            "title_line2": "Subtitulo",
+            "blocks": [
+                {"type": "html", "html": '<div class="section-title">Tabla</div>', "keep_with_next": True},
+                {
+                    "type": "table",
+                    "table": {
+                        "groups": [{"title": "G", "months": ["Enero", "Febrero"]}],
+                        "rows": rows,
+                        "total_width": 532.66,
+                        "dep_width": 120.0,
+                    },
+                },
+            ],
+            "refs": [],
+            "footer_notes": [],
+            "page_number": "1",
+        }
+    ]
+
+    paginated = paginator.paginate(pages)
+    chunks = [block["table"] for page in paginated for block in page["blocks"] if block["type"] == "table"]
+    assert len(chunks) > 1
+    assert [row["dep"] for chunk in chunks for row in chunk["rows"]] == [row["dep"] for row in rows]
+    # Chunks are views of the caller's rows, not copies.
+    assert all(row is rows[int(row["dep"].split()[1])] for chunk in chunks for row in chunk["rows"])
+    assert chunks[0]["show_header"] is True
+    assert all(chunk["show_header"] is False for chunk in chunks[1:])
+
+
+def test_row_range_views_share_rows():
+    rows = [{"dep": str(idx)} for idx in range(10)]
+    view = RowRange(rows, 2, 8)
+    tail = RowRange(view, 3)
+    assert len(view) == 6 and view[0] is rows[2] and view[-1] is rows[7]
+    assert list(tail) == rows[5:8]
+    assert view[1:3] == rows[3:5] and isinstance(view[1:3], RowRange)
+    with pytest.raises(IndexError):
+        view[6]
+
+
+def test_columnar_rows_read_like_row_dicts():
+    rows = [{"dep": "Meta", "vals": ["0,41", "0,38"]}, {"dep": "Huila", "vals": ["0,27"]}, {"dep": "Meta", "vals": []}]
+    columnar = ColumnarRows(rows)
+    assert len(columnar) == 3 and columnar == rows
+    assert columnar[0].dep is columnar[2].dep
+    assert columnar[1].get("vals") == ["0,27"] and list(columnar[-1]["vals"]) == []
+    chunk = columnar[1:]
+    assert isinstance(chunk, RowRange) and chunk[0].dep == "Huila"
+    table = {"groups": [{"title": "2024", "months": ["Ene", "Feb"]}], "rows": rows}
+    assert build_table_html(dict(table, rows=columnar)) == build_table_html(table)
+
+
+def test_slice_element_keeps_inline_tags_balanced():
+    html = "<p>uno <strong>dos tres</strong> cuatro</p>"
+    head = _slice_element(html, 0, 6)
+    tail = _slice_element(html, 6, None)
+    assert head == "<p>uno <strong>dos</strong></p>"
+    assert tail.startswith("<p style=\"margin:0;padding:0;\"><strong>tres</strong>")
+    assert tail.endswith("cuatro</p>")
+
+
+def test_cut_html_by_lines_fills_budget():
+    paragraph = "<p>" + " ".join(f"w{idx}" for idx in range(30)) + "</p>"
+    ends = [sum(len(f"w{idx}") for idx in range(count)) for count in (10, 20, 30)]
+    profile = HtmlLineProfile(
+        elements=(paragraph, "<p>fin</p>"),
+        element_extents=((0.0, 48.0), (48.0, 68.0)),
+        element_lines=(
+            ((0.0, 14.0, ends[0]), (14.0, 28.0, ends[1]), (28.0, 42.0, ends[2])),
+            ((48.0, 62.0, 3),),
+        ),
+    )
+
+    head, tail = _cut_html_by_lines(profile, 35.0, math.inf, force_first=False)
+    assert head.endswith("w19</p>")
+    assert tail.startswith('<p style="margin:0;padding:0;">w20 ')
+    assert tail.endswith("<p>fin</p>")
+
+    assert _cut_html_by_lines(profile, 10.0, math.inf, force_first=False)[0] == ""
+    assert len(_cut_html_by_lines(profile, 30.0, 30.0)) == 4
+
+
+def test_cut_html_by_lines_tokenizes_each_element_once(monkeypatch):
+    calls = []
+
+    class CountingPattern:
+        def findall(self, text):
+            calls.append(text)
+            return word_token.findall(text)
+
+    word_token = pagination._WORD_TOKEN
+    monkeypatch.setattr(pagination, "_WORD_TOKEN", CountingPattern())
+    paragraph = "<p>" + " ".join(f"<em>once{idx}</em> w{idx}" for idx in range(40)) + "</p>"
+    lines = tuple((14.0 * idx, 14.0 * (idx + 1), 40 + 90 * idx) for idx in range(1, 5))
+    profile = HtmlLineProfile(elements=(paragraph,), element_extents=((0.0, 70.0),), element_lines=(lines,))
+
+    assert len(_cut_html_by_lines(profile, 20.0, 20.0)) > 2
+    assert len(calls) == 1
+
+
+def test_footer_meta_sum_matches_full_measurement(tmp_path):
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    measurer = BlockMeasurer(str(css_path), str(tmp_path), LayoutConfig())
+    refs = [f"{idx} Fuente: " + "referencia larga " * idx for idx in range(1, 16)]
+    notes = ["Nota uno", "Nota dos"]
+
+    for case_refs, case_notes in ((refs, notes), (refs[:3], []), ([], notes)):
+        full = measurer.measure_batch([measurer.footer_meta_probe(case_refs, case_notes)])[0]
+        assert measurer.measure_footer_meta(case_refs, case_notes) == pytest.approx(full, abs=0.5)
+    assert measurer.measure_footer_meta([], []) == 0.0
+
+
+def test_page_geometry_is_shared_between_paginators(tmp_path):
+    layout = LayoutConfig()
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    cache = {}
+    page = {
+        "header_banner_path": "banner.png",
+        "header_logo_path": "logo.png",
+        "title_line1": "Titulo",
+        "title_line2": "Subtitulo",
+        "blocks": [{"type": "html", "html": "<p>Texto</p>"}],
+        "refs": [],
+        "footer_notes": [],
+        "page_number": "1",
+    }
+
+    first = Paginator(layout, str(css_path), str(tmp_path), geometry_cache=cache)
+    first.paginate([page])
+    geometry = first.page_geometry(page)
+    assert len(cache) == 1
+
+    second = Paginator(layout, str(css_path), str(tmp_path), geometry_cache=cache)
+    assert second.page_geometry(dict(page, page_number="7")) is geometry
+    second.paginate([page])
+    assert "footer_contact" not in second.measure_stats.kinds
+    assert len(cache) == 1
+
+    other_theme = second.page_geometry(dict(page, title_line1="Otro titulo"))
+    assert other_theme is not geometry
+    assert other_theme.header(False) == geometry.header(False)
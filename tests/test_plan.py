@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from pdfgen_juanipis.pagination import LayoutConfig, compact_table_rows
+from pdfgen_juanipis.plan import (
+    PLAN_VERSION,
+    asset_signature,
+    document_digest,
+    load_plan,
+    pages_from_plan,
+    plan_fingerprint,
+)
+
+
+@pytest.fixture
+def make_document(make_page, make_table):
+    def make():
+        long_text = "".join(f"<p>Parrafo largo {idx} con texto suficiente para partirlo.</p>" for idx in range(120))
+        blocks = [
+            {"type": "html", "html": "<p>Inicio</p>"},
+            {"type": "table", "table": make_table(60)},
+            {"type": "html", "html": long_text},
+            {"type": "kpi_tiles", "tiles": [{"label": "A", "value": 1}]},
+        ]
+        pages = [
+            {"cover": True, "cover_image_path": "cover.png"},
+            make_page(blocks, refs=["Fuente: DANE"], notes=["Nota al pie"], intro="Introduccion"),
+        ]
+        compact_table_rows(pages)
+        return pages
+
+    return make
+
+
+def test_plan_rebuilds_the_paginated_pages(tmp_path, make_paginator, make_document):
+    paginator = make_paginator()
+    pages, plan = paginator.paginate_with_plan(make_document(), document="doc")
+    assert pages == paginator.paginate(make_document())
+    assert plan.fingerprint == plan_fingerprint(str(tmp_path / "dummy.css"), LayoutConfig(), "estimate")
+
+    plan.save(str(tmp_path / "plan.json"))
+    loaded = load_plan(str(tmp_path / "plan.json"))
+    assert loaded.matches(plan.fingerprint, "doc")
+    assert pages_from_plan(loaded, make_document()) == pages
+
+    blocks = [block for entry in loaded.pages for block in entry.get("blocks", [])]
+    assert any("rows" in block for block in blocks)
+    assert any("html" in block for block in blocks)
+    assert {"block": 0} in blocks and {"block": 3} in blocks
+
+
+def test_plan_rejects_other_versions_and_inputs(tmp_path, make_paginator, make_document):
+    _, plan = make_paginator().paginate_with_plan(make_document(), document=document_digest(make_document(), True))
+    assert not plan.matches(plan.fingerprint, document_digest(make_document(), False))
+    assert not plan.matches(plan_fingerprint(str(tmp_path / "dummy.css"), LayoutConfig(), "weasyprint"), plan.document)
+
+    path = tmp_path / "plan.json"
+    plan.save(str(path))
+    payload = json.loads(path.read_text())
+    payload["version"] = PLAN_VERSION + 1
+    path.write_text(json.dumps(payload))
+    with pytest.raises(ValueError):
+        load_plan(str(path))
+
+
+def test_document_digest_follows_referenced_assets(tmp_path):
+    (tmp_path / "figure.png").write_bytes(b"uno")
+    (tmp_path / "inline.png").write_bytes(b"dos")
+    data = {
+        "pages": [
+            {
+                "header_banner_path": str(tmp_path / "banner.png"),
+                "blocks": [
+                    {"type": "figure", "path": "figure.png"},
+                    {"type": "html", "html": '<p>Icono <img src="inline.png"> en linea</p>'},
+                ],
+            }
+        ]
+    }
+    assets = asset_signature(data, str(tmp_path))
+    assert [entry[0] for entry in assets] == sorted([str(tmp_path / "banner.png"), "figure.png", "inline.png"])
+    assert (str(tmp_path / "banner.png"), None, None) in assets
+
+    (tmp_path / "inline.png").write_bytes(b"otra imagen")
+    assert document_digest(data, True, asset_signature(data, str(tmp_path))) != document_digest(data, True, assets)
@@ -0,0 +1,72 @@
+import copy
+
+import pytest
+
+from pdfgen_juanipis.pagination import compact_table_rows
+
+
+@pytest.fixture
+def make_document(make_page, make_table):
+    def make(paragraphs=60):
+        blocks = []
+        for idx in range(paragraphs):
+            blocks.append({"type": "html", "html": f"<p>Parrafo {idx}</p>", "height_pt": 40.0 + (idx % 5) * 12})
+            if idx % 20 == 10:
+                blocks.append({"type": "table", "table": make_table(30), "row_heights_pt": [15.0] * 30})
+        return [make_page(blocks)]
+
+    return make
+
+
+def test_repaginate_without_previous_matches_paginate(make_paginator, make_document):
+    paginator = make_paginator()
+    assert paginator.repaginate(make_document()).pages == paginator.paginate(make_document())
+
+
+def test_repaginate_after_edit_matches_full_pagination(make_paginator, make_document):
+    paginator = make_paginator()
+    first = paginator.repaginate(make_document())
+
+    edited = make_document()
+    edited[0]["blocks"][45]["height_pt"] = 300.0
+    incremental = paginator.repaginate(edited, previous=first)
+
+    assert incremental.pages == paginator.paginate(copy.deepcopy(edited))
+    # Pages ending before the edited block are reused untouched.
+    assert incremental.plans[0].builds[0] is first.plans[0].builds[0]
+
+
+def test_repaginate_handles_inserted_and_removed_blocks(make_paginator, make_document):
+    paginator = make_paginator()
+    first = paginator.repaginate(make_document())
+
+    inserted = make_document()
+    inserted[0]["blocks"].insert(20, {"type": "html", "html": "<p>Nuevo</p>", "height_pt": 90.0})
+    second = paginator.repaginate(inserted, previous=first)
+    assert second.pages == paginator.paginate(copy.deepcopy(inserted))
+
+    removed = make_document()
+    del removed[0]["blocks"][5:8]
+    assert paginator.repaginate(removed, previous=second).pages == paginator.paginate(copy.deepcopy(removed))
+
+
+def test_repaginate_sees_edits_to_columnar_table_cells(make_paginator, make_document):
+    paginator = make_paginator()
+    document = make_document()
+    compact_table_rows(document)
+    first = paginator.repaginate(document)
+
+    edited = make_document()
+    edited[0]["blocks"][11]["table"]["rows"][3]["vals"][0] = "editado"
+    compact_table_rows(edited)
+    incremental = paginator.repaginate(edited, previous=first)
+
+    cells = [
+        value
+        for page in incremental.pages
+        for block in page["blocks"]
+        if block.get("type") == "table"
+        for row in block["table"]["rows"]
+        for value in row["vals"]
+    ]
+    assert "editado" in cells
@@ -0,0 +1,97 @@
+import gc
+import multiprocessing
+import os
+
+import pytest
+
+from pdfgen_juanipis.measure_cache import layout_key
+from pdfgen_juanipis.pagination import BlockMeasurer, LayoutConfig, MeasureProbe, Paginator
+from pdfgen_juanipis.shared_cache import SHARED_CACHE_AVAILABLE, SharedHeightCache, shared_cache_from_env
+
+pytestmark = pytest.mark.skipif(not SHARED_CACHE_AVAILABLE, reason="shared cache requires POSIX")
+
+
+def _write_from_child(path, digest):
+    cache = SharedHeightCache(path, "fp-1", slots=64)
+    cache.set_many([(digest, 21.25)])
+    cache.close()
+
+
+def test_shared_cache_round_trip_and_fingerprint_scope(tmp_path):
+    path = str(tmp_path / "heights.bin")
+    digest = layout_key("html", "<p>Uno</p>")
+    cache = SharedHeightCache(path, "fp-1", slots=64)
+    cache.set_many([(digest, 14.5)])
+    assert cache.get_many([digest, layout_key("other")]) == {digest: 14.5}
+
+    reopened = SharedHeightCache(path, "fp-1", slots=64)
+    assert reopened.get_many([digest]) == {digest: 14.5}
+
+    # Another stylesheet fingerprint shares the file without seeing, or
+    # wiping, the entries of the first one.
+    other = SharedHeightCache(path, "fp-2", slots=64)
+    assert other.get_many([digest]) == {}
+    other.set_many([(digest, 9.0)])
+    assert other.get_many([digest]) == {digest: 9.0}
+    assert cache.get_many([digest]) == {digest: 14.5}
+
+    # A different slot count lays the table out again.
+    SharedHeightCache(path, "fp-1", slots=32)
+    assert cache.get_many([digest]) == {}
+
+
+def test_shared_cache_linear_probing_with_few_slots(tmp_path):
+    cache = SharedHeightCache(str(tmp_path / "heights.bin"), "fp-1", slots=8)
+    items = [(layout_key("html", index), float(index)) for index in range(8)]
+    cache.set_many(items)
+    assert cache.get_many([digest for digest, _ in items]) == dict(items)
+
+    # The table is full: further inserts are dropped, not overwritten.
+    extra = layout_key("html", "extra")
+    cache.set_many([(extra, 99.0)])
+    assert cache.get_many([extra]) == {}
+    assert cache.get_many([items[0][0]]) == {items[0][0]: 0.0}
+
+
+def test_shared_cache_is_visible_across_processes(tmp_path):
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("fork start method unavailable")
+    path = str(tmp_path / "heights.bin")
+    digest = layout_key("html", "<p>Dos</p>")
+    cache = SharedHeightCache(path, "fp-1", slots=64)
+
+    process = multiprocessing.get_context("fork").Process(target=_write_from_child, args=(path, digest))
+    process.start()
+    process.join(timeout=30)
+    assert process.exitcode == 0
+    assert cache.get_many([digest]) == {digest: 21.25}
+
+
+def test_measurer_reads_and_fills_shared_cache(tmp_path, monkeypatch):
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    monkeypatch.setenv("PDFGEN_SHARED_CACHE", str(tmp_path / "heights.bin"))
+    monkeypatch.setenv("PDFGEN_SHARED_CACHE_SLOTS", "64")
+    shared = shared_cache_from_env("fp-1")
+    measurer = BlockMeasurer(str(css_path), str(tmp_path), LayoutConfig(), shared_cache=shared)
+
+    probe = MeasureProbe(key=layout_key("html", "<p>Tres</p>"), render=lambda _: "", fallback=lambda: 1.0)
+    shared.set_many([(layout_key(probe.key, None), 33.0)])
+    assert measurer.measure_batch([probe]) == [33.0]
+    assert measurer.cache.get(probe.key) == 33.0
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc/self/fd")
+def test_paginators_share_one_mapping_per_process(tmp_path, monkeypatch):
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    monkeypatch.setenv("PDFGEN_SHARED_CACHE", str(tmp_path / "heights.bin"))
+    monkeypatch.setenv("PDFGEN_SHARED_CACHE_SLOTS", "64")
+
+    first = Paginator(LayoutConfig(), str(css_path), str(tmp_path))
+    # Let descriptors left by earlier tests close before counting.
+    gc.collect()
+    open_fds = len(os.listdir("/proc/self/fd"))
+    paginators = [Paginator(LayoutConfig(), str(css_path), str(tmp_path)) for _ in range(10)]
+    assert len(os.listdir("/proc/self/fd")) <= open_fds
+    assert all(paginator.measurer.shared_cache is first.measurer.shared_cache for paginator in paginators)
@@ -0,0 +1,38 @@
+import pathlib
+
+import pytest
+
+from pdfgen_juanipis import style_context
+from pdfgen_juanipis.pagination import LayoutConfig, Paginator
+
+pytestmark = pytest.mark.skipif(not style_context.WEASYPRINT_AVAILABLE, reason="WeasyPrint not installed")
+
+FONT_PATH = pathlib.Path(style_context.__file__).resolve().parent / "assets" / "fonts" / "BCDEEE_Calibri_5.ttf"
+
+
+def test_extra_font_faces_get_their_own_font_configuration(tmp_path):
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    context = style_context.get_style_context(str(css_path))
+
+    stylesheets, font_config = context.render_stylesheets(":root { --blue-title: #0b7285; }")
+    assert font_config is context.font_config and len(stylesheets) == 2
+
+    font_face = f"@font-face {{ font-family: Extra; src: url('{FONT_PATH.as_uri()}'); }}"
+    stylesheets, font_config = context.render_stylesheets(font_face)
+    assert font_config is not context.font_config and len(stylesheets) == 2
+    assert context.render_stylesheets("") == ([context.stylesheet], context.font_config)
+
+
+def test_measurer_resolves_the_style_context_once(tmp_path, monkeypatch):
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    calls = []
+    resolve = style_context.get_style_context
+    monkeypatch.setattr(
+        "pdfgen_juanipis.pagination.get_style_context", lambda path: calls.append(path) or resolve(path)
+    )
+    measurer = Paginator(LayoutConfig(), str(css_path), str(tmp_path)).measurer
+    measurer.measure_html("<p>Uno</p>")
+    measurer.measure_html("<p>Dos</p>")
+    assert len(calls) == 1
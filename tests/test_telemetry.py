@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from pdfgen_juanipis import pagination
+from pdfgen_juanipis.pagination import LayoutConfig, Paginator
+from pdfgen_juanipis.telemetry import MeasureTelemetry
+
+
+def test_telemetry_splits_batch_time_and_keeps_largest_fragments():
+    telemetry = MeasureTelemetry()
+    fragments = [("html", "<p>" + "x" * size + "</p>") for size in range(1, 9)]
+    telemetry.record_measurement(fragments + [("table", "<table></table>")], 0.9, layouts=1)
+    telemetry.record_hit("html")
+
+    html = telemetry.kinds["html"]
+    assert (html.layouts, html.hits, html.misses) == (1, 1, 8)
+    assert html.total_time_s == pytest.approx(0.8)
+    assert html.p95_time_s == pytest.approx(0.1)
+    assert [length for length, _ in sorted(html.largest, reverse=True)] == [15, 14, 13, 12, 11]
+    assert telemetry.kinds["table"].layouts == 1
+    assert telemetry.layouts == 1
+
+    data = json.loads(telemetry.to_json())
+    assert data["kinds"]["html"]["largest_fragments"][0]["chars"] == 15
+
+
+def test_paginator_reports_hits_and_misses_per_kind(tmp_path):
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    paginator = Paginator(LayoutConfig(), str(css_path), str(tmp_path), measure_mode="estimate")
+    measurer = paginator.measurer
+
+    measurer.measure_html("<p>Uno</p>")
+    measurer.measure_html("<p>Uno</p>")
+    measurer.measure_table_profile({"groups": [], "rows": [{"dep": "A", "vals": []}]})
+
+    stats = paginator.measure_stats
+    assert stats.kinds["html"].misses == 1
+    assert stats.kinds["html"].hits == 1
+    assert stats.kinds["text"].misses == 1  # the header line probe
+    assert stats.kinds["table_profile"].misses == 1
+    assert stats.layouts == 0
+
+
+def test_table_fragments_are_sized_in_cells_without_full_markup(tmp_path, monkeypatch):
+    css_path = tmp_path / "dummy.css"
+    css_path.write_text(".content { font-size: 12pt; }")
+    measurer = Paginator(LayoutConfig(), str(css_path), str(tmp_path), measure_mode="estimate").measurer
+    built = []
+    build_table_html = pagination.build_table_html
+
+    def counting_build(table, **kwargs):
+        built.append(len(table["rows"]))
+        return build_table_html(table, **kwargs)
+
+    monkeypatch.setattr(pagination, "build_table_html", counting_build)
+    table = {
+        "groups": [{"title": "G", "months": ["Enero", "Febrero"]}],
+        "rows": [{"dep": f"Dept {idx}", "vals": ["1", "2"]} for idx in range(500)],
+    }
+    measurer.measure_table_profile(table)
+
+    stats = measurer.telemetry.kinds["table_profile"].to_dict()
+    assert stats["largest_fragments"][0]["cells"] == 1500
+    assert stats["largest_fragments"][0]["excerpt"].startswith("<div")
+    assert max(built) <= pagination.TELEMETRY_EXCERPT_ROWS
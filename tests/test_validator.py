@@ -47,3 +47,29 @@ def test_refs_catalog_missing_warning(tmp_path):
     }
     _, warnings = validate_and_normalize(data, root_dir=pathlib.Path.cwd())
     assert any("Missing refs_catalog entry for [2]" in w for w in warnings)
+
+
+def test_row_heights_hint_must_match_rows():
+    data = {
+        "sections": [
+            {
+                "content": [
+                    {
+                        "type": "table",
+                        "table": {
+                            "groups": [{"title": "A", "months": ["Ene"]}],
+                            "rows": [{"dep": "X", "vals": ["1"]}, {"dep": "Y", "vals": ["2"]}],
+                        },
+                        "row_heights_pt": [12.0],
+                        "height_pt": 40.0,
+                    }
+                ]
+            }
+        ],
+    }
+
+    normalized, warnings = validate_and_normalize(data, root_dir=pathlib.Path.cwd())
+    block = normalized["sections"][0]["content"][0]
+    assert "row_heights_pt" not in block
+    assert block["height_pt"] == 40.0
+    assert any("row_heights_pt" in warning for warning in warnings)